@@ -0,0 +1,355 @@
+import os, json, time, zlib, sqlite3, asyncio, threading, logging
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("voyagerai.cache")
+
+# ---------- In-process LRU tier ----------
+class LRUCache:
+    '''
+    Bounded in-memory LRU with a TTL per entry.
+    Sits in front of the disk cache so hot keys are served without
+    filesystem syscalls or JSON decoding.
+    Values are shared between callers: treat them as read-only.
+    '''
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(int(max_entries), 1)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Tuple[bool, Any]:
+        '''Returns (hit, value). Expired entries are dropped and count as a miss.'''
+        now = time.time() if now is None else now
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: Hashable, value: Any, ttl: float, now: Optional[float] = None):
+        if ttl <= 0:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._data[key] = (now + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# ---------- Freshness policies ----------
+class CachePolicy:
+    '''
+    soft_ttl: served as fresh until then.
+    hard_ttl: between soft and hard the stale value is served immediately and
+              refreshed in the background; after hard it is a miss.
+    negative_ttl: lifetime of fallback/error results (see NegativeResult), which
+              never replace a good stale value.
+    '''
+    __slots__ = ("soft_ttl", "hard_ttl", "negative_ttl")
+
+    def __init__(self, soft_ttl: float, hard_ttl: Optional[float] = None, negative_ttl: float = 300):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl or soft_ttl, soft_ttl)
+        self.negative_ttl = negative_ttl
+
+class NegativeResult:
+    '''Wraps a fallback value a fetch function returns when the provider failed.'''
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+# ---------- Single-file disk tier (SQLite, WAL) ----------
+_RAW, _ZLIB = b"j", b"z"
+
+def _encode(value: Any, compress_over: int = 512) -> bytes:
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) > compress_over:
+        return _ZLIB + zlib.compress(raw, 6)
+    return _RAW + raw
+
+def _decode(blob: bytes) -> Any:
+    tag, body = blob[:1], blob[1:]
+    if tag == _ZLIB:
+        body = zlib.decompress(body)
+    return json.loads(body.decode("utf-8"))
+
+class SQLiteCacheStore:
+    '''
+    One SQLite file (WAL mode) holding every cached tool response.
+    - rows are clustered by key and carry expires_at, so a lookup is a single
+      primary-key probe; a separate expires_at index drives the expiry sweep
+    - values are compact JSON, zlib-compressed above a small threshold
+    - total payload bytes are capped at max_bytes: expired rows go first, then
+      least recently accessed rows
+    - a daemon thread periodically sweeps, enforces the budget and checkpoints
+      the WAL (compact()).
+    '''
+    SCHEMA = [
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        """CREATE TABLE IF NOT EXISTS entries (
+               key TEXT PRIMARY KEY,
+               created_at REAL NOT NULL,
+               expires_at REAL NOT NULL,
+               last_access REAL NOT NULL,
+               size INTEGER NOT NULL,
+               value BLOB NOT NULL,
+               stale_at REAL
+           ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries(expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)",
+    ]
+    # last_access is only rewritten when older than this, so reads stay read-only
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, compact_interval: float = 600.0):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        for stmt in self.SCHEMA:
+            self._db.execute(stmt)
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(entries)")}
+        if "stale_at" not in cols:  # files created before soft TTLs existed
+            self._db.execute("ALTER TABLE entries ADD COLUMN stale_at REAL")
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size),0) FROM entries").fetchone()[0]
+        self.evictions = 0
+        self.expired_deleted = 0
+        self._stop = threading.Event()
+        self._compactor = None
+        if compact_interval and compact_interval > 0:
+            self._compactor = threading.Thread(target=self._compact_loop, args=(compact_interval,),
+                                               name="cache-compactor", daemon=True)
+            self._compactor.start()
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Tuple[Any, float, float]]:
+        '''Returns (value, expires_at, stale_at) for an entry not yet past its hard expiry, otherwise None.'''
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at, last_access, stale_at FROM entries WHERE key=? AND expires_at>?",
+                (key, now)).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                self._db.execute("UPDATE entries SET last_access=? WHERE key=?", (now, key))
+        try:
+            return _decode(row[0]), row[1], row[1] if row[3] is None else row[3]
+        except Exception:
+            self.delete(key)
+            return None
+
+    def set(self, key: str, value: Any, ttl: float, now: Optional[float] = None, stale_after: Optional[float] = None):
+        '''Keep `value` for `ttl` seconds; it is considered stale after `stale_after` (default: ttl).'''
+        now = time.time() if now is None else now
+        blob = _encode(value)
+        stale_at = now + (ttl if stale_after is None else min(stale_after, ttl))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key=?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries(key, created_at, expires_at, last_access, size, value, stale_at) "
+                "VALUES (?,?,?,?,?,?,?)", (key, now, now + ttl, now, len(blob), blob, stale_at))
+            self._bytes += len(blob) - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._enforce_budget(now)
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self._db.execute("DELETE FROM entries WHERE key=? RETURNING size", (key,)).fetchone()
+            if row:
+                self._bytes -= row[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._bytes = 0
+
+    def _delete_expired(self, now: float):
+        cur = self._db.execute("DELETE FROM entries WHERE expires_at<=? RETURNING size", (now,))
+        freed = [r[0] for r in cur.fetchall()]
+        self.expired_deleted += len(freed)
+        self._bytes -= sum(freed)
+
+    def _enforce_budget(self, now: float):
+        # caller holds the lock; shrink to 90% so we do not evict on every write
+        self._delete_expired(now)
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._db.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_access LIMIT 64) RETURNING size").fetchall()
+            if not rows:
+                break
+            self.evictions += len(rows)
+            self._bytes -= sum(r[0] for r in rows)
+
+    def compact(self, now: Optional[float] = None):
+        '''Drop expired rows, enforce the byte budget and give pages back to the OS.'''
+        now = time.time() if now is None else now
+        with self._lock:
+            self._delete_expired(now)
+            if self._bytes > self.max_bytes:
+                self._enforce_budget(now)
+            self._db.execute("PRAGMA incremental_vacuum")
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _compact_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("cache compaction failed")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "entries": n,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expired_deleted": self.expired_deleted,
+        }
+
+
+# ---------- Single-flight request coalescing ----------
+class _LeaderCancelled(Exception):
+    '''The caller doing the fetch was cancelled; waiters fetch for themselves.'''
+
+class SingleFlight:
+    '''
+    Per-key in-flight deduplication shared by threads and asyncio tasks.
+    The first caller for a key runs the fetch; concurrent callers for the same
+    key wait (up to `timeout`) on its concurrent.futures.Future and get the same
+    result or the same exception. A waiter that times out, or whose leader was
+    cancelled, runs the fetch itself.
+    '''
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._inflight: Dict[Hashable, Tuple[Future, int]] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool, bool]:
+        '''Returns (future, is_leader, leader_on_this_thread).'''
+        me = threading.get_ident()
+        with self._lock:
+            item = self._inflight.get(key)
+            if item is None:
+                fut = Future()
+                self._inflight[key] = (fut, me)
+                self.leaders += 1
+                return fut, True, True
+            return item[0], False, item[1] == me
+
+    def _finish(self, key: Hashable, fut: Future):
+        with self._lock:
+            item = self._inflight.get(key)
+            if item is not None and item[0] is fut:
+                del self._inflight[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        fut, leader, same_thread = self._join(key)
+        if not leader and same_thread:
+            # the leader is an asyncio task on this thread; blocking here would deadlock its loop
+            return fn()
+        if not leader:
+            self.coalesced += 1
+            try:
+                return fut.result(self.timeout if timeout is None else timeout)
+            except FutureTimeout:
+                self.timeouts += 1
+                return fn()
+            except _LeaderCancelled:
+                return fn()
+        try:
+            res = fn()
+        except BaseException as e:
+            fut.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+            raise
+        else:
+            fut.set_result(res)
+            return res
+        finally:
+            self._finish(key, fut)
+
+    async def ado(self, key: Hashable, afn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        fut, leader, _ = self._join(key)
+        if not leader:
+            self.coalesced += 1
+            try:
+                # shield: a waiter timing out must not cancel the leader's future
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)),
+                                              self.timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return await afn()
+            except _LeaderCancelled:
+                return await afn()
+        try:
+            res = await afn()
+        except BaseException as e:
+            fut.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+            raise
+        else:
+            fut.set_result(res)
+            return res
+        finally:
+            self._finish(key, fut)
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders,
+                "coalesced": self.coalesced, "timeouts": self.timeouts}
@@ -0,0 +1,324 @@
+import calendar, math
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from lexicon import Token
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6, "jul": 7, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+    "january": 1, "february": 2, "march": 3, "april": 4, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+
+WEEKDAYS = {
+    "mon": 0, "monday": 0, "tue": 1, "tues": 1, "tuesday": 1, "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3, "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5, "sun": 6, "sunday": 6,
+}
+
+ORDINAL_SUFFIXES = {"st", "nd", "rd", "th"}
+ORDINAL_WORDS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "last": -1, "final": -1}
+RANGE_SEPS = {"-", "–", "—", "to", "till", "until", "through", "thru", "and"}
+NEXT_WORDS = {"next", "coming", "following"}
+THIS_WORDS = {"this"}
+
+# (first day, last day) of a loose part of a month; 31 means the month's last day
+MONTH_PARTS = {"early": (1, 10), "beginning": (1, 10), "start": (1, 10),
+               "mid": (11, 20), "middle": (11, 20),
+               "late": (21, 31), "end": (21, 31)}
+
+# duration units in days, and the words that count as a number before them
+DURATION_UNITS = {"day": 1, "days": 1, "night": 1, "nights": 1, "week": 7, "weeks": 7, "fortnight": 14}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+# (start, end, window, next index): `window` marks spans like "next week" that
+# only bound the trip, so an explicit duration keeps just their start
+_Span = Tuple[date, Optional[date], bool, int]
+
+def _count(w: str) -> int:
+    # a number token as a count of days: "4.5" rounds up to 5
+    return math.ceil(float(w)) if "." in w else int(w)
+
+def iso_shaped(toks: List[Token], i: int) -> bool:
+    '''True if toks[i:] starts like 2026-10-12, a valid date or not.'''
+    return i + 4 < len(toks) and toks[i].kind == "num" and len(toks[i].norm) == 4 and toks[i].norm.isdigit() \
+        and toks[i + 1].norm == "-" == toks[i + 3].norm and toks[i + 2].kind == "num" == toks[i + 4].kind
+
+class _Scan:
+    '''Grammar rules over one message's tokens; each returns a value and the index after it, or None.'''
+    __slots__ = ("toks", "w", "kind", "n", "today")
+
+    def __init__(self, toks: List[Token], today: date):
+        self.toks = toks
+        self.w = [t.norm for t in toks]
+        self.kind = [t.kind for t in toks]
+        self.n = len(toks)
+        self.today = today
+
+    def word(self, i: int) -> str:
+        return self.w[i] if i < self.n else ""
+
+    def day(self, i: int):
+        # 12 / 12th / 1st, not "5 days"
+        if i < self.n and self.kind[i] == "num" and len(self.w[i]) <= 2 and self.w[i].isdigit() and 1 <= int(self.w[i]) <= 31:
+            j = i + 1
+            if self.word(j) in ORDINAL_SUFFIXES:
+                j += 1
+            if self.word(j) not in DURATION_UNITS:
+                return int(self.w[i]), j
+        return None
+
+    def month(self, i: int):
+        m = MONTHS.get(self.word(i))
+        if m is None:
+            return None
+        return m, i + 2 if self.word(i + 1) == "." else i + 1
+
+    def year(self, i: int, default: int):
+        if i < self.n and self.kind[i] == "num" and len(self.w[i]) == 4 and self.w[i].isdigit() and 1900 <= int(self.w[i]) <= 2100:
+            return int(self.w[i]), i + 1
+        return default, i
+
+    def sep(self, i: int) -> Optional[int]:
+        return i + 1 if self.word(i) in RANGE_SEPS else None
+
+    def span_at(self, i: int) -> Optional[_Span]:
+        # only the rules that can start with this token are tried
+        for rule in (_NUM_RULES if self.kind[i] == "num" else _TRIGGERS.get(self.w[i], ())):
+            try:
+                hit = rule(self, i)
+            except ValueError:   # "31 Feb"
+                hit = None
+            if hit is not None:
+                return hit
+        return None
+
+    # ---- absolute dates ----
+    def iso(self, i: int) -> Optional[_Span]:
+        # 2026-10-12
+        w = self.w
+        if iso_shaped(self.toks, i):
+            return date(int(w[i]), int(w[i + 2]), int(w[i + 4])), None, False, i + 5
+        return None
+
+    def day_first(self, i: int) -> Optional[_Span]:
+        # 12 Oct, 12th of October 2026, 12-15 Oct, 12 to 15 Oct, 28 Oct - 2 Nov, 28 Dec to 2 Jan
+        d1 = self.day(i)
+        if d1 is None:
+            return None
+        d1, j = d1
+        d2 = None
+        k = self.sep(j)
+        if k is not None and self.day(k):
+            d2, j = self.day(k)
+        elif self.day(j):   # "12 15 Oct"
+            d2, j = self.day(j)
+        if self.word(j) == "of":
+            j += 1
+        m = self.month(j)
+        if m is None:
+            return None
+        m, j = m
+        y, j = self.year(j, self.today.year)
+        start = date(y, m, d1)
+        if d2 is not None:
+            return start, date(y, m, d2), False, j
+        k = self.sep(j)
+        if k is not None and self.day(k):
+            d2, k = self.day(k)
+            m2 = self.month(k)
+            if m2 is not None:
+                # 28 Dec to 2 Jan: with no year of its own the end rolls into the next one
+                y2, k = self.year(m2[1], y + 1 if (m2[0], d2) < (m, d1) else y)
+                return start, date(y2, m2[0], d2), False, k
+        return start, None, False, j
+
+    def month_first(self, i: int) -> Optional[_Span]:
+        # Oct 12, October 12-15, Oct 28 to Nov 2, Dec 28 - Jan 2, Oct 12 2026
+        m = self.month(i)
+        if m is None:
+            return None
+        m, j = m
+        d1 = self.day(j)
+        if d1 is None:
+            return None
+        d1, j = d1
+        k = self.sep(j)
+        end = None
+        if k is not None:
+            m2 = self.month(k)
+            d2 = self.day(m2[1] if m2 else k)
+            if d2 is not None:
+                end = (m2[0] if m2 else m, d2[0])
+                j = d2[1]
+        y, j = self.year(j, self.today.year)
+        if end is None:
+            return date(y, m, d1), None, False, j
+        return date(y, m, d1), date(y + 1 if end < (m, d1) else y, *end), False, j
+
+    # ---- parts of a month ----
+    def week_of_month(self, i: int) -> Optional[_Span]:
+        # first week of June, 2nd week of Oct, last week of December
+        j = i + 1 if self.word(i) == "the" else i
+        if self.word(j) in ORDINAL_WORDS:
+            k, j = ORDINAL_WORDS[self.word(j)], j + 1
+        elif j < self.n and self.kind[j] == "num" and len(self.w[j]) == 1 and self.word(j + 1) in ORDINAL_SUFFIXES:
+            k, j = int(self.w[j]), j + 2
+        else:
+            return None
+        if self.word(j) != "week" or self.word(j + 1) != "of":
+            return None
+        m = self.month(j + 2)
+        if m is None:
+            return None
+        y, j = self.year(m[1], self.today.year)
+        last = calendar.monthrange(y, m[0])[1]
+        if k < 0:
+            start = date(y, m[0], last - 6)
+        else:
+            start = date(y, m[0], min(1 + 7 * (k - 1), last))
+        return start, min(start + timedelta(days=6), date(y, m[0], last)), True, j
+
+    def part_of_month(self, i: int) -> Optional[_Span]:
+        # early June, mid-October, end of May, beginning of Dec
+        part = MONTH_PARTS.get(self.word(i))
+        if part is None:
+            return None
+        j = i + 1
+        if self.word(j) in ("-", "of"):
+            j += 1
+        m = self.month(j)
+        if m is None:
+            return None
+        y, j = self.year(m[1], self.today.year)
+        last = calendar.monthrange(y, m[0])[1]
+        return date(y, m[0], part[0]), date(y, m[0], min(part[1], last)), True, j
+
+    # ---- relative to today ----
+    def relative(self, i: int) -> Optional[_Span]:
+        w0, t = self.word(i), self.today
+        if w0 == "today":
+            return t, None, False, i + 1
+        if w0 == "tomorrow":
+            return t + timedelta(days=1), None, False, i + 1
+        if w0 == "day" and self.word(i + 1) == "after" and self.word(i + 2) == "tomorrow":
+            return t + timedelta(days=2), None, False, i + 3
+        shift = 1 if w0 in NEXT_WORDS else 0 if w0 in THIS_WORDS else None
+        j = i + 1 if shift is not None else i
+        unit = self.word(j)
+        # a bare 'weekend' is only a duration (2 days), 'this/next weekend' are dates
+        if unit == "weekend" and shift is not None:
+            sat = t + timedelta(days=(5 - t.weekday()) % 7)
+            if t.weekday() == 6:
+                sat = t - timedelta(days=1)
+            sat += timedelta(days=7 * shift)
+            return max(sat, t), sat + timedelta(days=1), False, j + 1
+        if shift is None:
+            if unit in WEEKDAYS and i > 0 and self.w[i - 1] == "on":
+                # 'on Friday': the next one, today included
+                return t + timedelta(days=(WEEKDAYS[unit] - t.weekday()) % 7), None, False, j + 1
+            return None
+        if unit in WEEKDAYS:
+            ahead = (WEEKDAYS[unit] - t.weekday()) % 7
+            if shift and ahead == 0:
+                ahead = 7
+            return t + timedelta(days=ahead), None, False, j + 1
+        if unit == "week":
+            monday = t - timedelta(days=t.weekday()) + timedelta(days=7 * shift)
+            return max(monday, t), monday + timedelta(days=6), True, j + 1
+        if unit == "month":
+            y, m = (t.year + (t.month // 12), t.month % 12 + 1) if shift else (t.year, t.month)
+            first = date(y, m, 1)
+            return max(first, t), date(y, m, calendar.monthrange(y, m)[1]), True, j + 1
+        return None
+
+    # ---- durations ----
+    def duration_at(self, i: int) -> Optional[Tuple[int, int]]:
+        # 3 days, 3-day, 5 nights, a week, 2 weeks, 3 to 4 days, weekend
+        w0 = self.word(i)
+        if w0 == "weekend" or w0 == "weekends":
+            return 2, i + 1
+        if i < self.n and self.kind[i] == "num":
+            num = _count(w0)
+        elif w0 in NUMBER_WORDS:
+            num = NUMBER_WORDS[w0]
+        else:
+            return None
+        j = i + 1
+        k = self.sep(j)
+        if k is not None and k < self.n and self.kind[k] == "num":
+            num, j = _count(self.w[k]), k + 1   # a range of days: plan for the upper end
+        if self.word(j) == "-":
+            j += 1
+        unit = DURATION_UNITS.get(self.word(j))
+        if unit is None or num <= 0:
+            return None
+        return num * unit, j + 1
+
+_NUM_RULES = (_Scan.iso, _Scan.day_first, _Scan.week_of_month)
+_TRIGGERS: Dict[str, Tuple] = {}
+for _w in MONTHS:
+    _TRIGGERS[_w] = (_Scan.month_first,)
+for _w in list(ORDINAL_WORDS) + ["the"]:
+    _TRIGGERS[_w] = (_Scan.week_of_month,)
+for _w in MONTH_PARTS:
+    _TRIGGERS[_w] = (_Scan.part_of_month,)
+for _w in list(WEEKDAYS) + list(NEXT_WORDS) + list(THIS_WORDS) + ["today", "tomorrow", "day"]:
+    _TRIGGERS[_w] = (_Scan.relative,)
+
+_DURATION_STARTS = set(NUMBER_WORDS) | {"weekend", "weekends"}
+
+def extract(toks: List[Token], today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    '''
+    start_date / end_date / n_days in a tokenized message, or None.
+    Days and months without a year are in the current year (project decision);
+    relative phrases ("next weekend", "this Friday") count from `today`.
+    The first date expression and the first duration win. A month named next to a
+    single number no rule could read is taken as that day; nothing else is guessed.
+    '''
+    s = _Scan(toks, today or date.today())
+    span = n_days = None
+    i = 0
+    while i < s.n:
+        if span is None:
+            hit = s.span_at(i)
+            if hit is not None:
+                span, i = hit, hit[3]
+                continue
+            if iso_shaped(toks, i):
+                i += 5   # 2026-02-30: not a date, and not numbers for anything else
+                continue
+        if n_days is None and (s.kind[i] == "num" or s.w[i] in _DURATION_STARTS):
+            dur = s.duration_at(i)
+            if dur is not None:
+                n_days, i = dur
+                continue
+        i += 1
+    start = end = None
+    if span is not None:
+        start, end, window, _ = span
+        if window and n_days:
+            # 'three days next week': the week only tells when to start
+            end = None
+    else:
+        start = _fallback(toks, s)
+    out = {}
+    if start: out["start_date"] = start.isoformat()
+    if end: out["end_date"] = end.isoformat()
+    if n_days: out["n_days"] = n_days
+    return out or None
+
+def _fallback(toks: List[Token], s: _Scan) -> Optional[date]:
+    # last resort: a named month next to the only day number around it ("October, around the 12th");
+    # a day that month does not have, or several numbers the rules could not pair up, read as no date
+    for i, w in enumerate(s.w):
+        if w not in MONTHS:
+            continue
+        near = [k for k in range(max(i - 2, 0), min(i + 3, s.n))
+                if s.kind[k] == "num" and s.word(k + 1) not in DURATION_UNITS]
+        if len(near) != 1 or not s.w[near[0]].isdigit():
+            return None
+        d, m, y = int(s.w[near[0]]), MONTHS[w], s.today.year
+        return date(y, m, d) if 1 <= d <= calendar.monthrange(y, m)[1] else None
+    return None
@@ -0,0 +1,95 @@
+import os, copy, threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+from cache import LRUCache
+from planner import merge_entities
+
+STATE_CACHE_ENTRIES = int(os.getenv("DIALOGUE_STATE_ENTRIES", "4096"))
+STATE_CACHE_TTL_S = float(os.getenv("DIALOGUE_STATE_TTL_S", str(3600 * 6)))
+
+def new_state() -> Dict[str, Any]:
+    return {"entities": {}, "provenance": {}, "turn": 0, "planning": False}
+
+class DialogueStore:
+    '''
+    Accumulated slots per session, so a follow-up turn ("from Delhi", "under 30k")
+    adds to what earlier turns said instead of being planned on its own.
+    - a state is {"entities", "provenance", "turn", "planning"}; turn counts the user
+      turns that changed it, provenance maps each slot to the turn (and message) that
+      last set it, planning is set once a turn asked for a trip
+    - each user turn's NLU entities are folded in with planner.merge_entities
+    - states live in an LRUCache; every change is written through with `save`, and a
+      session missing from the cache is read back with `load`
+    - a session with no stored state starts from `seed` (e.g. its latest plan's entities)
+    States returned are copies; change them only through update().
+    '''
+    def __init__(self, load: Callable[[str], Optional[Dict[str, Any]]], save: Callable[[str, Dict[str, Any]], Any],
+                 seed: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+                 max_entries: int = STATE_CACHE_ENTRIES, ttl: float = STATE_CACHE_TTL_S):
+        self._load, self._save, self._seed = load, save, seed
+        self._cache = LRUCache(max_entries)
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.writes = 0
+
+    def _get(self, session_id: str) -> Dict[str, Any]:
+        hit, state = self._cache.get(session_id)
+        if hit:
+            return state
+        self.loads += 1
+        state = self._load(session_id)
+        if state is None:
+            state = new_state()
+            seeded = self._seed(session_id) if self._seed else None
+            for k, v in merge_entities(None, seeded).items():
+                state["entities"][k] = v
+                state["provenance"][k] = {"turn": 0, "source": "plan"}
+            state["planning"] = bool(seeded)
+        self._cache.set(session_id, state, self._ttl)
+        return state
+
+    def get(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return copy.deepcopy(self._get(session_id))
+
+    def update(self, session_id: str, nlu: Dict[str, Any], text: Optional[str] = None) -> Dict[str, Any]:
+        '''
+        Fold one user turn into the session. Returns the new state plus "changed":
+        the slots this turn set, replaced or dropped (an empty list changes nothing and writes nothing).
+        '''
+        with self._lock:
+            prev = self._get(session_id)
+            entities = merge_entities(prev["entities"], nlu.get("entities"))
+            changed = sorted(k for k in set(entities) | set(prev["entities"])
+                             if entities.get(k) != prev["entities"].get(k))
+            planning = prev["planning"] or nlu.get("intent") == "plan_trip"
+            state = prev
+            if changed or planning != prev["planning"]:
+                turn = prev["turn"] + 1
+                at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+                provenance = {k: v for k, v in prev["provenance"].items() if k in entities}
+                for k in changed:
+                    if k in entities:
+                        provenance[k] = {"turn": turn, "source": "user", "text": text, "at": at}
+                state = {"entities": entities, "provenance": provenance, "turn": turn, "planning": planning}
+                self._save(session_id, state)   # write-through: the cache only holds what was stored
+                self.writes += 1
+                self._cache.set(session_id, state, self._ttl)
+            return dict(copy.deepcopy(state), changed=changed)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._cache.stats(), loads=self.loads, writes=self.writes)
+
+_default: Optional[DialogueStore] = None
+
+def get_dialogue_store() -> DialogueStore:
+    '''Process-wide store persisted in the sessions DB, created on first use.'''
+    global _default
+    if _default is None:
+        from models import get_dialogue_state, save_dialogue_state, get_latest_plan
+        _default = DialogueStore(
+            get_dialogue_state, save_dialogue_state,
+            # sessions from before the store existed carry on from their latest plan
+            seed=lambda sid: ((get_latest_plan(sid) or {}).get("meta") or {}).get("entities"))
+    return _default
@@ -0,0 +1,125 @@
+import os, time, threading, logging
+from typing import Any, Callable, Dict, Iterable, Optional
+import numpy as np
+
+logger = logging.getLogger("voyagerai.fx")
+
+FX_BASE = os.getenv("FX_BASE", "EUR")
+FX_REFRESH_S = float(os.getenv("FX_REFRESH_S", str(3600 * 12)))
+FX_RETRY_S = float(os.getenv("FX_RETRY_S", "300"))
+
+# value of one unit in INR; used in mock mode and whenever no live table could be loaded
+STATIC_INR_VALUE = {
+    "INR": 1.0, "USD": 83.0, "EUR": 90.0, "GBP": 105.0, "SGD": 62.0,
+    "AED": 22.6, "THB": 2.3, "JPY": 0.56, "AUD": 55.0, "LKR": 0.27,
+}
+
+class RateTable:
+    '''
+    One snapshot of exchange rates, stored as the value of one unit of each
+    currency in `base`. Any cross rate is value[frm] / value[to].
+    Unknown currencies are treated as 1:1 with the target (as the old static tables did).
+    '''
+    def __init__(self, base: str, value_in_base: Dict[str, float], as_of: Optional[str] = None,
+                 fetched_at: Optional[float] = None):
+        self.base = base.upper()
+        self.value = {k.upper(): float(v) for k, v in value_in_base.items()}
+        self.value[self.base] = 1.0
+        self.as_of = as_of
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    @classmethod
+    def from_provider(cls, payload: Dict[str, Any]) -> "RateTable":
+        '''Frankfurter-style payload: {"base": "EUR", "rates": {"INR": 90.1, ...}} (units per base).'''
+        rates = payload.get("rates") or {}
+        return cls(payload["base"], {c: 1.0 / r for c, r in rates.items() if r}, as_of=payload.get("date"))
+
+    def rate(self, frm: str, to: str) -> float:
+        frm, to = frm.upper(), to.upper()
+        if frm == to or frm not in self.value or to not in self.value:
+            return 1.0
+        return self.value[frm] / self.value[to]
+
+    def convert_many(self, amounts: Iterable[float], currencies: Iterable[str], to: str = "INR") -> np.ndarray:
+        '''Convert many (amount, currency) pairs to `to` in one vectorized multiply.'''
+        amounts = np.asarray(amounts, dtype=float)
+        codes = np.char.upper(np.asarray(list(currencies), dtype=str))
+        uniq, inv = np.unique(codes, return_inverse=True)
+        per_unit = np.array([self.rate(c, to) for c in uniq], dtype=float)
+        return amounts * per_unit[inv.reshape(amounts.shape)]
+
+STATIC_TABLE = RateTable("INR", STATIC_INR_VALUE, as_of="static")
+
+def _default_loader() -> Optional[Dict[str, Any]]:
+    # imported here: tools imports this module at load time
+    from tools import get_fx_table
+    return get_fx_table(FX_BASE)
+
+class FXEngine:
+    '''
+    Keeps one RateTable in memory and derives every pair from it, so conversions
+    never touch the network. The table is loaded on first use (from the tools
+    cache, or upstream once) and refreshed in a background thread once it is
+    older than `refresh_s`; readers keep the current table meanwhile. A failed
+    load keeps the old table (or the static one) and waits `retry_s` before the
+    next attempt.
+    '''
+    def __init__(self, loader: Callable[[], Optional[Dict[str, Any]]] = _default_loader,
+                 refresh_s: float = FX_REFRESH_S, retry_s: float = FX_RETRY_S):
+        self.loader = loader
+        self.refresh_s = refresh_s
+        self.retry_s = retry_s
+        self._table: Optional[RateTable] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._retry_at = 0.0
+
+    def _load(self) -> RateTable:
+        try:
+            payload = self.loader()
+            if payload and payload.get("rates"):
+                return RateTable.from_provider(payload)
+        except Exception:
+            logger.exception("fx table load failed")
+        self._retry_at = time.time() + self.retry_s
+        return self._table or STATIC_TABLE
+
+    def _refresh(self):
+        try:
+            self._table = self._load()
+        finally:
+            self._refreshing = False
+
+    def table(self) -> RateTable:
+        t = self._table
+        if t is None:
+            with self._lock:
+                if self._table is None:
+                    self._table = self._load()
+                return self._table
+        now = time.time()
+        # on the static fallback (first load failed) retry as soon as the backoff allows
+        due = t is STATIC_TABLE or now - t.fetched_at > self.refresh_s
+        if due and now >= self._retry_at and not self._refreshing:
+            with self._lock:
+                if self._refreshing:
+                    return t
+                self._refreshing = True
+            threading.Thread(target=self._refresh, name="fx-refresh", daemon=True).start()
+        return t
+
+    @property
+    def loaded(self) -> bool:
+        return self._table is not None
+
+    def rate(self, frm: str, to: str) -> float:
+        return self.table().rate(frm, to)
+
+    def convert(self, amount: float, frm: str, to: str) -> float:
+        return float(amount) * self.table().rate(frm, to)
+
+    def convert_many(self, amounts: Iterable[float], currencies: Iterable[str], to: str = "INR") -> np.ndarray:
+        return self.table().convert_many(amounts, currencies, to)
+
+# process-wide engine shared by tools and planner
+FX = FXEngine()
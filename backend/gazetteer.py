@@ -0,0 +1,183 @@
+import os, re, bisect
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.tsv")
+
+class Place(NamedTuple):
+    name: str
+    kind: str       # city | region | country
+    country: str
+    cc: str
+    lat: float
+    lon: float
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+def _norm(s: str) -> str:
+    return " ".join(_WORD.findall(s.lower()))
+
+class Gazetteer:
+    '''
+    Compact in-memory place index loaded from a bundled TSV.
+    - columns are parallel arrays (names, countries, lat/lon as array('d')) addressed by id
+    - every normalized name and alias maps to an id through one dict (exact / case-insensitive)
+    - a sorted key list answers prefix queries with bisect
+    - keys are bucketed by length for bounded edit-distance (fuzzy) lookups
+    - find_all scans a message once; multi-word spans are only tried after a token
+      that starts a multi-word name
+    '''
+    def __init__(self, path: str = GAZETTEER_PATH):
+        self.names: List[str] = []
+        self.kinds: List[str] = []
+        self.countries: List[str] = []
+        self.ccs: List[str] = []
+        self.lats = array("d")
+        self.lons = array("d")
+        self._by_key: Dict[str, int] = {}
+        self._exact: Dict[str, int] = {}
+        self._strict_keys = set()
+        self._load(path)
+        self._sorted_keys = sorted(self._by_key)
+        self._by_len: Dict[int, List[str]] = {}
+        for k in self._sorted_keys:
+            self._by_len.setdefault(len(k), []).append(k)
+        # first word -> longest multi-word key starting with it, so most tokens need one probe
+        self._span: Dict[str, int] = {}
+        for k in self._by_key:
+            n = k.count(" ") + 1
+            if n > 1:
+                first = k.split(" ", 1)[0]
+                self._span[first] = max(self._span.get(first, 1), n)
+
+    def _load(self, path: str):
+        interned: Dict[str, str] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                cols = line.rstrip("\n").split("\t")
+                name, kind, country, cc, lat, lon = cols[:6]
+                aliases = cols[6].split("|") if len(cols) > 6 and cols[6] else []
+                strict = len(cols) > 7 and cols[7] == "1"
+                pid = len(self.names)
+                self.names.append(name)
+                self.kinds.append(interned.setdefault(kind, kind))
+                self.countries.append(interned.setdefault(country, country))
+                self.ccs.append(interned.setdefault(cc, cc))
+                self.lats.append(float(lat))
+                self.lons.append(float(lon))
+                for key in [name] + aliases:
+                    self._exact.setdefault(key, pid)
+                    k = _norm(key)
+                    if k and k not in self._by_key:
+                        self._by_key[k] = pid
+                        # ambiguous words ("Nice", "Male") and short codes ("LA") only count when capitalized
+                        if strict or len(k) <= 2:
+                            self._strict_keys.add(k)
+
+    def __len__(self):
+        return len(self.names)
+
+    def place(self, pid: int) -> Place:
+        return Place(self.names[pid], self.kinds[pid], self.countries[pid], self.ccs[pid],
+                     self.lats[pid], self.lons[pid])
+
+    def exact(self, name: str) -> Optional[Place]:
+        '''Canonical name or alias exactly as stored (case-sensitive).'''
+        pid = self._exact.get(name.strip())
+        return None if pid is None else self.place(pid)
+
+    def lookup(self, name: str) -> Optional[Place]:
+        '''Case-insensitive name or alias.'''
+        pid = self._by_key.get(_norm(name))
+        return None if pid is None else self.place(pid)
+
+    def prefix(self, text: str, limit: int = 10) -> List[Place]:
+        p = _norm(text)
+        if not p:
+            return []
+        i = bisect.bisect_left(self._sorted_keys, p)
+        out, seen = [], set()
+        while i < len(self._sorted_keys) and self._sorted_keys[i].startswith(p) and len(out) < limit:
+            pid = self._by_key[self._sorted_keys[i]]
+            if pid not in seen:
+                seen.add(pid)
+                out.append(self.place(pid))
+            i += 1
+        return out
+
+    def fuzzy(self, text: str, max_dist: Optional[int] = None) -> Optional[Place]:
+        '''Closest name within a small edit distance (1 for short words, 2 otherwise).'''
+        q = _norm(text)
+        if not q:
+            return None
+        hit = self._by_key.get(q)
+        if hit is not None:
+            return self.place(hit)
+        d = max_dist if max_dist is not None else (1 if len(q) <= 5 else 2)
+        best, best_d = None, d + 1
+        for n in range(len(q) - d, len(q) + d + 1):
+            for k in self._by_len.get(n, ()):
+                if k in self._strict_keys:
+                    continue
+                dist = _bounded_edit_distance(q, k, best_d - 1)
+                if dist < best_d:
+                    best, best_d = k, dist
+        return None if best is None else self.place(self._by_key[best])
+
+    def geocode(self, name: str) -> Optional[Tuple[float, float]]:
+        p = self.lookup(name)
+        return (p.lat, p.lon) if p else None
+
+    def find_all(self, text: str, toks: Optional[List[Tuple[int, int, str]]] = None) -> List[Tuple[int, int, Place]]:
+        '''
+        All place mentions in `text` as (start, end, place), left to right,
+        preferring the longest name at each position ("New York City" over "New York").
+        `toks` are the message's word tokens as (start, end, lower-cased word) when
+        the caller has already tokenized it.
+        '''
+        if toks is None:
+            toks = [(m.start(), m.end(), m.group(0).lower()) for m in _WORD.finditer(text)]
+        out = []
+        i = 0
+        while i < len(toks):
+            matched = False
+            for n in range(min(self._span.get(toks[i][2], 1), len(toks) - i), 0, -1):
+                key = toks[i][2] if n == 1 else " ".join(t[2] for t in toks[i:i + n])
+                pid = self._by_key.get(key)
+                if pid is None:
+                    continue
+                start, end = toks[i][0], toks[i + n - 1][1]
+                if key in self._strict_keys and not text[start].isupper():
+                    continue
+                out.append((start, end, self.place(pid)))
+                i += n
+                matched = True
+                break
+            if not matched:
+                i += 1
+        return out
+
+def _bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    '''Levenshtein distance, giving up (returning limit + 1) once every cell in a row exceeds limit.'''
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+_default: Optional[Gazetteer] = None
+
+def get_gazetteer() -> Gazetteer:
+    '''Process-wide gazetteer, loaded on first use.'''
+    global _default
+    if _default is None:
+        _default = Gazetteer()
+    return _default
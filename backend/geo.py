@@ -0,0 +1,13 @@
+'''Pure geometry helpers, safe to import from anywhere (no I/O, no threads).'''
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_matrix_km(lats, lons) -> np.ndarray:
+    '''Full great-circle distance matrix in one vectorized pass.'''
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
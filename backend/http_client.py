@@ -0,0 +1,258 @@
+import os, time, random, asyncio, threading, logging, weakref
+from collections import deque
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("voyagerai.http")
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_S = float(os.getenv("HTTP_BACKOFF_S", "0.2"))
+CB_FAILURE_THRESHOLD = int(os.getenv("CB_FAILURE_THRESHOLD", "5"))
+CB_RESET_S = float(os.getenv("CB_RESET_S", "30"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.RequestException):
+    '''Raised without touching the network while a provider's breaker is open.'''
+
+class CircuitBreaker:
+    '''
+    closed -> open after `failure_threshold` consecutive failures.
+    open -> half_open once `reset_timeout` has passed; one trial request is let through.
+    half_open -> closed on success, back to open on failure.
+    '''
+    def __init__(self, failure_threshold: int = CB_FAILURE_THRESHOLD, reset_timeout: float = CB_RESET_S):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def abandon(self):
+        '''A call ended with no verdict (cancelled): give the half-open trial back.'''
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"   # opened_at is past the timeout, so the next call is the trial
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("circuit opened after %d failures", self.failures)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+class ProviderStats:
+    def __init__(self, window: int = 512):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuits = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self._latencies.append(latency_ms)
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latencies)
+            out = {"requests": self.requests, "errors": self.errors, "retries": self.retries,
+                   "short_circuits": self.short_circuits}
+        if lat:
+            out["latency_ms_p50"] = round(lat[len(lat) // 2], 1)
+            out["latency_ms_p95"] = round(lat[min(int(len(lat) * 0.95), len(lat) - 1)], 1)
+            out["latency_ms_max"] = round(lat[-1], 1)
+        return out
+
+def backoff_delay(attempt: int, base: float = HTTP_BACKOFF_S, cap: float = 5.0) -> float:
+    # "full jitter": uniform in [0, base * 2^attempt]
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class ProviderClient:
+    '''
+    One keep-alive connection pool per upstream provider, with retries
+    (jittered exponential backoff), a circuit breaker and latency/error counters.
+    While the breaker is open calls raise CircuitOpenError immediately, so tool
+    functions drop straight to their cached or fallback value.
+    '''
+    def __init__(self, name: str, pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES,
+                 backoff: float = HTTP_BACKOFF_S, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = ProviderStats()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if not self.breaker.allow():
+            self.stats.count("short_circuits")
+            raise CircuitOpenError(f"{self.name}: circuit open")
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.stats.observe((time.perf_counter() - t0) * 1000, ok=False)
+                if attempt < self.retries:
+                    attempt += 1
+                    self.stats.count("retries")
+                    time.sleep(backoff_delay(attempt, self.backoff))
+                    continue
+                self.breaker.record_failure()
+                raise
+            except Exception:
+                # anything else (a broken chunked body, a bad URL) still gets a verdict,
+                # or a half-open breaker would wait for its trial forever
+                self.stats.observe((time.perf_counter() - t0) * 1000, ok=False)
+                self.breaker.record_failure()
+                raise
+            self.stats.observe((time.perf_counter() - t0) * 1000, ok=r.status_code < 400)
+            if r.status_code in RETRY_STATUS and attempt < self.retries:
+                attempt += 1
+                self.stats.count("retries")
+                time.sleep(backoff_delay(attempt, self.backoff))
+                continue
+            if r.status_code == 429 or r.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                # 4xx other than 429 is a bad request, not a provider outage
+                self.breaker.record_success()
+            r.raise_for_status()
+            return r
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+class AsyncProviderClient:
+    '''
+    asyncio twin of ProviderClient backed by httpx.AsyncClient. It shares the
+    breaker and counters of the sync client for the same provider, so an outage
+    seen by either path fails fast on both.
+    '''
+    def __init__(self, sync_client: ProviderClient, pool_size: int = HTTP_POOL_SIZE):
+        import httpx  # only needed by the async tools surface
+        self._httpx = httpx
+        self.name = sync_client.name
+        self.retries = sync_client.retries
+        self.backoff = sync_client.backoff
+        self.breaker = sync_client.breaker
+        self.stats = sync_client.stats
+        self.client = httpx.AsyncClient(limits=httpx.Limits(max_connections=pool_size,
+                                                             max_keepalive_connections=pool_size))
+
+    async def request(self, method: str, url: str, **kwargs):
+        if not self.breaker.allow():
+            self.stats.count("short_circuits")
+            raise CircuitOpenError(f"{self.name}: circuit open")
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                r = await self.client.request(method, url, **kwargs)
+            except self._httpx.TransportError:
+                self.stats.observe((time.perf_counter() - t0) * 1000, ok=False)
+                if attempt < self.retries:
+                    attempt += 1
+                    self.stats.count("retries")
+                    await asyncio.sleep(backoff_delay(attempt, self.backoff))
+                    continue
+                self.breaker.record_failure()
+                raise
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception:
+                self.stats.observe((time.perf_counter() - t0) * 1000, ok=False)
+                self.breaker.record_failure()
+                raise
+            self.stats.observe((time.perf_counter() - t0) * 1000, ok=r.status_code < 400)
+            if r.status_code in RETRY_STATUS and attempt < self.retries:
+                attempt += 1
+                self.stats.count("retries")
+                await asyncio.sleep(backoff_delay(attempt, self.backoff))
+                continue
+            if r.status_code == 429 or r.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            r.raise_for_status()
+            return r
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+_clients: Dict[str, ProviderClient] = {}
+_clients_lock = threading.Lock()
+
+def get_client(name: str) -> ProviderClient:
+    '''Shared client for a provider (created on first use).'''
+    c = _clients.get(name)
+    if c is None:
+        with _clients_lock:
+            c = _clients.get(name)
+            if c is None:
+                c = _clients[name] = ProviderClient(name)
+    return c
+
+# httpx connections belong to the loop that opened them, so async clients are kept per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncProviderClient]]" = weakref.WeakKeyDictionary()
+
+def get_async_client(name: str) -> AsyncProviderClient:
+    '''Shared async client for a provider on the running event loop.'''
+    loop = asyncio.get_running_loop()
+    per_loop = _async_clients.get(loop)
+    if per_loop is None:
+        per_loop = _async_clients[loop] = {}
+    c = per_loop.get(name)
+    if c is None:
+        c = per_loop[name] = AsyncProviderClient(get_client(name))
+    return c
+
+async def aclose_async_clients():
+    loop = asyncio.get_running_loop()
+    for c in _async_clients.pop(loop, {}).values():
+        await c.aclose()
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: dict(c.stats.snapshot(), circuit=c.breaker.state) for name, c in list(_clients.items())}
@@ -0,0 +1,128 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# one alternation tokenizes a message: numbers ("20,000", "1.2"), words (same as the
+# gazetteer's _WORD, so both see identical word tokens) and single symbols ("₹", "$", "→", "->")
+_TOKEN = re.compile(r"(?P<num>\d+(?:,\d+)*(?:\.\d+)?)|(?P<word>[^\W\d_]+)|(?P<sym>->|=>|[^\w\s])", re.UNICODE)
+
+class Token(NamedTuple):
+    start: int
+    end: int
+    kind: str    # num | word | sym
+    text: str    # as written
+    norm: str    # lower-cased word, number without separators, symbol as is
+
+_new_token = tuple.__new__
+
+def tokenize(text: str) -> List[Token]:
+    out = []
+    append = out.append
+    for m in _TOKEN.finditer(text):
+        kind = m.lastgroup
+        s = m.group()
+        if kind == "word":
+            norm = s.lower()
+        elif kind == "num" and "," in s:
+            norm = s.replace(",", "")
+        else:
+            norm = s
+        start, end = m.span()
+        # tuple.__new__ skips NamedTuple's keyword handling; this runs once per token of every message
+        append(_new_token(Token, (start, end, kind, s, norm)))
+    return out
+
+class Tag(NamedTuple):
+    kind: str    # e.g. interest | intent | currency | month
+    value: str
+
+class Match(NamedTuple):
+    i: int       # first token index (into the full token list)
+    j: int       # one past the last token index
+    tags: Tuple[Tag, ...]
+
+def forms(word: str) -> List[str]:
+    '''The word plus its regular plural/singular ("beach"/"beaches", "museums"/"museum", "family"/"families").'''
+    out = [word]
+    if word.endswith("ies"):
+        out.append(word[:-3] + "y")
+    elif word.endswith(("ches", "shes", "sses", "xes")):
+        out.append(word[:-2])
+    elif word.endswith("s") and not word.endswith("ss"):
+        out.append(word[:-1])
+    elif word.endswith("y") and word[-2:-1] not in "aeiou":
+        out.append(word[:-1] + "ies")
+    elif word.endswith(("ch", "sh", "ss", "x")):
+        out.append(word + "es")
+    else:
+        out.append(word + "s")
+    return out
+
+class Lexicon:
+    '''
+    Keyword tables for the NLU compiled into one phrase index, matched over a
+    tokenized message in a single left-to-right pass.
+    - a phrase is a sequence of words or symbols; it maps to one or more tags
+    - phrases are keyed by their space-joined tokens in one dict, and each first
+      token remembers the longest phrase it starts, so a token costs one or two
+      probes however many phrases are registered
+    - the longest phrase wins at each position ("no visa needed" over "no visa")
+    '''
+    def __init__(self):
+        self._by_key: Dict[str, Tuple[Tag, ...]] = {}
+        self._span: Dict[str, int] = {}
+
+    def add(self, phrase: str, kind: str, value: Optional[str] = None, inflect: bool = False):
+        '''Register `phrase` (and its plural/singular when `inflect`, for one-word phrases) under Tag(kind, value or phrase).'''
+        toks = [t.norm for t in tokenize(phrase)]
+        if not toks:
+            return
+        keys = forms(toks[0]) if inflect and len(toks) == 1 else [toks[0]]
+        tag = Tag(kind, value if value is not None else phrase)
+        for first in keys:
+            key = " ".join([first] + toks[1:])
+            tags = self._by_key.get(key, ())
+            if tag not in tags:
+                self._by_key[key] = tags + (tag,)
+            self._span[first] = max(self._span.get(first, 1), len(toks))
+
+    def add_all(self, phrases: Iterable[str], kind: str, value: Optional[str] = None, inflect: bool = False):
+        for p in phrases:
+            self.add(p, kind, value, inflect)
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def match(self, toks: List[Token]) -> List[Match]:
+        '''Tagged phrases in token order; words of a phrase may be joined by '-' or spaces ("visa-free").'''
+        by_key, span = self._by_key, self._span
+        out = []
+        k, n_toks = 0, len(toks)
+        while k < n_toks:
+            first = toks[k][4]
+            longest = span.get(first)
+            if longest is None:
+                k += 1
+                continue
+            hit = None
+            if longest > 1:
+                # phrases skip hyphens between their words, so "visa-free" reads as "visa free"
+                idx = [k]
+                j = k + 1
+                while j < n_toks and len(idx) < longest:
+                    if toks[j][4] != "-":
+                        idx.append(j)
+                    j += 1
+                for n in range(len(idx), 1, -1):
+                    tags = by_key.get(" ".join(toks[x][4] for x in idx[:n]))
+                    if tags is not None:
+                        hit = Match(k, idx[n - 1] + 1, tags)
+                        break
+            if hit is None:
+                tags = by_key.get(first)
+                hit = Match(k, k + 1, tags) if tags is not None else None
+            if hit is None:
+                k += 1
+            else:
+                out.append(hit)
+                k = hit.j
+        return out
@@ -1,4 +1,4 @@
-import os
+import os, json
 import requests
 from openai import OpenAI
 
@@ -88,6 +88,63 @@ class LLMWrapper:
         # --- Fallback for Invalid Configuration ---
         return "[ERROR] Invalid LLM backend or missing API key."
 
+    def chat_stream(self, query: str):
+        """
+        Like chat(), but yields the response in pieces as the backend produces them.
+
+        Args:
+            query (str): The text query to send to the LLM.
+
+        Yields:
+            str: Consecutive chunks of the response; joined they equal what chat() returns.
+        """
+        # --- Stub Backend: the simulated response, word by word ---
+        if self.backend == "stub":
+            text = f"[STUB] You asked: {query}\nThis is a simulated response."
+            for i, word in enumerate(text.split(" ")):
+                yield word if i == 0 else " " + word
+            return
+
+        # --- OpenAI Backend: chat completion with stream=True ---
+        if self.backend == "openai" and self.api_key:
+            try:
+                client = OpenAI(api_key=self.api_key)
+                stream = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[{"role": "user", "content": query}],
+                    temperature=0.3,
+                    stream=True,
+                )
+                for chunk in stream:
+                    # Each chunk carries a delta; the last one has no content.
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            except Exception as e:
+                yield f"[ERROR] OpenAI call failed: {e}"
+            return
+
+        # --- Ollama Backend: one JSON object per line while generating ---
+        if self.backend == "ollama":
+            try:
+                payload = {"model": "llama3", "prompt": query, "stream": True}
+                with requests.post(f"{self.ollama_base}/api/generate", json=payload, stream=True, timeout=60) as r:
+                    r.raise_for_status()
+                    for line in r.iter_lines():
+                        if not line:
+                            continue
+                        part = json.loads(line)
+                        if part.get("response"):
+                            yield part["response"]
+                        if part.get("done"):
+                            break
+            except Exception as e:
+                yield f"[ERROR] Ollama call failed: {e}"
+            return
+
+        # --- Fallback for Invalid Configuration ---
+        yield "[ERROR] Invalid LLM backend or missing API key."
+
 if __name__ == '__main__':
     # This is an example of how to use the LLMWrapper class.
     # Set the environment variable before running this script:
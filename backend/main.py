@@ -1,15 +1,22 @@
 import logging
 import os
 import uvicorn
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 # Use a non-relative import for your internal modules.
 # This assumes that 'llm_interface', 'tools', and 'planner'
 # are at the same level as 'main.py' in the 'backend' directory.
 from llm_interface import LLMWrapper
 from tools import get_pois, get_city_geocode, get_weather, get_route, convert_currency, get_country_info, get_public_holidays, TOOL_MODE
-from planner import plan_itinerary
+from tools import aget_pois, aget_city_geocode, aget_weather, aget_route, aconvert_currency, aget_country_info, aget_public_holidays
+from tools import cache_stats
+from http_client import aclose_async_clients
+from planner import plan_itinerary, plan_cache_stats
+from nlu import parse_cached, parse_many, nlu_cache_stats
+from session_api import router as session_router
+from dialogue_state import get_dialogue_store
 
 # Load environment variables.
 from dotenv import load_dotenv
@@ -47,14 +54,72 @@ def read_root():
     return {"service": "voyagerai-backend", "status": "ok", "llm_backend": llm_wrapper.backend}
 
 
-# A temporary endpoint to fix the JSON decode error on the frontend.
-@app.post("/session/new")
-def new_session():
-    """
-    A temporary endpoint to simulate a new session.
-    This is to fix the JSONDecodeError on the frontend.
-    """
-    return {"session_id": "dummy-session-id", "message": "New session created."}
+# Cache and provider metrics (tool cache, upstream providers, plan memoization).
+@app.get("/stats")
+def stats():
+    return {"tools": cache_stats(), "plans": plan_cache_stats(), "nlu": nlu_cache_stats(),
+            "dialogue": get_dialogue_store().stats()}
+
+
+# Provider tools. Handlers await the async tools surface, so a slow provider
+# only parks its own request instead of blocking the event loop.
+@app.get("/tools/geocode")
+async def tool_geocode(city: str):
+    coords = await aget_city_geocode(city)
+    if coords is None:
+        raise HTTPException(status_code=404, detail=f"unknown place: {city}")
+    return {"city": city, "lat": coords[0], "lon": coords[1]}
+
+
+@app.get("/tools/pois")
+async def tool_pois(city: str, radius_m: int = 10000, limit: int = 30):
+    return {"city": city, "pois": await aget_pois(city, radius_m, limit)}
+
+
+@app.get("/tools/weather")
+async def tool_weather(lat: float, lon: float, start_date: str, end_date: str):
+    return await aget_weather(lat, lon, start_date, end_date)
+
+
+@app.get("/tools/route")
+async def tool_route(lat1: float, lon1: float, lat2: float, lon2: float):
+    return await aget_route(lat1, lon1, lat2, lon2)
+
+
+@app.get("/tools/currency")
+async def tool_currency(amount: float, frm: str, to: str):
+    return dict(await aconvert_currency(amount, frm, to), amount=amount, frm=frm.upper(), to=to.upper())
+
+
+@app.get("/tools/country")
+async def tool_country(name: str):
+    return await aget_country_info(name)
+
+
+@app.get("/tools/holidays")
+async def tool_holidays(country_code: str, year: int):
+    return {"country_code": country_code.upper(), "year": year, "holidays": await aget_public_holidays(country_code, year)}
+
+
+NLU_BATCH_MAX = int(os.getenv("NLU_BATCH_MAX", "100000"))
+
+# Parse one message (tests/eval_nlu.py calls this).
+@app.get("/nlu/parse")
+def nlu_parse(text: str):
+    return parse_cached(text)
+
+
+# Parse a batch of messages (log replays): results in input order with per-item timing.
+@app.post("/nlu/batch")
+def nlu_batch(texts: list = Body(..., embed=True), processes: int = Body(0, embed=True)):
+    if len(texts) > NLU_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"at most {NLU_BATCH_MAX} texts per batch")
+    processes = max(0, min(processes, os.cpu_count() or 1))
+    return parse_many([str(t) for t in texts], processes=processes)
+
+
+# Persistent sessions: /session/new, /session/{id}/message (+ /stream), history and latest plan.
+app.include_router(session_router)
 
 
 # This is your main chat endpoint.
@@ -64,11 +129,17 @@ async def chat_with_session(session_id: str, prompt: str = Body(..., embed=True)
     Handles chat interactions with a specific session.
     """
     # Use the LLM wrapper to get a response.
-    # We will expand on the logic here later.
-    response = llm_wrapper.chat(prompt)
+    # The wrapper is blocking, so keep it off the event loop.
+    response = await run_in_threadpool(llm_wrapper.chat, prompt)
     return {"session_id": session_id, "message": response}
 
 
+# Close the async provider clients (httpx connection pools) on shutdown.
+@app.on_event("shutdown")
+async def close_provider_clients():
+    await aclose_async_clients()
+
+
 # This is the main entry point for the application.
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8080)))
@@ -27,6 +27,11 @@ class Itinerary(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     plan_json: str = ""  # serialized plan
 
+class DialogueState(SQLModel, table=True):
+    session_id: str = Field(primary_key=True)
+    turn: int = 0
+    state_json: str = ""  # serialized dialogue state: merged slots + per-slot provenance
+
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     SQLModel.metadata.create_all(engine)
@@ -79,3 +84,18 @@ def get_messages(session_id: str):
             meta = json.loads(r.meta) if r.meta else None
             out.append({"role": r.role, "text": r.text, "created_at": r.created_at.isoformat(), "meta": meta})
         return out
+
+def get_dialogue_state(session_id: str):
+    with Session(engine) as db:
+        res = db.get(DialogueState, session_id)
+        if res:
+            return json.loads(res.state_json)
+    return None
+
+def save_dialogue_state(session_id: str, state: dict):
+    with Session(engine) as db:
+        row = db.get(DialogueState, session_id) or DialogueState(session_id=session_id)
+        row.turn = state.get("turn", 0)
+        row.state_json = json.dumps(state, ensure_ascii=False)
+        db.add(row)
+        db.commit()
@@ -0,0 +1,143 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from gazetteer import get_gazetteer
+from geo import haversine_matrix_km
+
+EXACT_MAX_CITIES = 10            # Held-Karp up to here, heuristic beyond
+VALUE_OF_TIME_INR_PER_MIN = 10   # how much an hour on the road is worth when ranking orders
+GROUND_MAX_KM = 400              # shorter hops go by road/rail, longer ones fly
+
+# rough modes: (INR base, INR per km, minutes overhead, km per hour)
+GROUND = (300, 3.0, 30, 50)
+AIR = (2500, 4.0, 150, 700)
+UNKNOWN_LEG = (8000, 480)        # no coordinates: the planner's old flat fallback, about a day of travel
+
+class Leg(NamedTuple):
+    frm: str
+    to: str
+    mode: str
+    km: Optional[float]
+    cost_inr: int
+    minutes: int
+
+def leg_matrix(places: Sequence[str], known_fares: Optional[Dict[Tuple[str, str], int]] = None):
+    '''
+    Pairwise (cost INR, minutes, mode, km) between places. Distances come from the
+    gazetteer; a non-zero fare listed in `known_fares` (either direction) overrides the estimate.
+    '''
+    n = len(places)
+    g = get_gazetteer()
+    pts = [g.geocode(p) for p in places]
+    known = [i for i, p in enumerate(pts) if p is not None]
+    km = np.full((n, n), np.nan)
+    if known:
+        sub = haversine_matrix_km([pts[i][0] for i in known], [pts[i][1] for i in known])
+        km[np.ix_(known, known)] = sub
+    cost = np.zeros((n, n))
+    minutes = np.zeros((n, n))
+    mode = np.full((n, n), "ground", dtype=object)
+    fares = known_fares or {}
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                continue
+            d = km[i, j]
+            if np.isnan(d):
+                cost[i, j], minutes[i, j] = UNKNOWN_LEG
+                mode[i, j] = "unknown"
+            else:
+                base, per_km, overhead, speed = AIR if d > GROUND_MAX_KM else GROUND
+                mode[i, j] = "air" if d > GROUND_MAX_KM else "ground"
+                cost[i, j] = base + per_km * d
+                minutes[i, j] = overhead + d / speed * 60
+            fare = fares.get((places[i], places[j]), fares.get((places[j], places[i])))
+            if fare:   # 0 in the fare table means "no flight", not a free leg
+                cost[i, j] = fare
+    return cost, minutes, mode, km
+
+def held_karp(w: np.ndarray, start: Optional[int] = None) -> Tuple[float, List[int]]:
+    '''
+    Exact cheapest open path through every node of `w` (asymmetric weights),
+    starting at `start` or anywhere. One vectorized relaxation per subset.
+    '''
+    n = w.shape[0]
+    full = 1 << n
+    dp = np.full((full, n), np.inf)
+    parent = np.full((full, n), -1, dtype=np.int64)
+    starts = [start] if start is not None else range(n)
+    for s in starts:
+        dp[1 << s, s] = 0.0
+    bits = 1 << np.arange(n)
+    for mask in range(1, full):
+        row = dp[mask]
+        if not np.isfinite(row).any():
+            continue
+        # best way to reach each k from some j in mask
+        cand = row[:, None] + w
+        j_best = np.argmin(cand, axis=0)
+        val = cand[j_best, np.arange(n)]
+        ks = np.flatnonzero((mask & bits) == 0)
+        nms = mask | bits[ks]
+        better = val[ks] < dp[nms, ks]
+        dp[nms[better], ks[better]] = val[ks][better]
+        parent[nms[better], ks[better]] = j_best[ks][better]
+    last = int(np.argmin(dp[full - 1]))
+    best = float(dp[full - 1, last])
+    order, mask = [], full - 1
+    while last >= 0:
+        order.append(last)
+        prev = int(parent[mask, last])
+        mask ^= 1 << last
+        last = prev
+    return best, order[::-1]
+
+def path_cost(order: Sequence[int], w: np.ndarray) -> float:
+    return float(sum(w[a, b] for a, b in zip(order, order[1:])))
+
+def heuristic_order(w: np.ndarray, start: Optional[int] = None) -> Tuple[float, List[int]]:
+    '''Nearest neighbour from the start (or every node), then 2-opt reversals scored on the asymmetric weights.'''
+    n = w.shape[0]
+    best, best_cost = None, np.inf
+    for s in ([start] if start is not None else range(n)):
+        order, left = [s], set(range(n)) - {s}
+        while left:
+            nxt = min(left, key=lambda k: w[order[-1], k])
+            order.append(nxt)
+            left.discard(nxt)
+        c = path_cost(order, w)
+        if c < best_cost:
+            best, best_cost = order, c
+    lo = 1 if start is not None else 0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(lo, n - 1):
+            for j in range(i + 1, n):
+                cand = best[:i] + best[i:j + 1][::-1] + best[j + 1:]
+                c = path_cost(cand, w)
+                if c < best_cost - 1e-9:
+                    best, best_cost, improved = cand, c, True
+    return best_cost, best
+
+def order_cities(w: np.ndarray, start: Optional[int] = None) -> Tuple[float, List[int], str]:
+    '''Visiting order minimizing total weight: exact up to EXACT_MAX_CITIES stops, heuristic beyond.'''
+    n = w.shape[0]
+    if n <= 1:
+        return 0.0, list(range(n)), "exact"
+    stops = n - (1 if start is not None else 0)
+    if stops <= EXACT_MAX_CITIES:
+        c, o = held_karp(w, start)
+        return c, o, "exact"
+    c, o = heuristic_order(w, start)
+    return c, o, "heuristic"
+
+def allocate_days(n_days: int, weights: Sequence[float]) -> List[int]:
+    '''Largest-remainder split of n_days by weight, at least one day per city (n_days >= len(weights)).'''
+    k = len(weights)
+    w = np.asarray([max(x, 1e-9) for x in weights], dtype=float)
+    extra = n_days - k
+    share = w / w.sum() * extra
+    days = np.floor(share).astype(int)
+    for i in np.argsort(-(share - days), kind="stable")[:extra - int(days.sum())]:
+        days[i] += 1
+    return (days + 1).tolist()
@@ -1,153 +1,254 @@
-import re, math
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-import dateutil.parser as dateparser
+import os, time, threading, multiprocessing
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from cache import LRUCache
+from gazetteer import get_gazetteer
+from dates import MONTHS, extract as extract_dates, iso_shaped
+from lexicon import Lexicon, Tag, Token, tokenize
 
 CURRENCY_ALIASES = {
-    "₹": "INR", "rs": "INR", "inr": "INR",
-    "$": "USD", "usd": "USD",
-    "eur": "EUR", "€": "EUR",
+    "₹": "INR", "rs": "INR", "inr": "INR", "rupee": "INR", "rupees": "INR",
+    "$": "USD", "usd": "USD", "dollar": "USD", "dollars": "USD",
+    "eur": "EUR", "€": "EUR", "euro": "EUR", "euros": "EUR",
 }
 
+AMOUNT_SCALES = {
+    "k": 1_000, "thousand": 1_000,
+    "lakh": 100_000, "lakhs": 100_000, "lac": 100_000,
+    "crore": 10_000_000, "crores": 10_000_000,
+    "m": 1_000_000, "million": 1_000_000,
+}
+
+# a number right after one of these is a budget even without a currency
+BUDGET_CUES = ["under", "below", "within", "budget", "upto", "up to", "max", "less than"]
+
 INTERESTS = [
     "beach","museums","food","nightlife","hiking","history","nature",
     "shopping","adventure","romantic","family","wildlife","architecture",
     "waterfalls","temples","cafes","photography"
 ]
 
+# other words for an interest; plurals of both are matched too
+INTEREST_SYNONYMS = {
+    "nightlife": ["party", "parties", "club", "clubbing"],
+    "history": ["heritage", "fort", "historic", "historical", "monument"],
+    "hiking": ["trek", "trekking", "hike"],
+    "food": ["foodie", "seafood", "cuisine"],
+}
+
 DEST_HINT_WORDS = ["to","for","in","at","around","near","visiting","visit","trip to"]
 
+# phrases per intent, first intent with a match wins; besides these,
+# "plan ... trip" and "<n>-day" read as plan_trip and "under <n>" as budget_focus
 INTENTS = {
     "plan_trip": [
-        r"plan.*trip", r"itinerary", r"travel plan", r"3[- ]?day", r"week(end)?"
+        "itinerary", "travel plan", "week", "weekend"
     ],
     "ask_visa_free": [
-        r"visa[- ]?free", r"no visa needed", r"without visa"
+        "visa free", "visafree", "no visa needed", "without visa"
     ],
     "budget_focus": [
-        r"under\s*\d+", r"budget", r"cost", r"cheapest", r"low cost"
+        "budget", "cost", "costly", "cheapest", "low cost"
     ]
 }
 
-def _detect_intent(text: str) -> str:
-    t = text.lower()
-    for intent, pats in INTENTS.items():
-        for p in pats:
-            if re.search(p, t):
-                return intent
+VISA_FREE = ["visa free", "visafree", "without visa", "no visa", "no visa needed"]
+
+ROUTE_ARROWS = ["→", "->", "⇒", "=>"]
+
+def _build_lexicon() -> Lexicon:
+    lex = Lexicon()
+    for intent, phrases in INTENTS.items():
+        lex.add_all(phrases, "intent", intent, inflect=True)
+    lex.add_all(["plan", "planning"], "cue", "plan", inflect=True)
+    lex.add("trip", "cue", "trip", inflect=True)
+    lex.add_all(["day", "night"], "cue", "day", inflect=True)
+    lex.add_all(VISA_FREE, "visa_free", "1")
+    for i in INTERESTS:
+        lex.add(i, "interest", i, inflect=True)
+    for i, words in INTEREST_SYNONYMS.items():
+        lex.add_all(words, "interest", i, inflect=True)
+    for alias, code in CURRENCY_ALIASES.items():
+        lex.add(alias, "currency", code)
+    for w in AMOUNT_SCALES:
+        lex.add(w, "scale", w)
+    lex.add_all(BUDGET_CUES, "budget_cue", "1")
+    for m, n in MONTHS.items():
+        lex.add(m, "month", str(n))
+    lex.add_all(ROUTE_ARROWS, "arrow", "1")
+    return lex
+
+# every keyword table above, compiled once
+_LEXICON = _build_lexicon()
+
+class _Tagged:
+    '''A message tokenized and matched against _LEXICON once; every extractor reads from this.'''
+    __slots__ = ("text", "toks", "matches", "at", "by_kind")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.toks: List[Token] = tokenize(text)
+        self.matches = _LEXICON.match(self.toks)
+        self.at: Dict[int, Tuple[Tag, ...]] = {}          # token index -> tags of the phrase covering it
+        self.by_kind: Dict[str, List[str]] = {}           # tag kind -> values in message order
+        for m in self.matches:
+            for k in range(m.i, m.j):
+                self.at[k] = m.tags
+            for t in m.tags:
+                self.by_kind.setdefault(t.kind, []).append(t.value)
+
+    def tag(self, k: int, kind: str) -> Optional[str]:
+        '''Value of the `kind` tag on token k, if any (out-of-range k is fine).'''
+        for t in self.at.get(k, ()):
+            if t.kind == kind:
+                return t.value
+        return None
+
+    def values(self, kind: str) -> List[str]:
+        return self.by_kind.get(kind, [])
+
+    def prev(self, k: int) -> int:
+        '''Index of the token before k, reading "3-day" as "3 day".'''
+        k -= 1
+        while k >= 0 and self.toks[k].norm == "-":
+            k -= 1
+        return k
+
+def _detect_intent(m: _Tagged) -> str:
+    found = set(m.values("intent"))
+    plan_seen = False
+    toks = m.toks
+    for ph in m.matches:
+        for t in ph.tags:
+            if t.kind == "cue":
+                if t.value == "plan":
+                    plan_seen = True
+                elif t.value == "trip" and plan_seen:
+                    found.add("plan_trip")
+                elif t.value == "day" and m.prev(ph.i) >= 0 and toks[m.prev(ph.i)].kind == "num":
+                    found.add("plan_trip")
+            elif t.kind == "budget_cue" and ph.j < len(toks) and toks[ph.j].kind == "num":
+                found.add("budget_focus")
+    for intent in INTENTS:
+        if intent in found:
+            return intent
     # default
     return "plan_trip"
 
-def _extract_currency_amount(text: str):
-    t = text.lower().replace(",","")
-    # patterns like ₹20000, rs 30k, 1.2 lakh, $500, 800 usd
-    # handle lakh/crore rough conversions
-    m = re.search(r"(₹|rs\.?|inr|\$|usd|eur|€)?\s*(\d+(?:\.\d+)?)\s*(k|thousand|lakh|lac|crore|m)?", t)
-    if not m:
+def _extract_currency_amount(m: _Tagged):
+    # amounts like ₹20000, rs 30k, 1.2 lakh, $500, 800 usd, under 25000;
+    # a number with a currency beats one after a budget word, which beats a bare large number
+    best = None
+    toks = m.toks
+    for k, tok in enumerate(toks):
+        if tok.kind != "num" or any(iso_shaped(toks, x) for x in (k, k - 2, k - 4) if x >= 0):
+            continue   # parts of 2026-10-12 are never an amount
+        amt = float(tok.norm)
+        nxt = k + 1
+        scale = m.tag(nxt, "scale")
+        if scale:
+            amt *= AMOUNT_SCALES[scale]
+            nxt += 1
+        cur = m.tag(nxt, "currency")
+        p = k - 1
+        if p >= 0 and toks[p].norm == ".":
+            p -= 1   # "rs. 500"
+        if cur is None:
+            cur = m.tag(p, "currency")
+            if cur:
+                p -= 1
+        if cur:
+            score = 3
+        elif m.tag(p, "budget_cue"):
+            score = 2
+        elif scale:
+            score = 1
+        elif amt >= 1000 and not (m.tag(nxt, "cue") or m.tag(nxt, "month") or m.tag(k - 1, "month")):
+            score = 0
+        else:
+            continue
+        if best is None or score > best[0]:
+            best = (score, amt, cur)
+    if best is None:
         return None
-    cur_raw, num, scale = m.groups()
-    cur = None
-    if cur_raw:
-        cur = CURRENCY_ALIASES.get(cur_raw.strip(), None)
-        if not cur:
-            cur = cur_raw.strip().upper().replace(".","")
-    amt = float(num)
-    if scale:
-        s = scale.lower()
-        if s in ["k","thousand"]:
-            amt *= 1_000
-        elif s in ["lakh","lac"]:
-            amt *= 100_000
-        elif s in ["crore"]:
-            amt *= 10_000_000
-        elif s in ["m"]:
-            amt *= 1_000_000
+    _, amt, cur = best
     return {"amount": round(amt, 2), "currency": cur or "INR"}
 
 
-def _extract_dates(text: str):
-    # Default month references to the CURRENT YEAR (as per project decision)
-    from datetime import datetime
-    import re
-    import dateutil.parser as dateparser
-    cur_year = datetime.now().year
-    t = text
-
-    # normalize 'to' -> hyphen for ranges like "12 to 15 Oct"
-    t = re.sub(r"(\d{1,2})\s*(to|-)\s*(\d{1,2})", r"\1-\3", t, flags=re.I)
-
-    start = end = None
-    try:
-        months = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june|july|august|september|october|november|december)"
-        rng = re.search(rf"(\d{{1,2}})[\s-]*(\d{{1,2}})?\s*({months})", t, flags=re.I)
-        if rng:
-            d1 = f"{rng.group(1)} {rng.group(3)} {cur_year}"
-            start = dateparser.parse(d1, fuzzy=True, dayfirst=True)
-            if rng.group(2):
-                d2 = f"{rng.group(2)} {rng.group(3)} {cur_year}"
-                end = dateparser.parse(d2, fuzzy=True, dayfirst=True)
-        else:
-            single = re.search(rf"(\d{{1,2}}\s*{months})", t, flags=re.I)
-            if single:
-                d1 = f"{single.group(0)} {cur_year}"
-                start = dateparser.parse(d1, fuzzy=True, dayfirst=True)
-    except Exception:
-        pass
-
-    # duration: '3 days', 'a week', '5-day'
-    dur = None
-    md = re.search(r"(\d+)\s*(day|days|night|nights)", t, flags=re.I)
-    if md:
-        dur = int(md.group(1))
-    else:
-        if re.search(r"week(end)?", t, flags=re.I):
-            dur = 2
-
-    out = {}
-    if start: out["start_date"] = start.date().isoformat()
-    if end: out["end_date"] = end.date().isoformat()
-    if dur: out["n_days"] = dur
-    return out if out else None
-
-
-def _extract_places(text: str):
-    # lightweight heuristic: look for 'to|in <Word(/Word)>' capturing capitalized tokens
-    # also allow common Indian destinations
-    common = ["goa","manali","lonavala","jaipur","kerala","ladakh","mumbai",
-              "delhi","bangkok","bali","sri lanka","maldives","singapore",
-              "dubai","paris","london","tokyo","new york","paris"]
-    t = text
-    # capture after prepositions
-    m = re.search(r"\b(to|in|for|at)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)", t)
-    dest = None
-    if m:
-        dest = m.group(2)
-    # lower-case scan for common
-    for c in common:
-        if c in t.lower():
-            dest = c.title()
-    # origin mention: 'from Mumbai'
-    o = re.search(r"\bfrom\s+([A-Z][a-zA-Z]+)", t)
-    origin = o.group(1) if o else None
-    return {"destination": dest, "origin": origin}
-
-def _extract_interests(text: str):
-    t = text.lower()
-    found = [i for i in INTERESTS if i in t]
-    # synonyms
-    if "party" in t or "club" in t: found.append("nightlife")
-    if "heritage" in t or "fort" in t: found.append("history")
-    if "trek" in t: found.append("hiking")
+def _extract_places(m: _Tagged):
+    # known places come from the bundled gazetteer (one pass over the message's words);
+    # the place right after 'from' is the origin, the destination prefers a place
+    # after a hint word ('to Goa', 'in Jaipur'), else the first other mention.
+    # Several destinations ('to Goa, Jaipur and Manali', 'Mumbai → Goa → Jaipur')
+    # are also returned in mention order as 'destinations'.
+    toks = m.toks
+    at = {tok.start: k for k, tok in enumerate(toks)}
+    words = [(tok.start, tok.end, tok.norm) for tok in toks if tok.kind == "word"]
+    dest = origin = None
+    hinted = None
+    mentions = []
+    for start, end, place in get_gazetteer().find_all(m.text, words):
+        before = toks[at[start] - 1].norm if at[start] > 0 else ""
+        if origin is None and before == "from":
+            origin = place.name
+            continue
+        if hinted is None and before in _HINTS:
+            hinted = place.name
+            # mentions before the first 'to X' are not stops ('Mumbai to Goa')
+            mentions = []
+        if dest is None:
+            dest = place.name
+        if place.name not in mentions and place.name != origin:
+            mentions.append(place.name)
+    if m.values("arrow") and len(mentions) > 2 and origin is None and hinted is None:
+        # a written route starts where the traveller is
+        origin = mentions.pop(0)
+        dest = mentions[0]
+    dest = hinted or dest
+    if dest is None:
+        # unknown place: capitalized words after a preposition
+        dest = _capitalized_after(m, ("to", "in", "for", "at"), 2)
+    if origin is None:
+        # origin mention: 'from Mumbai'
+        origin = _capitalized_after(m, ("from",), 1)
+    out = {"destination": dest, "origin": origin}
+    if len(mentions) > 1:
+        out["destinations"] = mentions
+    return out
+
+_HINTS = {w.split()[-1] for w in DEST_HINT_WORDS}
+
+def _capitalized_after(m: _Tagged, preps, n_words: int) -> Optional[str]:
+    # up to n_words capitalized words right after one of `preps` (written in lower case),
+    # skipping words the lexicon knows ('in October')
+    toks = m.toks
+    for k, tok in enumerate(toks[:-1]):
+        if tok.kind != "word" or tok.text not in preps:
+            continue
+        name = []
+        for j in range(k + 1, min(k + 1 + n_words, len(toks))):
+            w = toks[j]
+            if w.kind != "word" or len(w.text) < 2 or not w.text[0].isupper() or j in m.at:
+                break
+            name.append(w.text)
+        if name:
+            return " ".join(name)
+    return None
+
+def _extract_interests(m: _Tagged):
+    found = m.values("interest")
     # unique
-    return sorted(list(set(found))) if found else None
+    return sorted(set(found)) if found else None
 
 def parse(text: str) -> Dict[str, Any]:
-    intent = _detect_intent(text)
-    places = _extract_places(text)
-    budget = _extract_currency_amount(text)
-    dates = _extract_dates(text)
-    interests = _extract_interests(text)
-    visa_free = bool(re.search(r"visa[- ]?free|without visa|no visa", text, flags=re.I))
+    m = _Tagged(text)
+    intent = _detect_intent(m)
+    places = _extract_places(m)
+    budget = _extract_currency_amount(m)
+    dates = extract_dates(m.toks)
+    interests = _extract_interests(m)
+    visa_free = bool(m.values("visa_free"))
 
     entities = {}
     entities.update(places or {})
@@ -157,3 +258,112 @@ def parse(text: str) -> Dict[str, Any]:
     if visa_free: entities["visa_free_hint"] = True
 
     return {"intent": intent, "entities": entities}
+
+# ---- Batch parsing (log replay, analytics, regression runs) ----
+
+PARSE_CACHE = LRUCache(max_entries=int(os.getenv("NLU_CACHE_ENTRIES", "50000")))
+PARSE_CACHE_TTL_S = float(os.getenv("NLU_CACHE_TTL_S", "3600"))
+# below this many texts to parse, a pool costs more than it saves
+NLU_POOL_MIN_TEXTS = int(os.getenv("NLU_POOL_MIN_TEXTS", "2000"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+def _init_worker():
+    get_gazetteer()
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    '''
+    Long-lived worker pool shared by batch calls, rebuilt when the size changes.
+    Workers are spawned, not forked: the server process holds SQLite connections
+    and threads a forked child must not inherit.
+    '''
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker)
+            _pool_size = processes
+        return _pool
+
+def normalize_text(text: str) -> str:
+    '''Whitespace-collapsed text; parse() reads tokens, so it gives the same result for both.'''
+    return " ".join(str(text).split())
+
+def _cache_key(norm: str):
+    # relative dates ("tomorrow", "next weekend") resolve against today
+    return date.today().isoformat(), norm
+
+def _parse_timed(text: str) -> Tuple[Dict[str, Any], float]:
+    # module-level so it can run in a worker process
+    t0 = time.perf_counter()
+    out = parse(text)
+    return out, (time.perf_counter() - t0) * 1000
+
+def parse_cached(text: str) -> Dict[str, Any]:
+    '''parse() through PARSE_CACHE; the result is shared between callers, treat it as read-only.'''
+    key = _cache_key(normalize_text(text))
+    hit, out = PARSE_CACHE.get(key)
+    if not hit:
+        out = parse(key[1])
+        PARSE_CACHE.set(key, out, PARSE_CACHE_TTL_S)
+    return out
+
+def parse_many(texts: List[str], processes: int = 0, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    '''
+    Parse many messages at once (chat log replays, heuristic regression runs).
+    - texts are whitespace-normalized; repeats within the batch and texts seen
+      recently (PARSE_CACHE) are parsed once
+    - with processes > 0 and at least NLU_POOL_MIN_TEXTS left to parse, they fan
+      out in chunks to a shared pool of spawned workers
+    Items come back in input order as {"nlu", "ms", "cached"}: ms is the parse time
+    for that item, 0 when its result came from the cache or an earlier repeat.
+    Repeats share one result dict, so treat results as read-only.
+    '''
+    t0 = time.perf_counter()
+    keys = [_cache_key(normalize_text(t)) for t in texts]
+    items: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    todo: Dict[Any, List[int]] = {}   # key -> input positions still to parse
+    for i, key in enumerate(keys):
+        if key in todo:
+            todo[key].append(i)
+            continue
+        hit, out = PARSE_CACHE.get(key)
+        if hit:
+            items[i] = {"nlu": out, "ms": 0.0, "cached": True}
+        else:
+            todo[key] = [i]
+
+    pending = list(todo)
+    use_pool = processes > 0 and len(pending) >= max(NLU_POOL_MIN_TEXTS, 2)
+    if use_pool:
+        chunk = chunk_size or max(len(pending) // (processes * 4), 1)
+        done = list(_get_pool(processes).map(_parse_timed, [k[1] for k in pending], chunksize=chunk))
+    else:
+        done = [_parse_timed(k[1]) for k in pending]
+
+    for key, (out, ms) in zip(pending, done):
+        PARSE_CACHE.set(key, out, PARSE_CACHE_TTL_S)
+        first, *repeats = todo[key]
+        items[first] = {"nlu": out, "ms": round(ms, 3), "cached": False}
+        for i in repeats:
+            items[i] = {"nlu": out, "ms": 0.0, "cached": True}
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "items": items,
+        "stats": {
+            "n": len(texts),
+            "parsed": len(pending),
+            "cache_hits": len(texts) - len(pending),
+            "processes": processes if use_pool else 0,
+            "elapsed_s": round(elapsed, 4),
+            "texts_per_s": round(len(texts) / elapsed, 1) if elapsed > 0 else None,
+        },
+    }
+
+def nlu_cache_stats() -> Dict[str, Any]:
+    return PARSE_CACHE.stats()
@@ -1,13 +1,19 @@
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-import math, os, json
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Iterator, Optional
+import math, os, json, heapq, copy, hashlib, time, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from fx import FX
+from cache import LRUCache
+from tools import TOOL_MODE, get_distance_matrix
+from routing import pack_days, round_robin, travel_minutes
+from poi_store import get_poi_store
+from poi_table import POITable, TAGS
+from multi_city import Leg, leg_matrix, order_cities, allocate_days, VALUE_OF_TIME_INR_PER_MIN, GROUND_MAX_KM
 
 # ---- Mock provider layer (to be swapped in Sprint 4 with real APIs) ----
 
-DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "mock_pois.json")
-
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    MOCK = json.load(f)
+# POIs come from the per-city files of the shared POI store (data/pois/<city>.json)
 
 CITY_TRAVEL_TIME_MIN = {  # rough in-city transit between POIs (minutes)
     "default": 25,
@@ -32,6 +38,8 @@ FLIGHT_ESTIMATE_INR = {
     ("Mumbai","Singapore"): 22000
 }
 
+POIS_PER_DAY = 4  # main POIs scheduled per day
+
 STAY_PER_NIGHT_INR = {
     "budget": 1500,
     "mid": 3500,
@@ -52,9 +60,19 @@ def inr_amount(budget: Optional[Dict[str,Any]]) -> Optional[float]:
         return None
     cur = (budget.get("currency") or "INR").upper()
     amt = float(budget.get("amount", 0))
-    # naive FX (will replace in Sprint 4 currency API)
-    fx = {"INR":1.0, "USD":83.0, "EUR":90.0}
-    return amt * fx.get(cur, 1.0)
+    # in-memory rate table shared with tools (no network on this path)
+    return FX.convert(amt, cur, "INR")
+
+def inr_amounts(budgets: List[Optional[Dict[str,Any]]]) -> List[Optional[float]]:
+    '''Batch version of inr_amount: one vectorized conversion for all budgets.'''
+    idx = [i for i, b in enumerate(budgets) if b]
+    out: List[Optional[float]] = [None] * len(budgets)
+    if idx:
+        conv = FX.convert_many([float(budgets[i].get("amount", 0)) for i in idx],
+                               [(budgets[i].get("currency") or "INR") for i in idx], "INR")
+        for i, v in zip(idx, conv.tolist()):
+            out[i] = v
+    return out
 
 def _city_key(dest: Optional[str]) -> str:
     if not dest:
@@ -74,35 +92,100 @@ def _travel_estimate_inr(origin: Optional[str], dest: Optional[str]) -> int:
     # fallback rough
     return 8000
 
-def _poi_filter(city: str, interests: Optional[List[str]]) -> List[Dict[str,Any]]:
-    pois = [p for p in MOCK.get(city.title(), [])]
-    if interests:
-        lowered = set([i.lower() for i in interests])
-        def score(p):
-            tags = set([t.lower() for t in p.get("tags",[])])
-            return len(tags & lowered)
-        pois.sort(key=lambda p: (score(p), p.get("popularity", 0)), reverse=True)
-    else:
-        pois.sort(key=lambda p: p.get("popularity", 0), reverse=True)
-    return pois
-
-def _pack_days(pois: List[Dict[str,Any]], n_days: int, city: str) -> List[List[Dict[str,Any]]]:
-    # Greedy packing: 4 main POIs per day, consider open_hours and travel gaps
-    per_day = 4
-    days = [[] for _ in range(max(n_days,1))]
-    i = 0
-    for p in pois:
-        d = i % len(days)
-        if len(days[d]) < per_day:
-            days[d].append(p)
-            i += 1
-        if all(len(day) >= per_day for day in days):
-            break
-    return days
-
-def _day_schedule(day_pois: List[Dict[str,Any]], city: str, start_time="09:00") -> List[Dict[str,Any]]:
-    # Build a timed schedule assuming CITY_TRAVEL_TIME_MIN between POIs and ~90 min per POI
-    travel_min = CITY_TRAVEL_TIME_MIN.get(city.title(), CITY_TRAVEL_TIME_MIN["default"])
+class _POIIndex:
+    '''
+    Per-city POI index built once per loaded POITable:
+    - tag bitmask per POI (lower-cased tags, one bit per distinct tag in the city)
+    - inverted index tag -> POI ids, so only POIs sharing an interest get scored
+    - POI ids pre-sorted by popularity for the no-interest / fill-up path
+    Ranking is (interest overlap popcount, popularity), ties in dataset order.
+    Only the selected rows are turned into dicts.
+    '''
+    __slots__ = ("table", "tag_bits", "masks", "popularity", "by_tag", "by_popularity")
+
+    def __init__(self, table: POITable):
+        self.table = table
+        self.tag_bits: Dict[str,int] = {}
+        self.masks: List[int] = []
+        self.popularity = table.popularity
+        self.by_tag: Dict[str,List[int]] = {}
+        lowered: Dict[int,str] = {}   # shared tag id -> lower-cased tag, so each is lowered once
+        ids, off = table.tag_ids, table.tag_off
+        for i in range(len(table)):
+            m = 0
+            for tid in ids[off[i]:off[i + 1]]:
+                t = lowered.get(tid)
+                if t is None:
+                    t = lowered[tid] = TAGS[tid].lower()
+                bit = self.tag_bits.setdefault(t, 1 << len(self.tag_bits))
+                if not m & bit:
+                    self.by_tag.setdefault(t, []).append(i)
+                m |= bit
+            self.masks.append(m)
+        self.by_popularity = sorted(range(len(table)), key=lambda i: self.popularity[i], reverse=True)
+
+    def top(self, interests: Optional[List[str]], k: Optional[int] = None) -> List[Dict[str,Any]]:
+        n = len(self.table) if k is None else min(k, len(self.table))
+        imask = 0
+        cand = set()
+        for i in interests or []:
+            t = i.lower()
+            bit = self.tag_bits.get(t)
+            if bit:
+                imask |= bit
+                cand.update(self.by_tag[t])
+        if not imask:
+            return self.table.rows(self.by_popularity[:n])
+        masks, pop = self.masks, self.popularity
+        ranked = heapq.nlargest(n, sorted(cand), key=lambda i: ((masks[i] & imask).bit_count(), pop[i]))
+        if len(ranked) < n:
+            ranked += [i for i in self.by_popularity if i not in cand][:n - len(ranked)]
+        return self.table.rows(ranked)
+
+def _poi_filter(city: str, interests: Optional[List[str]], k: Optional[int] = None) -> List[Dict[str,Any]]:
+    '''Best `k` POIs for the interests (all of them, ranked, when k is None).'''
+    c = get_poi_store().city(city)
+    if c is None:
+        return []
+    # built once per loaded city file, and again after a reload
+    return c.derive("tag_index", _POIIndex).top(interests, k)
+
+def _travel_matrix(pois: List[Dict[str,Any]]) -> Optional[np.ndarray]:
+    '''Pairwise in-city travel minutes between POIs, or None if any POI lacks coordinates.'''
+    if not pois or any(p.get("lat") is None or p.get("lon") is None for p in pois):
+        return None
+    lats = [p["lat"] for p in pois]
+    lons = [p["lon"] for p in pois]
+    routed = None
+    if TOOL_MODE != "mock":
+        routed = get_distance_matrix(list(zip(lats, lons)))["duration_min"]
+    return travel_minutes(lats, lons, routed)
+
+def _pack_days(pois: List[Dict[str,Any]], n_days: int, city: str):
+    '''
+    Up to POIS_PER_DAY stops per day, grouped by area and ordered as a short route.
+    Returns (days, legs in minutes per day, transit totals vs. the old round-robin packing).
+    Without coordinates it falls back to round-robin with the flat city travel time.
+    '''
+    return _pack_with(_travel_matrix(pois), pois, n_days, city)
+
+def _pack_with(m: Optional[np.ndarray], pois: List[Dict[str,Any]], n_days: int, city: str):
+    # _pack_days on a travel matrix that is already known (None: no coordinates)
+    if m is None:
+        flat = CITY_TRAVEL_TIME_MIN.get(city.title(), CITY_TRAVEL_TIME_MIN["default"])
+        days = [[pois[i] for i in d] for d in round_robin(len(pois), n_days, POIS_PER_DAY)]
+        legs = [[flat] * max(len(d) - 1, 0) for d in days]
+        total = sum(sum(l) for l in legs)
+        return days, legs, {"transit_min": total, "transit_baseline_min": total, "transit_saved_min": 0}
+    pk = pack_days(m, n_days, POIS_PER_DAY)
+    days = [[pois[i] for i in d] for d in pk.days]
+    return days, pk.legs_min, {"transit_min": int(round(pk.transit_min)),
+                               "transit_baseline_min": int(round(pk.baseline_min)),
+                               "transit_saved_min": int(round(pk.saved_min))}
+
+def _day_schedule(day_pois: List[Dict[str,Any]], city: str, start_time="09:00", legs: Optional[List[float]] = None) -> List[Dict[str,Any]]:
+    # Build a timed schedule with ~90 min per POI; transit from `legs`, else the flat CITY_TRAVEL_TIME_MIN
+    flat = CITY_TRAVEL_TIME_MIN.get(city.title(), CITY_TRAVEL_TIME_MIN["default"])
     blocks = []
     t = datetime.strptime(start_time, "%H:%M")
     for idx, p in enumerate(day_pois):
@@ -116,6 +199,7 @@ def _day_schedule(day_pois: List[Dict[str,Any]], city: str, start_time="09:00")
         })
         # travel block (skip after last)
         if idx < len(day_pois)-1:
+            travel_min = int(round(legs[idx])) if legs else flat
             tt = end_visit + timedelta(minutes=travel_min)
             blocks.append({
                 "time": f"{end_visit.strftime('%H:%M')} - {tt.strftime('%H:%M')}",
@@ -128,12 +212,76 @@ def _day_schedule(day_pois: List[Dict[str,Any]], city: str, start_time="09:00")
             t = end_visit
     return blocks
 
-def plan_itinerary(nlu: Dict[str,Any]) -> Dict[str,Any]:
+# ---- Plan memoization ----
+# A plan is a pure function of the entities, the POI data and the cost tables
+# (plus today's date when no start date is given), so repeats are served from memory.
+
+PLAN_CACHE = LRUCache(max_entries=int(os.getenv("PLAN_CACHE_ENTRIES", "256")))
+PLAN_CACHE_TTL_S = float(os.getenv("PLAN_CACHE_TTL_S", "3600"))
+
+def dataset_version(city: Optional[str] = None) -> str:
+    '''
+    Fingerprint of the cost tables and, given a city, of that city's POI file;
+    any change yields new plan cache keys.
+    '''
+    tables = repr((sorted(CITY_TRAVEL_TIME_MIN.items()), sorted(CITY_BASE_COST.items()),
+                   sorted(FLIGHT_ESTIMATE_INR.items()), sorted(STAY_PER_NIGHT_INR.items()),
+                   POIS_PER_DAY, TOOL_MODE))
+    v = hashlib.sha1(tables.encode()).hexdigest()[:12]
+    return f"{get_poi_store().version(city)}:{v}" if city else v
+
+def plan_cache_key(ents: Dict[str,Any], budget_inr: Optional[float]) -> str:
+    '''
+    Canonical hash of the entities the plan depends on. Interests are matched
+    case-insensitively and as a set, so their order and case do not split entries;
+    the budget enters as its INR value, so a rate change is a different plan.
+    '''
+    canon = {
+        "destination": (ents.get("destination") or "").strip(),
+        "origin": (ents.get("origin") or "").strip() or None,
+        "budget_inr": round(budget_inr, 2) if budget_inr else None,
+        "interests": sorted({i.strip().lower() for i in ents.get("interests") or []}),
+        "start_date": ents.get("start_date"),
+        "end_date": ents.get("end_date"),
+        "n_days": ents.get("n_days"),
+        # undated plans start today
+        "today": None if ents.get("start_date") else date.today().isoformat(),
+        "data": dataset_version(ents.get("destination")),
+    }
+    return _digest(canon)
+
+def plan_cache_stats() -> Dict[str,Any]:
+    st = PLAN_CACHE.stats()
+    looked_up = st["hits"] + st["misses"]
+    st["hit_rate"] = round(st["hits"] / looked_up, 3) if looked_up else 0.0
+    st["dataset_version"] = dataset_version()
+    st["poi_store"] = get_poi_store().stats()
+    st["stages"] = {s: dict(c) for s, c in STAGE_COUNTERS.items()}
+    return st
+
+def plan_itinerary(nlu: Dict[str,Any], session_id: Optional[str] = None) -> Dict[str,Any]:
+    '''
+    Plan for the NLU entities. With a session_id, the stage results of that
+    session's previous plan are reused where their inputs did not change.
+    Several destinations are planned as one circuit by plan_multi_city.
+    '''
+    for ev in iter_plan(nlu, session_id):
+        pass
+    return ev["data"]
+
+def iter_plan(nlu: Dict[str,Any], session_id: Optional[str] = None) -> Iterator[Dict[str,Any]]:
+    '''
+    plan_itinerary as a stream of {"event", "data"} dicts for callers that show
+    progress: "summary" (costs, once the days are packed), one "day" per day as
+    it is scheduled (with its "index", and "city" on circuits), and last "plan"
+    with the complete plan. A need_info answer comes as the "plan" event alone.
+    '''
     ents = nlu.get("entities", {})
+    if len(ents.get("destinations") or []) > 1:
+        yield from _iter_multi_city(ents, session_id)
+        return
     dest = ents.get("destination")
-    origin = ents.get("origin")
     budget = ents.get("budget")
-    interests = ents.get("interests", [])
     start_date = ents.get("start_date")
     end_date = ents.get("end_date")
     n_days = ents.get("n_days")
@@ -144,17 +292,103 @@ def plan_itinerary(nlu: Dict[str,Any]) -> Dict[str,Any]:
     if not (n_days or (start_date and end_date)):
         missing.append("dates or duration")
     if missing:
-        return {
+        yield {"event": "plan", "data": {
             "status": "need_info",
             "ask": f"Please provide {', '.join(missing)} to plan your trip.",
             "entities_seen": ents
-        }
+        }}
+        return
+
+    budget_inr = inr_amount(budget) if budget else None
+    key = plan_cache_key(ents, budget_inr)
+    hit, cached = PLAN_CACHE.get(key)
+    if hit:
+        plan, stages = cached
+        # cached plans are shared; callers get their own copy
+        plan = copy.deepcopy(plan)
+        # the key ignores case, order and extra slots: meta records what *this* request asked for
+        plan["meta"]["entities"] = dict(ents)
+        yield {"event": "summary", "data": plan["summary"]}
+        for i, day in enumerate(plan["days"]):
+            yield {"event": "day", "data": dict(day, index=i)}
+    else:
+        prev = SESSION_STAGES.get(session_id)[1] if session_id else None
+        plan, stages = yield from _iter_build(ents, budget_inr, prev)
+        PLAN_CACHE.set(key, (plan, stages), PLAN_CACHE_TTL_S)
+        plan = copy.deepcopy(plan)
+    if session_id:
+        SESSION_STAGES.set(session_id, stages, SESSION_TTL_S)
+    yield {"event": "plan", "data": plan}
+
+# ---- Planner stages ----
+# Each stage declares the inputs it depends on; upstream stages enter through
+# their keys. A stage's key is a hash of those inputs plus the dataset version,
+# so a follow-up that changes one slot recomputes only the stages downstream of it.
 
-    # derive duration if needed
+PLAN_STAGES = {
+    "cost": ("destination", "origin", "budget_inr", "n_days"),
+    "selection": ("destination", "interests", "n_days"),
+    "packing": ("selection", "destination", "n_days"),
+    "schedule": ("packing", "destination", "start_date"),
+}
+
+STAGE_CACHE = LRUCache(max_entries=int(os.getenv("PLAN_STAGE_CACHE_ENTRIES", "1024")))
+# last stage results per session, so a follow-up reuses them even after STAGE_CACHE evicted them
+SESSION_STAGES = LRUCache(max_entries=int(os.getenv("PLAN_SESSION_ENTRIES", "1024")))
+SESSION_TTL_S = float(os.getenv("PLAN_SESSION_TTL_S", str(3600 * 24)))
+STAGE_COUNTERS = {s: {"computed": 0, "reused": 0} for s in PLAN_STAGES}
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+class _StageRun:
+    '''One planning pass over PLAN_STAGES: previous session results first, then the shared stage cache, then compute.'''
+    def __init__(self, inputs: Dict[str,Any], prev: Optional[Dict[str,Any]] = None):
+        self.inputs = inputs
+        self.prev = prev or {}
+        self.results: Dict[str,Any] = {}   # stage -> (key, value)
+
+    def key(self, stage: str) -> str:
+        deps = {d: self.results[d][0] if d in PLAN_STAGES else self.inputs.get(d) for d in PLAN_STAGES[stage]}
+        deps["data"] = self.inputs["data"]
+        return f"{stage}:{_digest(deps)}"
+
+    def put(self, stage: str, value):
+        '''Record a result computed elsewhere (batch planning), keyed as run() would.'''
+        self.results[stage] = (self.key(stage), value)
+        return value
+
+    def lookup(self, stage: str):
+        '''(key, hit, value) from the previous session or the stage cache, without computing.'''
+        key = self.key(stage)
+        prev = self.prev.get(stage)
+        if prev is not None and prev[0] == key:
+            return key, True, prev[1]
+        hit, value = STAGE_CACHE.get(key)
+        return key, hit, value
+
+    def store(self, stage: str, key: str, value, hit: bool):
+        if not hit:
+            STAGE_CACHE.set(key, value, PLAN_CACHE_TTL_S)
+        STAGE_COUNTERS[stage]["reused" if hit else "computed"] += 1
+        self.results[stage] = (key, value)
+        return value
+
+    def run(self, stage: str, fn):
+        key, hit, value = self.lookup(stage)
+        return self.store(stage, key, fn() if not hit else value, hit)
+
+def _resolve_dates(ents: Dict[str,Any]):
+    start_date = ents.get("start_date")
+    end_date = ents.get("end_date")
+    n_days = ents.get("n_days")
     if not n_days and start_date and end_date:
         sd = datetime.fromisoformat(start_date)
         ed = datetime.fromisoformat(end_date)
-        n_days = max((ed - sd).days + 1, 1)
+        if ed < sd:   # given back to front: keep the span rather than a one-day trip
+            sd, ed = ed, sd
+            start_date, end_date = end_date, start_date
+        n_days = (ed - sd).days + 1
     elif n_days and start_date and not end_date:
         sd = datetime.fromisoformat(start_date)
         ed = sd + timedelta(days=n_days-1)
@@ -165,9 +399,9 @@ def plan_itinerary(nlu: Dict[str,Any]) -> Dict[str,Any]:
         start_date = sd.isoformat()
         ed = datetime.now() + timedelta(days=n_days-1)
         end_date = ed.date().isoformat()
+    return n_days, start_date, end_date
 
-    # Budget + cost tiers
-    budget_inr = inr_amount(budget) if budget else None
+def _stage_cost(dest: str, origin: Optional[str], budget_inr: Optional[float], n_days: int) -> Dict[str,Any]:
     stay_tier = pick_stay_tier(budget_inr or 40000, max(n_days-1, 1))
     stay_cost = STAY_PER_NIGHT_INR[stay_tier] * max(n_days-1, 1)
     travel_cost = _travel_estimate_inr(origin, dest)
@@ -179,41 +413,377 @@ def plan_itinerary(nlu: Dict[str,Any]) -> Dict[str,Any]:
         budget_note = f"Estimated total ~₹{int(est_total)} vs your budget ₹{int(budget_inr)}."
     else:
         budget_note = f"Estimated total ~₹{int(est_total)} (no budget provided)."
+    return {
+        "stay_tier": stay_tier,
+        "est_cost_inr": int(est_total),
+        "travel_cost_inr": int(travel_cost),
+        "stay_cost_inr": int(stay_cost),
+        "misc_cost_inr": int(daily_misc),
+        "notes": budget_note,
+    }
 
-    # POI selection & packing
-    pois = _poi_filter(dest, interests)
-    day_bins = _pack_days(pois, n_days, dest)
-
-    # Build per-day schedules
-    schedules = []
+def _iter_schedule(packing, dest: str, start_date: Optional[str]):
+    day_bins, day_legs, _ = packing
     cur = datetime.fromisoformat(start_date) if start_date else datetime.now()
     for day_idx, dp in enumerate(day_bins):
         date_label = (cur + timedelta(days=day_idx)).date().isoformat()
-        schedule = _day_schedule(dp, dest)
-        schedules.append({
+        schedule = _day_schedule(dp, dest, legs=day_legs[day_idx])
+        yield {
             "date": date_label,
             "items": schedule
-        })
+        }
+
+def _stage_schedule(packing, dest: str, start_date: Optional[str]) -> List[Dict[str,Any]]:
+    return list(_iter_schedule(packing, dest, start_date))
 
+def _stage_inputs(ents: Dict[str,Any], budget_inr: Optional[float], data: str) -> Dict[str,Any]:
+    n_days, start_date, end_date = _resolve_dates(ents)
+    return {
+        "destination": ents.get("destination"), "origin": ents.get("origin"),
+        "n_days": n_days, "start_date": start_date, "end_date": end_date,
+        "budget_inr": round(budget_inr, 2) if budget_inr else None,
+        "interests": sorted({i.strip().lower() for i in ents.get("interests") or []}),
+        "data": data,
+    }
+
+def _iter_build(ents: Dict[str,Any], budget_inr: Optional[float], prev_stages: Optional[Dict[str,Any]] = None):
+    '''
+    _build_plan as a generator: yields the "summary" event once the days are
+    packed, then a "day" event as each day is scheduled; returns (plan, stage results).
+    '''
+    inp = _stage_inputs(ents, budget_inr, dataset_version(ents.get("destination")))
+    dest, origin, n_days = inp["destination"], inp["origin"], inp["n_days"]
+    run = _StageRun(inp, prev_stages)
+
+    cost = run.run("cost", lambda: _stage_cost(dest, origin, budget_inr, n_days))
+    pois = run.run("selection", lambda: _poi_filter(dest, inp["interests"], k=POIS_PER_DAY * n_days))
+    packing = run.run("packing", lambda: _pack_days(pois, n_days, dest))
+    yield {"event": "summary", "data": _plan_summary(inp, cost, packing)}
+
+    key, hit, schedules = run.lookup("schedule")
+    if hit:
+        for i, day in enumerate(schedules):
+            yield {"event": "day", "data": dict(day, index=i)}
+    else:
+        schedules = []
+        for day in _iter_schedule(packing, dest, inp["start_date"]):
+            yield {"event": "day", "data": dict(day, index=len(schedules))}
+            schedules.append(day)
+    run.store("schedule", key, schedules, hit)
+    return _assemble_plan(ents, inp, cost, packing, schedules, run), run.results
+
+def _plan_summary(inp, cost, packing) -> Dict[str,Any]:
+    return {
+        "destination": inp["destination"],
+        "origin": inp["origin"],
+        "start_date": inp["start_date"],
+        "end_date": inp["end_date"],
+        "n_days": inp["n_days"],
+        **{k: v for k, v in cost.items() if k != "notes"},
+        **packing[2],
+        "notes": cost["notes"]
+    }
+
+def _assemble_plan(ents, inp, cost, packing, schedules, run: _StageRun) -> Dict[str,Any]:
     return {
         "status": "ok",
-        "summary": {
-            "destination": dest,
-            "origin": origin,
-            "start_date": start_date,
-            "end_date": end_date,
-            "n_days": n_days,
-            "stay_tier": stay_tier,
-            "est_cost_inr": int(est_total),
-            "travel_cost_inr": int(travel_cost),
-            "stay_cost_inr": int(stay_cost),
-            "misc_cost_inr": int(daily_misc),
-            "notes": budget_note
-        },
+        "summary": _plan_summary(inp, cost, packing),
         "days": schedules,
         "assumptions": [
-            "In-city travel ~25–35 min between POIs",
+            "Each day's stops are grouped by area; in-city travel from pairwise route times",
             "90 minutes per POI",
             "Costs are rough heuristics (Sprint 4 adds live APIs)"
-        ]
+        ],
+        # what the plan was built from: lets a follow-up merge slots and diff stages
+        "meta": {
+            "entities": dict(ents),
+            "stages": {s: r[0] for s, r in run.results.items()},
+        }
+    }
+
+# ---- Follow-ups ----
+
+def merge_entities(prev: Optional[Dict[str,Any]], new: Optional[Dict[str,Any]]) -> Dict[str,Any]:
+    '''
+    Fold a follow-up's entities ("make it 4 days", "add museums") into the previous
+    request's: slots given in the follow-up replace the old ones, interests accumulate.
+    A new duration or start date drops the old end date, and a new end date drops
+    the old duration, so the dates are derived again.
+    '''
+    new = {k: v for k, v in (new or {}).items() if v not in (None, [], {}, "")}
+    out = dict(prev or {})
+    for k, v in new.items():
+        if k == "interests":
+            out[k] = list(dict.fromkeys(list(out.get(k) or []) + list(v)))
+        else:
+            out[k] = v
+    if "destination" in new and "destinations" not in new:
+        # one new destination replaces a whole circuit
+        out.pop("destinations", None)
+    if ("n_days" in new or "start_date" in new) and "end_date" not in new:
+        out.pop("end_date", None)
+    if "end_date" in new and "n_days" not in new and out.get("start_date"):
+        out.pop("n_days", None)
+    return out
+
+def _stops(day: Dict[str,Any]) -> List[str]:
+    return [it["name"] for it in day.get("items", []) if it.get("category") != "travel"]
+
+def plan_diff(old: Optional[Dict[str,Any]], new: Optional[Dict[str,Any]]) -> Dict[str,Any]:
+    '''Changes between two plan versions: summary fields, stops per day, and the stages whose inputs changed.'''
+    if not old or not new or old.get("status") != "ok" or new.get("status") != "ok":
+        return {}
+    os_, ns = old.get("summary", {}), new.get("summary", {})
+    summary = {k: {"old": os_.get(k), "new": ns.get(k)} for k in list(ns) + [k for k in os_ if k not in ns]
+               if os_.get(k) != ns.get(k)}
+    days = []
+    od, nd = old.get("days", []), new.get("days", [])
+    for i in range(max(len(od), len(nd))):
+        a = _stops(od[i]) if i < len(od) else []
+        b = _stops(nd[i]) if i < len(nd) else []
+        if a != b:
+            days.append({
+                "day": i + 1,
+                "date": (nd[i] if i < len(nd) else od[i]).get("date"),
+                "added": [n for n in b if n not in a],
+                "removed": [n for n in a if n not in b],
+                "reordered": sorted(a) == sorted(b),
+            })
+    ok, nk = old.get("meta", {}).get("stages", {}), new.get("meta", {}).get("stages", {})
+    return {"summary": summary, "days": days, "stages_changed": [s for s in PLAN_STAGES if ok.get(s) != nk.get(s)]}
+
+# ---- Batch planning ----
+
+STAY_TIERS = ("budget", "mid", "premium")
+STAY_TIER_BOUNDS = np.array([2000, 5000])  # per-night stay budget where pick_stay_tier moves up a tier
+
+def _stage_cost_batch(dests: List[str], origins: List[Optional[str]], budgets_inr: List[Optional[float]],
+                      n_days: List[int]) -> List[Dict[str,Any]]:
+    '''_stage_cost for many requests: tiers and totals as array ops, table lookups once per distinct key.'''
+    days = np.asarray(n_days, dtype=np.int64)
+    nights = np.maximum(days - 1, 1)
+    budget = np.array([b or 40000 for b in budgets_inr], dtype=float)
+    tier = np.searchsorted(STAY_TIER_BOUNDS, budget * 0.4 / nights, side="right")
+    per_night = np.array([STAY_PER_NIGHT_INR[t] for t in STAY_TIERS], dtype=np.int64)
+    stay = per_night[tier] * nights
+    travel_of = {pair: _travel_estimate_inr(*pair) for pair in set(zip(origins, dests))}
+    travel = np.array([travel_of[pair] for pair in zip(origins, dests)], dtype=np.int64)
+    base_of = {d: CITY_BASE_COST.get(_city_key(d), CITY_BASE_COST["default"]) for d in set(dests)}
+    misc = np.array([base_of[d] for d in dests], dtype=np.int64) * days
+    total = travel + stay + misc
+
+    out = []
+    for i, (t, tot, tr, st, mi) in enumerate(zip(tier.tolist(), total.tolist(), travel.tolist(), stay.tolist(), misc.tolist())):
+        b = budgets_inr[i]
+        note = (f"Estimated total ~₹{tot} vs your budget ₹{int(b)}." if b
+                else f"Estimated total ~₹{tot} (no budget provided).")
+        out.append({"stay_tier": STAY_TIERS[t], "est_cost_inr": tot, "travel_cost_inr": tr,
+                    "stay_cost_inr": st, "misc_cost_inr": mi, "notes": note})
+    return out
+
+def _pack_and_schedule(pois: List[Dict[str,Any]], n_days: int, dest: str, start_dates: List[str],
+                       m: Optional[np.ndarray]):
+    # module-level so it can run in a worker process; the travel matrix comes in
+    # precomputed, so workers never touch the tool cache or the network
+    packing = _pack_with(m, pois, n_days, dest)
+    return packing, [_stage_schedule(packing, dest, sd) for sd in start_dates]
+
+# below this many distinct packings a batch is cheaper in-process than shipped to workers
+PLAN_POOL_MIN_PACKINGS = int(os.getenv("PLAN_POOL_MIN_PACKINGS", "64"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    '''
+    Long-lived worker pool shared by batch calls, rebuilt when the size changes.
+    Spawned, not forked: the parent holds an open SQLite connection and
+    background threads that a forked child must not inherit.
+    '''
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = processes
+        return _pool
+
+def plan_itineraries(batch: List[Dict[str,Any]], processes: int = 0) -> Dict[str,Any]:
+    '''
+    Plan many requests at once (grids for precomputation and budget experiments).
+    Items are NLU results as for plan_itinerary, or bare entity dicts.
+    - cost summaries for the whole batch are computed as NumPy arrays
+    - POIs are ranked once per (city, interests) and cut to each request's k
+    - packing runs once per (city, interests, n_days); with processes > 0 and at
+      least PLAN_POOL_MIN_PACKINGS of them, packing and scheduling fan out to a
+      shared process pool
+    Plans come back in input order and equal plan_itinerary's; identical requests
+    share their day lists, so treat them as read-only.
+    '''
+    t0 = time.perf_counter()
+    ents_list = [item.get("entities", item) if isinstance(item, dict) else {} for item in batch]
+    plans: List[Optional[Dict[str,Any]]] = [None] * len(batch)
+    budgets = inr_amounts([e.get("budget") for e in ents_list])
+    versions: Dict[str,str] = {}
+
+    ok, inputs = [], {}
+    for i, ents in enumerate(ents_list):
+        missing = []
+        if not ents.get("destination"): missing.append("destination")
+        if not (ents.get("n_days") or (ents.get("start_date") and ents.get("end_date"))):
+            missing.append("dates or duration")
+        if missing:
+            plans[i] = {
+                "status": "need_info",
+                "ask": f"Please provide {', '.join(missing)} to plan your trip.",
+                "entities_seen": ents
+            }
+            continue
+        ok.append(i)
+        dest = ents["destination"]
+        if dest not in versions:
+            versions[dest] = dataset_version(dest)
+        inputs[i] = _stage_inputs(ents, budgets[i], versions[dest])
+
+    costs = _stage_cost_batch([inputs[i]["destination"] for i in ok], [inputs[i]["origin"] for i in ok],
+                              [budgets[i] for i in ok], [inputs[i]["n_days"] for i in ok])
+
+    ranked: Dict[Any, List[Dict[str,Any]]] = {}
+    tasks: Dict[Any, List[str]] = {}   # (city, interests, n_days) -> distinct start dates
+    for i in ok:
+        inp = inputs[i]
+        rkey = (inp["destination"], tuple(inp["interests"]))
+        if rkey not in ranked:
+            ranked[rkey] = _poi_filter(inp["destination"], inp["interests"])
+        starts = tasks.setdefault(rkey + (inp["n_days"],), [])
+        if inp["start_date"] not in starts:
+            starts.append(inp["start_date"])
+
+    def job(tkey):
+        city, interests, n_days = tkey
+        pois = ranked[(city, interests)][:POIS_PER_DAY * n_days]
+        return pois, n_days, city, tasks[tkey], _travel_matrix(pois)
+
+    keys = list(tasks)
+    use_pool = processes > 0 and len(keys) >= max(PLAN_POOL_MIN_PACKINGS, 2)
+    if use_pool:
+        done = list(_get_pool(processes).map(_pack_and_schedule, *zip(*(job(k) for k in keys)),
+                                             chunksize=max(len(keys) // (processes * 4), 1)))
+    else:
+        done = [_pack_and_schedule(*job(k)) for k in keys]
+    results = dict(zip(keys, done))
+
+    for i, cost in zip(ok, costs):
+        inp = inputs[i]
+        tkey = (inp["destination"], tuple(inp["interests"]), inp["n_days"])
+        packing, schedules = results[tkey]
+        run = _StageRun(inp)
+        run.put("cost", cost)
+        run.put("selection", None)
+        run.put("packing", packing)
+        sched = run.put("schedule", schedules[tasks[tkey].index(inp["start_date"])])
+        plans[i] = _assemble_plan(ents_list[i], inp, cost, packing, sched, run)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "plans": plans,
+        "stats": {
+            "n": len(batch),
+            "planned": len(ok),
+            "distinct_rankings": len(ranked),
+            "distinct_packings": len(keys),
+            "processes": processes if use_pool else 0,
+            "elapsed_s": round(elapsed, 4),
+            "plans_per_s": round(len(batch) / elapsed, 1) if elapsed > 0 else None,
+        },
+    }
+
+# ---- Multi-city ----
+
+def plan_multi_city(ents: Dict[str,Any], session_id: Optional[str] = None) -> Dict[str,Any]:
+    '''
+    Circuit over several destinations: pick the visiting order (from the origin,
+    when known) that minimizes inter-city fares plus time on the road, split the
+    days by how much each city has to offer, then plan every city with
+    plan_itinerary on consecutive dates. The budget is shared out by days.
+    '''
+    for ev in _iter_multi_city(ents, session_id):
+        pass
+    return ev["data"]
+
+def _iter_multi_city(ents: Dict[str,Any], session_id: Optional[str] = None) -> Iterator[Dict[str,Any]]:
+    # events as in iter_plan; the circuit summary only exists at the end, so it comes just before "plan"
+    cities = list(dict.fromkeys(ents.get("destinations") or []))
+    origin = ents.get("origin")
+    n_days, start_date, end_date = _resolve_dates(ents)
+    if not n_days or n_days < len(cities):
+        need = f"at least {len(cities)} days ({', '.join(cities)})" if n_days else "dates or duration"
+        yield {"event": "plan", "data": {"status": "need_info", "ask": f"Please provide {need} to plan your trip.", "entities_seen": ents}}
+        return
+
+    places = ([origin] if origin else []) + [c for c in cities if c != origin]
+    cost, minutes, mode, km = leg_matrix(places, FLIGHT_ESTIMATE_INR)
+    _, order, method = order_cities(cost + VALUE_OF_TIME_INR_PER_MIN * minutes, 0 if origin else None)
+    stops = [i for i in order if not (origin and i == 0)]
+    weights = [len(get_poi_store().pois(places[i])) or 1 for i in stops]
+    days_per = allocate_days(n_days, weights)
+
+    budget_inr = inr_amount(ents.get("budget")) if ents.get("budget") else None
+    legs = [Leg(places[a], places[b], mode[a, b], None if np.isnan(km[a, b]) else round(float(km[a, b]), 1),
+                int(cost[a, b]), int(minutes[a, b])) for a, b in zip(order, order[1:])]
+    city_plans, days = [], []
+    cur = datetime.fromisoformat(start_date)
+    for i, d in zip(stops, days_per):
+        sub = {"destination": places[i], "n_days": d, "start_date": cur.date().isoformat(),
+               "interests": ents.get("interests") or []}
+        if budget_inr:
+            sub["budget"] = {"amount": round(budget_inr * d / n_days, 2), "currency": "INR"}
+        for ev in iter_plan({"entities": sub}, f"{session_id}:{places[i]}" if session_id else None):
+            if ev["event"] == "day":
+                day = dict(ev["data"], city=places[i])
+                del day["index"]
+                yield {"event": "day", "data": dict(day, index=len(days))}
+                days.append(day)
+        city_plans.append(ev["data"])
+        cur += timedelta(days=d)
+
+    travel_cost = sum(l.cost_inr for l in legs)
+    stay_cost = sum(p["summary"]["stay_cost_inr"] for p in city_plans)
+    misc_cost = sum(p["summary"]["misc_cost_inr"] for p in city_plans)
+    est_total = travel_cost + stay_cost + misc_cost
+    if budget_inr:
+        budget_note = f"Estimated total ~₹{int(est_total)} vs your budget ₹{int(budget_inr)}."
+    else:
+        budget_note = f"Estimated total ~₹{int(est_total)} (no budget provided)."
+    summary = {
+        "destination": places[stops[0]],
+        "destinations": [places[i] for i in stops],
+        "origin": origin,
+        "start_date": start_date,
+        "end_date": end_date,
+        "n_days": n_days,
+        "days_per_city": {places[i]: d for i, d in zip(stops, days_per)},
+        "route_method": method,
+        "est_cost_inr": int(est_total),
+        "travel_cost_inr": int(travel_cost),
+        "stay_cost_inr": int(stay_cost),
+        "misc_cost_inr": int(misc_cost),
+        "intercity_minutes": sum(l.minutes for l in legs),
+        "notes": budget_note
     }
+    yield {"event": "summary", "data": summary}
+    yield {"event": "plan", "data": {
+        "status": "ok",
+        "summary": summary,
+        "legs": [l._asdict() for l in legs],
+        "cities": [p["summary"] for p in city_plans],
+        "days": days,
+        "assumptions": [
+            "City order minimizes fares plus time on the road (₹%d per hour)" % (VALUE_OF_TIME_INR_PER_MIN * 60),
+            "Inter-city legs over %d km are flown, shorter ones go by road or rail" % GROUND_MAX_KM,
+            "Days are split by the number of sights in each city, at least one each",
+        ],
+        "meta": {"entities": dict(ents)}
+    }}
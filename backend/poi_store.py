@@ -0,0 +1,175 @@
+import os, re, json, time, hashlib, threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from poi_table import POITable
+
+POI_DIR = os.getenv("POI_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "pois"))
+POI_STORE_MAX_CITIES = int(os.getenv("POI_STORE_MAX_CITIES", "64"))
+POI_STORE_CHECK_S = float(os.getenv("POI_STORE_CHECK_S", "2"))
+POI_STORE_MAX_MISSING = int(os.getenv("POI_STORE_MAX_MISSING", "1024"))
+
+_KEY_DROP = re.compile(r"[^a-z0-9_]")
+
+def city_key(city: str) -> str:
+    '''File stem for a city: "New York" -> "new_york"; only [a-z0-9_] survive, so it cannot leave the POI dir.'''
+    return _KEY_DROP.sub("", "_".join(city.strip().lower().split()))
+
+class CityPOIs:
+    '''
+    One loaded city file, held as a compact POITable. It is never mutated: a
+    reload builds a new object and swaps it in, so readers keep a consistent
+    snapshot. `derive` memoizes data built from the table (e.g. the planner's
+    tag index) on the snapshot itself, so it is rebuilt exactly when the file changes.
+    '''
+    __slots__ = ("key", "table", "version", "mtime_ns", "size", "checked_at", "_derived", "_lock")
+
+    def __init__(self, key: str, table: POITable, version: str, mtime_ns: int, size: int):
+        self.key = key
+        self.table = table
+        self.version = version
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checked_at = time.monotonic()
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def derive(self, name: str, build: Callable[[POITable], Any]) -> Any:
+        v = self._derived.get(name)
+        if v is None:
+            with self._lock:
+                v = self._derived.get(name)
+                if v is None:
+                    v = self._derived[name] = build(self.table)
+        return v
+
+class POIStore:
+    '''
+    Per-city POI files (<root>/<city_key>.json, a JSON list of POIs) loaded on first use.
+    - at most `max_cities` cities stay resident; the least recently used is dropped
+    - a resident city is re-stat'ed at most every `check_s` seconds and reloaded
+      when its mtime or size changed; a file that fails to parse keeps the old copy
+    - unknown cities are remembered as missing until the next check, in their own
+      LRU (`max_missing`), so lookups of unknown names never push out loaded cities
+    '''
+    def __init__(self, root: str = POI_DIR, max_cities: int = POI_STORE_MAX_CITIES, check_s: float = POI_STORE_CHECK_S,
+                 max_missing: int = POI_STORE_MAX_MISSING):
+        self.root = root
+        self.max_cities = max(int(max_cities), 1)
+        self.max_missing = max(int(max_missing), 1)
+        self.check_s = check_s
+        self._cities: "OrderedDict[str, CityPOIs]" = OrderedDict()
+        self._missing: "OrderedDict[str, float]" = OrderedDict()   # key -> when it was last found missing
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".json")
+
+    def _read(self, key: str) -> CityPOIs:
+        try:
+            with open(self.path(key), "rb") as f:
+                st = os.fstat(f.fileno())
+                raw = f.read()
+        except FileNotFoundError:
+            return CityPOIs(key, POITable([]), "none", 0, -1)   # size -1: no file
+        pois = json.loads(raw)
+        if not isinstance(pois, list) or not all(isinstance(p, dict) for p in pois):
+            raise ValueError(f"{self.path(key)}: expected a JSON list of POI objects")
+        table = POITable(pois)
+        return CityPOIs(key, table, hashlib.sha1(raw).hexdigest()[:12], st.st_mtime_ns, st.st_size)
+
+    def _changed(self, cur: CityPOIs) -> bool:
+        try:
+            st = os.stat(self.path(cur.key))
+        except FileNotFoundError:
+            return cur.size >= 0
+        return st.st_mtime_ns != cur.mtime_ns or st.st_size != cur.size
+
+    def city(self, city: str) -> Optional[CityPOIs]:
+        '''Current snapshot for a city, or None when there is no file for it.'''
+        key = city_key(city)
+        if not key:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            cur = self._cities.get(key)
+            if cur is not None:
+                self._cities.move_to_end(key)
+            missed_at = self._missing.get(key)
+        if cur is None and missed_at is not None and now - missed_at < self.check_s:
+            self.hits += 1
+            return None
+        if cur is not None:
+            fresh = now - cur.checked_at < self.check_s
+            if fresh or not self._changed(cur):
+                if not fresh:
+                    cur.checked_at = now
+                self.hits += 1
+                return cur if cur.size >= 0 else None
+        try:
+            new = self._read(key)
+        except (OSError, ValueError, TypeError):
+            # half-written or broken file: keep serving what we had
+            if cur is None:
+                return None
+            cur.checked_at = now
+            return cur if cur.size >= 0 else None
+        with self._lock:
+            if new.size < 0:
+                self._cities.pop(key, None)
+                self._missing[key] = now
+                self._missing.move_to_end(key)
+                while len(self._missing) > self.max_missing:
+                    self._missing.popitem(last=False)
+                return None
+            self._missing.pop(key, None)
+            if cur is None:
+                self.loads += 1
+            else:
+                self.reloads += 1
+            self._cities[key] = new
+            self._cities.move_to_end(key)
+            while len(self._cities) > self.max_cities:
+                self._cities.popitem(last=False)
+                self.evictions += 1
+        return new
+
+    def pois(self, city: str) -> List[Dict[str, Any]]:
+        '''All POIs of a city as fresh dicts.'''
+        c = self.city(city)
+        return c.table.rows() if c is not None else []
+
+    def version(self, city: str) -> str:
+        c = self.city(city)
+        return c.version if c is not None else "none"
+
+    def cities(self) -> List[str]:
+        '''City keys available on disk (does not load them).'''
+        try:
+            return sorted(n[:-5] for n in os.listdir(self.root) if n.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def clear(self):
+        with self._lock:
+            self._cities.clear()
+            self._missing.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            resident = list(self._cities)
+            missing = len(self._missing)
+        return {"resident": len(resident), "max_cities": self.max_cities, "cities": resident, "missing": missing,
+                "hits": self.hits, "loads": self.loads, "reloads": self.reloads, "evictions": self.evictions}
+
+_default: Optional[POIStore] = None
+
+def get_poi_store() -> POIStore:
+    '''Process-wide store shared by the planner and the tools.'''
+    global _default
+    if _default is None:
+        _default = POIStore()
+    return _default
@@ -0,0 +1,111 @@
+import math, threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+CORE_FIELDS = ("name", "tags", "popularity", "notes", "lat", "lon")
+
+class StringTable:
+    '''Process-wide interning of small vocabularies (tags): one str object per distinct value, addressed by id.'''
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(s)
+                if i is None:
+                    i = self._ids[s] = len(self._strings)
+                    self._strings.append(s)
+        return i
+
+    def __getitem__(self, i: int) -> str:
+        return self._strings[i]
+
+    def __len__(self):
+        return len(self._strings)
+
+# tag vocabulary shared by every city table
+TAGS = StringTable()
+
+class TextColumn:
+    '''Many strings stored as one str plus an offsets array instead of one object each.'''
+    __slots__ = ("_blob", "_off")
+
+    def __init__(self, values: Iterable[str]):
+        values = list(values)
+        self._off = array("I", [0])
+        for v in values:
+            self._off.append(self._off[-1] + len(v))
+        self._blob = "".join(values)
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[self._off[i]:self._off[i + 1]]
+
+    def __len__(self):
+        return len(self._off) - 1
+
+class POITable:
+    '''
+    Columnar POIs for one city:
+    - name / notes: TextColumn
+    - tags: ids into the shared TAGS table, flattened with per-row offsets
+    - popularity, lat, lon: typed arrays (NaN marks a missing coordinate)
+    - any other keys a row carries are kept per row in `extras`
+    Rows become dicts only through row()/rows(), i.e. at the API boundary.
+    '''
+    __slots__ = ("names", "notes", "tag_ids", "tag_off", "popularity", "lat", "lon", "extras", "_has_notes")
+
+    def __init__(self, pois: List[Dict[str, Any]]):
+        self.names = TextColumn(p.get("name", "") for p in pois)
+        self.notes = TextColumn(p.get("notes") or "" for p in pois)
+        self._has_notes = array("b", [p.get("notes") is not None for p in pois])
+        self.tag_ids = array("I")
+        self.tag_off = array("I", [0])
+        for p in pois:
+            self.tag_ids.extend(TAGS.intern(t) for t in p.get("tags", []))
+            self.tag_off.append(len(self.tag_ids))
+        pops = [_popularity(p.get("popularity", 0)) for p in pois]
+        # keep integers integral so rows serialize exactly as the source JSON did
+        self.popularity = array("q" if all(isinstance(v, int) for v in pops) else "d", pops)
+        self.lat = array("d", [_coord(p.get("lat")) for p in pois])
+        self.lon = array("d", [_coord(p.get("lon")) for p in pois])
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        for i, p in enumerate(pois):
+            extra = {k: v for k, v in p.items() if k not in CORE_FIELDS}
+            if extra:
+                self.extras[i] = extra
+
+    def __len__(self):
+        return len(self.names)
+
+    def tags(self, i: int) -> List[str]:
+        return [TAGS[t] for t in self.tag_ids[self.tag_off[i]:self.tag_off[i + 1]]]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        d: Dict[str, Any] = {"name": self.names[i], "tags": self.tags(i), "popularity": self.popularity[i]}
+        if self._has_notes[i]:
+            d["notes"] = self.notes[i]
+        if not math.isnan(self.lat[i]):
+            d["lat"] = self.lat[i]
+            d["lon"] = self.lon[i]
+        if i in self.extras:
+            d.update(self.extras[i])
+        return d
+
+    def rows(self, idx: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        return [self.row(i) for i in (range(len(self)) if idx is None else idx)]
+
+def _popularity(v):
+    # ints stay ints; anything else must read as a number ("95" -> 95.0), else ValueError
+    if isinstance(v, int):
+        return v
+    try:
+        return float(v)
+    except TypeError:
+        raise ValueError(f"popularity is not a number: {v!r}") from None
+
+def _coord(v) -> float:
+    return float("nan") if v is None else float(v)
@@ -0,0 +1,157 @@
+from typing import List, NamedTuple, Optional, Sequence
+import numpy as np
+from geo import haversine_matrix_km
+
+# in-city model used when no routed matrix is available (straight line at town speed + parking/walking)
+INCITY_SPEED_KMH = 25.0
+INCITY_OVERHEAD_MIN = 10.0
+
+class Packing(NamedTuple):
+    days: List[List[int]]         # point indices per day, in visiting order
+    legs_min: List[List[float]]   # travel minutes between consecutive stops of each day
+    transit_min: float
+    baseline_min: float           # same points dealt round-robin in priority order
+
+    @property
+    def saved_min(self) -> float:
+        return self.baseline_min - self.transit_min
+
+def incity_minutes(km: np.ndarray) -> np.ndarray:
+    minutes = km / INCITY_SPEED_KMH * 60 + INCITY_OVERHEAD_MIN
+    np.fill_diagonal(minutes, 0)
+    return minutes
+
+def round_robin(n: int, n_days: int, per_day: int) -> List[List[int]]:
+    '''The original packing: deal points (already in priority order) across days.'''
+    days = [[] for _ in range(max(n_days, 1))]
+    for i in range(min(n, len(days) * per_day)):
+        days[i % len(days)].append(i)
+    return days
+
+def path_minutes(order: Sequence[int], minutes: np.ndarray) -> float:
+    if len(order) < 2:
+        return 0.0
+    o = np.asarray(order)
+    return float(minutes[o[:-1], o[1:]].sum())
+
+def _seeds(sym: np.ndarray, k: int) -> List[int]:
+    # farthest-point seeding from the top-priority point: deterministic and spreads days across the city
+    seeds = [0]
+    near = sym[0].copy()
+    for _ in range(1, k):
+        nxt = int(np.argmax(near))
+        seeds.append(nxt)
+        near = np.minimum(near, sym[nxt])
+    return seeds
+
+def _assign(sym: np.ndarray, medoids: List[int], cap: int) -> np.ndarray:
+    '''Capacity-constrained assignment: cheapest (point, day) pairs first, skipping full days.'''
+    n, k = sym.shape[0], len(medoids)
+    cost = sym[:, medoids]
+    label = np.full(n, -1)
+    size = np.zeros(k, dtype=int)
+    for flat in np.argsort(cost, axis=None, kind="stable"):
+        i, c = divmod(int(flat), k)
+        if label[i] < 0 and size[c] < cap:
+            label[i] = c
+            size[c] += 1
+    return label
+
+def cluster(sym: np.ndarray, k: int, cap: int, max_iter: int = 8) -> List[List[int]]:
+    '''
+    Balanced k-medoids: seed, assign under a per-day capacity, move each medoid
+    to its group's most central member, repeat until the medoids settle.
+    '''
+    n = sym.shape[0]
+    if k >= n:
+        return [[i] for i in range(n)] + [[] for _ in range(k - n)]
+    medoids = _seeds(sym, k)
+    label = _assign(sym, medoids, cap)
+    for _ in range(max_iter):
+        new = []
+        for c in range(k):
+            members = np.flatnonzero(label == c)
+            sub = sym[np.ix_(members, members)]
+            new.append(int(members[np.argmin(sub.sum(axis=1))]))
+        if new == medoids:
+            break
+        medoids = new
+        label = _assign(sym, medoids, cap)
+    return [np.flatnonzero(label == c).tolist() for c in range(k)]
+
+NN_ALL_STARTS = 12  # try every start for days up to this many stops
+
+def _nearest_neighbour(nodes: List[int], sym: np.ndarray) -> List[int]:
+    sub = sym[np.ix_(nodes, nodes)]
+    m = len(nodes)
+    best, best_cost = None, None
+    for start in (range(m) if m <= NN_ALL_STARTS else [0]):
+        seen = np.zeros(m, dtype=bool)
+        order = [start]
+        seen[start] = True
+        for _ in range(m - 1):
+            nxt = int(np.argmin(np.where(seen, np.inf, sub[order[-1]])))
+            order.append(nxt)
+            seen[nxt] = True
+        cost = path_minutes(order, sub)
+        if best_cost is None or cost < best_cost:
+            best, best_cost = order, cost
+    return [nodes[i] for i in best]
+
+def two_opt(order: List[int], sym: np.ndarray, max_passes: int = 20) -> List[int]:
+    '''2-opt on an open path: reverse order[i:j+1] while that shortens it. Each pass scores all j for an i at once.'''
+    o = np.asarray(order)
+    n = len(o)
+    if n < 3:
+        return list(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            j = np.arange(i + 1, n)
+            before = sym[o[i - 1], o[i]] if i > 0 else 0.0
+            after = np.where(j < n - 1, sym[o[j], o[np.minimum(j + 1, n - 1)]], 0.0)
+            new_before = sym[o[i - 1], o[j]] if i > 0 else np.zeros(len(j))
+            new_after = np.where(j < n - 1, sym[o[i], o[np.minimum(j + 1, n - 1)]], 0.0)
+            delta = new_before + new_after - before - after
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                jj = int(j[best])
+                o[i:jj + 1] = o[i:jj + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return o.tolist()
+
+def pack_days(minutes: np.ndarray, n_days: int, per_day: int) -> Packing:
+    '''
+    Group points (indexed in priority order) into `n_days` days of at most
+    `per_day` stops by travel time, then order each day as a short open path.
+    Only the first n_days * per_day points are used, like the round-robin baseline.
+    '''
+    minutes = np.asarray(minutes, dtype=float)
+    n_days = max(n_days, 1)
+    n = min(minutes.shape[0], n_days * per_day)
+    minutes = minutes[:n, :n]
+    baseline = round_robin(n, n_days, per_day)
+    baseline_min = sum(path_minutes(d, minutes) for d in baseline)
+    if n == 0:
+        return Packing(baseline, [[] for _ in baseline], 0.0, 0.0)
+    sym = (minutes + minutes.T) / 2
+    cap = min(per_day, -(-n // n_days))
+    groups = cluster(sym, n_days, cap)
+    days = [two_opt(_nearest_neighbour(g, sym), sym) if g else [] for g in groups]
+    # keep the most popular stop on day one, otherwise days follow their best-ranked stop
+    days.sort(key=lambda d: min(d) if d else n)
+    legs = [[float(minutes[a, b]) for a, b in zip(d, d[1:])] for d in days]
+    total = sum(sum(l) for l in legs)
+    if total > baseline_min:
+        # clustering can lose on tiny or odd inputs; never return a plan worse than the old packing
+        legs = [[float(minutes[a, b]) for a, b in zip(d, d[1:])] for d in baseline]
+        return Packing(baseline, legs, baseline_min, baseline_min)
+    return Packing(days, legs, total, baseline_min)
+
+def travel_minutes(lats: Sequence[float], lons: Sequence[float], routed: Optional[Sequence[Sequence[float]]] = None) -> np.ndarray:
+    '''Routed durations when given, else the in-city straight-line model.'''
+    if routed is not None:
+        return np.asarray(routed, dtype=float)
+    return incity_minutes(haversine_matrix_km(lats, lons))
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session as SQLSession
 from models import init_db, create_session, add_message, save_plan, get_latest_plan, get_messages
 from nlu import parse as nlu_parse
-from planner import plan_itinerary
+from planner import plan_itinerary, iter_plan, plan_diff
+from dialogue_state import get_dialogue_store
 from llm_interface import LLMWrapper
 from telemetry import record_event
 import os, json
@@ -19,15 +21,7 @@ def new_session(initial_text: str = None):
         add_message(sid, "user", initial_text, meta=None)
     return {"session_id": sid}
 
-@router.post("/session/{session_id}/message")
-def session_message(session_id: str, payload: dict):
-    """
-    payload: {"text": "..."}
-    Returns:
-      - nlu
-      - plan (if produced or need_info)
-      - assistant_reply (LLM-generated or clarifier)
-    """
+def _parse_message(session_id: str, payload: dict):
     text = payload.get("text","").strip()
     if not text:
         raise HTTPException(status_code=400, detail="text required")
@@ -40,48 +34,156 @@ def session_message(session_id: str, payload: dict):
     if not isinstance(nlu, dict):
         add_message(session_id, "assistant", "I'm sorry, an internal error occurred while processing your request.", meta={"type": "error"})
         raise HTTPException(status_code=500, detail="NLU parsing failed.")
+    return text, nlu
+
+def _with_state(session_id: str, text: str, nlu: dict):
+    # fold this turn into the session's slots; a follow-up ("make it 4 days", "from Delhi")
+    # only carries the slots it changes, so planning runs on the merged state
+    state = get_dialogue_store().update(session_id, nlu, text)
+    wants_plan = nlu.get("intent") == "plan_trip" or (state["planning"] and bool(state["changed"]))
+    return dict(nlu, entities=state["entities"]), state, wants_plan
+
+def _state_view(state: dict) -> dict:
+    return {k: state[k] for k in ("entities", "provenance", "turn", "changed")}
+
+PLAN_REPLY_FALLBACK = "[STUB] Plan generated. Add more details in further sprints."
+CHAT_REPLY_FALLBACK = "Sorry, I could not answer that right now. Please try again."
+
+def _summary_prompt(plan: dict) -> str:
+    shown = {k: v for k, v in plan.items() if k != "meta"}
+    return "You are an assistant. Summarize this travel plan briefly and give 3 quick tips for the traveler.\n\nPLAN:\n" + json.dumps(shown, ensure_ascii=False, indent=2)
+
+def _chat_prompt(text: str) -> str:
+    return "You are a travel assistant. Answer concisely: " + text
+
+def _store_clarifier(session_id: str, plan: dict):
+    add_message(session_id, "assistant", plan.get("ask"), meta={"type":"clarifier"})
+    try:
+        record_event(endpoint='/session/{session_id}/message', method='POST', latency_ms=0, status_code=200, note='fallback_clarifier', metadata={'session_id':session_id,'missing':plan.get('ask')})
+    except Exception:
+        pass
+
+def _store_plan(session_id: str, plan: dict):
+    save_plan(session_id, plan)
+    try:
+        record_event(endpoint='/plan/save', method='POST', latency_ms=0, status_code=200, note='plan_saved', metadata={'session_id':session_id,'n_days':plan.get('summary',{}).get('n_days')})
+    except Exception:
+        pass
+
+@router.post("/session/{session_id}/message")
+def session_message(session_id: str, payload: dict):
+    """
+    payload: {"text": "..."}
+    Returns:
+      - nlu
+      - plan (if produced or need_info)
+      - assistant_reply (LLM-generated or clarifier)
+    """
+    text, nlu = _parse_message(session_id, payload)
     
     # store user message
     add_message(session_id, "user", text, meta=nlu)
     
-    # try planning if intent is plan_trip
-    if nlu.get("intent") == "plan_trip":
-        plan = plan_itinerary(nlu)
+    # plan on the session's merged slots when this turn asks for (or adds to) a trip
+    merged, state, wants_plan = _with_state(session_id, text, nlu)
+    if wants_plan:
+        nlu = merged
+        prev_plan = get_latest_plan(session_id)
+        plan = plan_itinerary(nlu, session_id=session_id)
         if plan.get("status") == "need_info":
-            clarifier = plan.get("ask")
-            add_message(session_id, "assistant", clarifier, meta={"type":"clarifier"})
-            try:
-                record_event(endpoint='/session/{session_id}/message', method='POST', latency_ms=0, status_code=200, note='fallback_clarifier', metadata={'session_id':session_id,'missing':plan.get('ask')})
-            except Exception:
-                pass
-            return {"nlu": nlu, "plan": plan, "assistant": clarifier}
+            _store_clarifier(session_id, plan)
+            return {"nlu": nlu, "plan": plan, "assistant": plan.get("ask"), "state": _state_view(state)}
         else:
             # store plan
-            save_plan(session_id, plan)
-            try:
-                record_event(endpoint='/plan/save', method='POST', latency_ms=0, status_code=200, note='plan_saved', metadata={'session_id':session_id,'n_days':plan.get('summary',{}).get('n_days')})
-            except Exception:
-                pass
+            _store_plan(session_id, plan)
             # ask LLM to summarize plan (augment stub)
             try:
-                prompt = "You are an assistant. Summarize this travel plan briefly and give 3 quick tips for the traveler.\n\nPLAN:\n" + json.dumps(plan, ensure_ascii=False, indent=2)
-                # call LLM
-                reply = llm.chat(prompt)
+                reply = llm.chat(_summary_prompt(plan))
             except Exception as e:
-                reply = "[STUB] Plan generated. Add more details in further sprints."
+                reply = PLAN_REPLY_FALLBACK
             add_message(session_id, "assistant", reply, meta={"type":"plan_summary"})
-            return {"nlu": nlu, "plan": plan, "assistant": reply}
+            return {"nlu": nlu, "plan": plan, "assistant": reply, "changes": plan_diff(prev_plan, plan),
+                    "state": _state_view(state)}
     else:
         # Not a planning intent: ask LLM for a conversational reply
-        reply = llm.chat("You are a travel assistant. Answer concisely: " + text)
+        reply = llm.chat(_chat_prompt(text))
         add_message(session_id, "assistant", reply)
-        return {"nlu": nlu, "assistant": reply}
+        return {"nlu": nlu, "assistant": reply, "state": _state_view(state)}
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@router.post("/session/{session_id}/message/stream")
+def session_message_stream(session_id: str, payload: dict):
+    """
+    session_message as Server-Sent Events, sent as soon as each part exists:
+      nlu -> (plan_trip) summary, day per day, plan -> token per LLM chunk -> done
+    `done` carries the full assistant text (and the changes for a follow-up).
+    A failure sends an `error` event; a failed LLM reply falls back as in session_message.
+    The user message is stored before streaming; the reply and plan when the stream ends.
+    """
+    text, nlu = _parse_message(session_id, payload)
+    add_message(session_id, "user", text, meta=nlu)
+    return StreamingResponse(_stream_turn(session_id, text, nlu), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _stream_turn(session_id: str, text: str, parsed: dict):
+    yield _sse("nlu", parsed)
+    plan, reply, finished = None, [], False
+    try:
+        nlu, state, wants_plan = _with_state(session_id, text, parsed)
+        done = {"state": _state_view(state)}
+        if wants_plan:
+            prev_plan = get_latest_plan(session_id)
+            for ev in iter_plan(nlu, session_id=session_id):
+                if ev["event"] == "plan":
+                    plan = ev["data"]
+                yield _sse(ev["event"], ev["data"])
+            if plan.get("status") == "need_info":
+                reply.append(plan.get("ask"))
+            else:
+                done["changes"] = plan_diff(prev_plan, plan)
+                prompt = _summary_prompt(plan)
+        else:
+            prompt = _chat_prompt(text)
+        if not reply:
+            try:
+                for piece in llm.chat_stream(prompt):
+                    reply.append(piece)
+                    yield _sse("token", {"text": piece})
+            except Exception as e:
+                yield _sse("error", {"stage": "llm", "detail": str(e)})
+                fallback = PLAN_REPLY_FALLBACK if plan is not None else CHAT_REPLY_FALLBACK
+                reply[:] = [fallback]
+                yield _sse("token", {"text": fallback, "replace": True})
+        finished = True
+        yield _sse("done", dict(done, assistant="".join(reply)))
+    except Exception as e:
+        # state or planning failed: tell the client instead of cutting the stream off
+        yield _sse("error", {"stage": "turn", "detail": str(e)})
+    finally:
+        # also runs when the client goes away mid-stream: keep what was produced
+        if plan is not None and plan.get("status") == "need_info":
+            _store_clarifier(session_id, plan)
+        else:
+            meta = None
+            if plan is not None:
+                _store_plan(session_id, plan)
+                meta = {"type":"plan_summary"}
+            if reply:
+                if not finished:
+                    meta = dict(meta or {}, partial=True)
+                add_message(session_id, "assistant", "".join(reply), meta=meta)
 
 @router.get("/session/{session_id}/messages")
 def session_history(session_id: str):
     msgs = get_messages(session_id)
     return {"messages": msgs}
 
+@router.get("/session/{session_id}/state")
+def session_state(session_id: str):
+    return {"state": get_dialogue_store().get(session_id)}
+
 @router.get("/session/{session_id}/plan")
 def session_plan(session_id: str):
     p = get_latest_plan(session_id)
@@ -1,7 +1,7 @@
 """
 voyagerai/backend/telegram_bot.py
 
-Simple Telegram bot that forwards user messages to the VoyagerAI backend (/session/new and /session/{id}/message)
+Simple Telegram bot that forwards user messages to the VoyagerAI backend (/session/new and /session/{id}/message[/stream])
 Modes:
  - Polling (default): run locally or on a VM/always-on service (small demo only)
  - Webhook: set TELEGRAM_WEBHOOK_URL and use web server to accept updates (for production)
@@ -51,6 +51,34 @@ def send_to_backend(chat_id: str, text: str):
     assistant = j.get("assistant") or j.get("response") or "(no reply)"
     return assistant, j
 
+def stream_from_backend(chat_id: str, text: str):
+    """
+    Yields (event, data) from /session/{id}/message/stream as the backend sends them:
+    nlu, summary, day..., plan, token..., done.
+    """
+    import json
+    sid = ensure_session(str(chat_id))
+    with requests.post(f"{BACKEND_URL}/session/{sid}/message/stream", json={"text": text}, stream=True, timeout=120) as r:
+        r.raise_for_status()
+        event, data = "message", []
+        for line in r.iter_lines(decode_unicode=True):
+            if not line:
+                if data:
+                    yield event, json.loads("\n".join(data))
+                event, data = "message", []
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+
+def progress_text(summary: Optional[dict], days: list) -> str:
+    head = f"Planning {summary.get('destination')} — {summary.get('n_days')} days" if summary else "Got it — working on that..."
+    lines = [head]
+    for d in days:
+        stops = ", ".join(i["name"] for i in d.get("items", []) if i.get("category") != "travel")
+        lines.append(f"Day {d['index'] + 1} ({d.get('date')}): {stops or 'free day'}")
+    return "\n".join(lines)
+
 # --- Polling implementation using python-telegram-bot optional dependency ---
 def start_polling():
     try:
@@ -68,10 +96,22 @@ def start_polling():
     async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         txt = update.message.text or ""
         chat_id = update.message.chat_id
-        await update.message.reply_text("Got it — working on that...")
+        progress = await update.message.reply_text("Got it — working on that...")
         try:
-            assistant, raw = send_to_backend(chat_id, txt)
-            await update.message.reply_text(str(assistant))
+            # edit the progress message as days arrive; the summary text comes as its own reply
+            summary, days, assistant = None, [], None
+            for event, data in stream_from_backend(chat_id, txt):
+                if event == "summary":
+                    summary = data
+                elif event == "day":
+                    days.append(data)
+                elif event == "done":
+                    assistant = data.get("assistant")
+                elif event == "error" and data.get("stage") == "turn":
+                    assistant = "Sorry, something went wrong while planning."
+                if event in ("summary", "day"):
+                    await progress.edit_text(progress_text(summary, days))
+            await update.message.reply_text(str(assistant or "(no reply)"))
         except Exception as e:
             logger.exception("Bot backend failure")
             await update.message.reply_text("Sorry, something went wrong contacting the planner.")
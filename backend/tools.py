@@ -1,232 +1,643 @@
 
-import os, json, time, hashlib
+import os, json, time, asyncio, inspect, threading, hashlib
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Optional, Dict, Any, Tuple
-import requests
+import numpy as np
+from cache import LRUCache, SQLiteCacheStore, SingleFlight, CachePolicy, NegativeResult
+from http_client import get_client, get_async_client, provider_stats
+from fx import FX, FX_BASE
+from gazetteer import get_gazetteer
+from poi_store import get_poi_store
+from geo import haversine_matrix_km
 
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
+CACHE_DB_PATH = os.getenv("TOOL_CACHE_DB", os.path.join(CACHE_DIR, "tools_cache.db"))
 
-def _cache_path(key: str) -> str:
-    h = hashlib.sha256(key.encode("utf-8")).hexdigest()
-    return os.path.join(CACHE_DIR, f"{h}.json")
+# in-process tier in front of the disk cache (hot cities, FX pairs)
+MEMORY_CACHE = LRUCache(max_entries=int(os.getenv("TOOL_CACHE_MEM_ENTRIES", "2048")))
+# single-file disk tier with byte budget + background compaction
+DISK_CACHE = SQLiteCacheStore(
+    CACHE_DB_PATH,
+    max_bytes=int(os.getenv("TOOL_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    compact_interval=float(os.getenv("TOOL_CACHE_COMPACT_INTERVAL", "600")),
+)
 
-def cached_fetch(key: str, ttl: int, fetch_fn):
-    '''
-    Simple cache wrapper. `key` should be stable string for request.
-    ttl in seconds.
-    fetch_fn: function that returns serializable object.
-    '''
-    p = _cache_path(key)
-    now = int(time.time())
-    if os.path.exists(p):
-        try:
-            with open(p,"r",encoding="utf-8") as f:
-                obj = json.load(f)
-            if now - obj.get("_ts",0) < ttl:
-                return obj.get("data")
-        except Exception:
-            pass
-    data = fetch_fn()
+# concurrent misses for one key share a single upstream call
+SINGLE_FLIGHT = SingleFlight(timeout=float(os.getenv("TOOL_SINGLEFLIGHT_TIMEOUT_S", "30")))
+
+# per-provider freshness: soft TTL (fresh), hard TTL (stale-while-revalidate window ends),
+# negative TTL (fallback values returned when the provider failed)
+CACHE_POLICIES = {
+    "pois":     CachePolicy(86400,      86400*7,  600),
+    "poi_xid":  CachePolicy(86400*7,    86400*30, 600),
+    "weather":  CachePolicy(3600*6,     86400,    300),
+    "route":    CachePolicy(86400,      86400*7,  600),
+    "fx":       CachePolicy(3600*12,    86400*2,  300),
+    "country":  CachePolicy(86400*30,   86400*90, 3600),
+    "holidays": CachePolicy(86400*30,   86400*90, 3600),
+}
+_refresh_pool = ThreadPoolExecutor(max_workers=int(os.getenv("TOOL_REFRESH_WORKERS", "2")), thread_name_prefix="cache-refresh")
+# keeps fire-and-forget asyncio tasks (refreshes, late POI details) referenced until done
+_background_tasks = set()
+CACHE_COUNTERS = {"stale_served": 0, "negative_stored": 0, "negative_kept_stale": 0}
+
+def _cache_lookup(key: str, now: float) -> Optional[Tuple[Any, float, float]]:
+    '''(data, stale_at, expires_at) of an entry before its hard expiry, else None.'''
+    hit, entry = MEMORY_CACHE.get(key, now=now)
+    if hit:
+        return entry
+    try:
+        row = DISK_CACHE.get(key, now=now)
+    except Exception:
+        row = None
+    if row is None:
+        return None
+    data, expires_at, stale_at = row
+    entry = (data, stale_at, expires_at)
+    MEMORY_CACHE.set(key, entry, expires_at - now, now=now)
+    return entry
+
+def _cache_put(key: str, data: Any, now: float, stale_at: float, expires_at: float):
     try:
-        with open(p,"w",encoding="utf-8") as f:
-            json.dump({"_ts": now, "data": data}, f, ensure_ascii=False, indent=2)
+        DISK_CACHE.set(key, data, expires_at - now, now=now, stale_after=stale_at - now)
     except Exception:
         pass
+    MEMORY_CACHE.set(key, (data, stale_at, expires_at), expires_at - now, now=now)
+
+def _keep_stale(key: str, stale: Tuple[Any, float, float], policy: CachePolicy) -> Any:
+    # the refresh failed: keep the good value and retry after negative_ttl (never past its hard expiry)
+    now = time.time()
+    CACHE_COUNTERS["negative_kept_stale"] += 1
+    _cache_put(key, stale[0], now, min(now + policy.negative_ttl, stale[2]), stale[2])
+    return stale[0]
+
+def _settle(key: str, data: Any, policy: CachePolicy, stale) -> Any:
+    '''Store a fetch result under the policy and return what the caller should see.'''
+    now = time.time()
+    if isinstance(data, NegativeResult):
+        if stale is not None:
+            return _keep_stale(key, stale, policy)
+        CACHE_COUNTERS["negative_stored"] += 1
+        _cache_put(key, data.value, now, now + policy.negative_ttl, now + policy.negative_ttl)
+        return data.value
+    _cache_put(key, data, now, now + policy.soft_ttl, now + policy.hard_ttl)
     return data
 
+def _fetch_and_settle(key: str, fetch_fn, policy: CachePolicy, stale) -> Any:
+    try:
+        data = fetch_fn()
+    except Exception:
+        if stale is None:
+            raise
+        return _keep_stale(key, stale, policy)
+    return _settle(key, data, policy, stale)
+
+async def _afetch_and_settle(key: str, fetch_fn, policy: CachePolicy, stale) -> Any:
+    try:
+        data = fetch_fn()
+        if inspect.isawaitable(data):
+            data = await data
+    except Exception:
+        if stale is None:
+            raise
+        return _keep_stale(key, stale, policy)
+    return _settle(key, data, policy, stale)
+
+def _fresh_in_memory(key: str):
+    # a previous single-flight leader may have just stored it
+    hit, entry = MEMORY_CACHE.get(key)
+    if hit and time.time() < entry[1]:
+        return True, entry[0]
+    return False, None
+
+def _track_task(t):
+    _background_tasks.add(t)
+    t.add_done_callback(lambda t: (_background_tasks.discard(t), t.cancelled() or t.exception()))
+
+def _policy_for(ttl: Optional[int], policy: Optional[CachePolicy]) -> CachePolicy:
+    if policy is not None:
+        return policy
+    if ttl is None:
+        raise ValueError("cached_fetch needs a ttl or a policy")
+    return CachePolicy(ttl)
+
+def cached_fetch(key: str, ttl: Optional[int] = None, fetch_fn=None, policy: Optional[CachePolicy] = None):
+    '''
+    Two-tier cache wrapper. `key` should be stable string for request.
+    ttl in seconds, or a CachePolicy (soft/hard/negative TTLs) via `policy`.
+    fetch_fn: function that returns serializable object, or NegativeResult(fallback)
+    when the provider failed.
+    Lookup order: in-memory LRU -> SQLite store -> fetch_fn. Stale entries (past the
+    soft TTL) are returned immediately and refreshed in the background; a failed
+    refresh never overwrites them. Concurrent misses for the same key are
+    coalesced: one caller fetches, the others wait for it.
+    Returned objects may be shared with other callers; do not mutate them.
+    '''
+    policy = _policy_for(ttl, policy)
+    now = time.time()
+    entry = _cache_lookup(key, now)
+    if entry is not None:
+        if now < entry[1]:
+            return entry[0]
+        CACHE_COUNTERS["stale_served"] += 1
+        if not SINGLE_FLIGHT.in_flight(key):
+            _refresh_pool.submit(SINGLE_FLIGHT.do, key, lambda: _fetch_and_settle(key, fetch_fn, policy, entry))
+        return entry[0]
+    def fill():
+        hit, data = _fresh_in_memory(key)
+        if hit:
+            return data
+        return _fetch_and_settle(key, fetch_fn, policy, None)
+    return SINGLE_FLIGHT.do(key, fill)
+
+async def acached_fetch(key: str, ttl: Optional[int] = None, fetch_fn=None, policy: Optional[CachePolicy] = None):
+    '''
+    Async twin of cached_fetch. fetch_fn may return a value or an awaitable.
+    Cache tiers are local (memory dict, SQLite page cache) and are read inline.
+    In-flight fetches are shared with both threads and other tasks.
+    '''
+    policy = _policy_for(ttl, policy)
+    now = time.time()
+    entry = _cache_lookup(key, now)
+    if entry is not None:
+        if now < entry[1]:
+            return entry[0]
+        CACHE_COUNTERS["stale_served"] += 1
+        if not SINGLE_FLIGHT.in_flight(key):
+            _track_task(asyncio.ensure_future(
+                SINGLE_FLIGHT.ado(key, lambda: _afetch_and_settle(key, fetch_fn, policy, entry))))
+        return entry[0]
+    async def fill():
+        hit, data = _fresh_in_memory(key)
+        if hit:
+            return data
+        return await _afetch_and_settle(key, fetch_fn, policy, None)
+    return await SINGLE_FLIGHT.ado(key, fill)
+
+def cache_stats() -> Dict[str,Any]:
+    return {"memory": MEMORY_CACHE.stats(), "disk": DISK_CACHE.stats(), "singleflight": SINGLE_FLIGHT.stats(),
+            "freshness": dict(CACHE_COUNTERS), "providers": provider_stats()}
+
 # ---------- Tools clients ----------
 TOOL_MODE = os.getenv("TOOL_MODE","mock").lower()
 OPENTRIPMAP_KEY = os.getenv("OPENTRIPMAP_KEY","")
 OPENROUTESERVICE_KEY = os.getenv("OPENROUTESERVICE_KEY","")
 
+# Each provider's live logic is written once as a generator that yields
+# _Call objects and receives the decoded JSON back (or the exception, thrown in
+# at the yield). _drive runs it with the pooled blocking clients, _adrive with
+# the async ones, so get_x / aget_x share request building and parsing.
+class _Call:
+    __slots__ = ("provider", "method", "url", "kwargs")
+
+    def __init__(self, provider: str, method: str, url: str, **kwargs):
+        self.provider = provider
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+
+def _drive(gen):
+    try:
+        call = next(gen)
+        while True:
+            try:
+                j = get_client(call.provider).request(call.method, call.url, **call.kwargs).json()
+            except Exception as e:
+                call = gen.throw(e)
+            else:
+                call = gen.send(j)
+    except StopIteration as stop:
+        return stop.value
+
+async def _adrive(gen):
+    try:
+        call = next(gen)
+        while True:
+            try:
+                r = await get_async_client(call.provider).request(call.method, call.url, **call.kwargs)
+                j = r.json()
+            except Exception as e:
+                call = gen.throw(e)
+            else:
+                call = gen.send(j)
+    except StopIteration as stop:
+        return stop.value
+
 # ---------- POIs (OpenTripMap) ----------
+def _geocode_fetch(city: str):
+    # bundled gazetteer first; the network is only a fallback for places it does not know
+    gaz = get_gazetteer()
+    hit = gaz.lookup(city)
+    if hit:
+        return (hit.lat, hit.lon)
+    if TOOL_MODE != "mock":
+        # Live: use OpenTripMap geoname
+        try:
+            q = {"name": city, "apikey": OPENTRIPMAP_KEY}
+            j = yield _Call("opentripmap", "GET", "https://api.opentripmap.com/0.1/en/places/geoname", params=q, timeout=15)
+            if j.get("lat") is not None:
+                return (j.get("lat"), j.get("lon"))
+        except Exception:
+            pass
+    # misspellings ("jaipr") still resolve locally
+    hit = gaz.fuzzy(city)
+    return (hit.lat, hit.lon) if hit else None
+
 def get_city_geocode(city: str) -> Optional[Tuple[float,float]]:
     '''Lightweight geocode using OpenTripMap geoname or REST Countries fallback for country.
        Returns (lat, lon) or None
     '''
-    if TOOL_MODE == "mock":
-        map_mock = {"Goa": (15.4909,73.8278), "Jaipur": (26.9124,75.7873), "Manali": (32.2396,77.1887), "Singapore": (1.3521,103.8198)}
-        return map_mock.get(city.title())
-    # Live: use OpenTripMap geoname
+    return _drive(_geocode_fetch(city))
+
+async def aget_city_geocode(city: str) -> Optional[Tuple[float,float]]:
+    return await _adrive(_geocode_fetch(city))
+
+POI_DETAIL_WORKERS = int(os.getenv("POI_DETAIL_WORKERS", "8"))
+POI_DETAIL_DEADLINE_S = float(os.getenv("POI_DETAIL_DEADLINE_S", "8"))
+_poi_detail_pool = ThreadPoolExecutor(max_workers=POI_DETAIL_WORKERS, thread_name_prefix="poi-detail")
+
+def _poi_rate(rate, default: int = 50) -> int:
+    # OpenTripMap rates come as 3, "3" or "3h"; anything without digits gets the default
+    digits = "".join(c for c in str(rate) if c.isdigit())
+    return int(digits) if digits else default
+
+def _poi_feature(d: Dict[str,Any], props: Dict[str,Any]) -> Dict[str,Any]:
+    return {
+        "name": d.get("name") or props.get("name") or "unknown",
+        "tags": list((d.get("kinds") or "").split(","))[:4],
+        "popularity": _poi_rate(d.get("rate", 50)),
+        "notes": d.get("wikipedia_extracts", {}).get("text","")
+    }
+
+def _poi_detail_fetch(xid: str):
+    return (yield _Call("opentripmap", "GET", f"https://api.opentripmap.com/0.1/en/places/xid/{xid}", params={"apikey":OPENTRIPMAP_KEY}, timeout=10))
+
+def get_poi_detail(xid: str) -> Dict[str,Any]:
+    '''OpenTripMap /places/xid details, cached per xid so overlapping radius queries share them.
+       Raises on failure so errors are not cached.'''
+    return cached_fetch(f"poi_xid:{xid}", policy=CACHE_POLICIES["poi_xid"], fetch_fn=lambda: _drive(_poi_detail_fetch(xid)))
+
+async def aget_poi_detail(xid: str) -> Dict[str,Any]:
+    return await acached_fetch(f"poi_xid:{xid}", policy=CACHE_POLICIES["poi_xid"], fetch_fn=lambda: _adrive(_poi_detail_fetch(xid)))
+
+def _merge_poi_details(places, details: Dict[int,Any]):
+    return [_poi_feature(details.get(i, props), props) for i, props in enumerate(places)]
+
+def _fetch_poi_details(places, deadline_s: float):
+    '''
+    Fetch details for every place concurrently. Whatever is not back within
+    deadline_s falls back to the radius-search properties (partial result);
+    the stragglers keep running and land in the per-xid cache for next time.
+    '''
+    futures = {}
+    for i, props in enumerate(places):
+        xid = props.get("xid")
+        if xid:
+            futures[i] = _poi_detail_pool.submit(get_poi_detail, xid)
+    if futures:
+        wait(list(futures.values()), timeout=deadline_s)
+    details = {i: f.result() for i, f in futures.items() if f.done() and f.exception() is None}
+    return _merge_poi_details(places, details)
+
+async def _afetch_poi_details(places, deadline_s: float):
+    tasks = {}
+    for i, props in enumerate(places):
+        xid = props.get("xid")
+        if xid:
+            tasks[i] = asyncio.ensure_future(aget_poi_detail(xid))
+    if tasks:
+        await asyncio.wait(list(tasks.values()), timeout=deadline_s)
+    details = {}
+    for i, t in tasks.items():
+        if t.done():
+            if t.exception() is None:
+                details[i] = t.result()
+        else:
+            # late details keep running and fill the cache for next time
+            _track_task(t)
+    return _merge_poi_details(places, details)
+
+def _pois_mock(city: str):
+    # per-city files from the shared POI store (data/pois/<city>.json)
+    return list(get_poi_store().pois(city))
+
+def _places_fetch(city: str, radius_m: int, limit: int):
+    # Live: OpenTripMap radius search, cached as a list of place properties;
+    # details are fetched in parallel and cached per xid.
+    coords = yield from _geocode_fetch(city)
+    if not coords:
+        return NegativeResult([])
+    lat, lon = coords
     try:
-        q = {"name": city, "apikey": OPENTRIPMAP_KEY}
-        r = requests.get("https://api.opentripmap.com/0.1/en/places/geoname", params=q, timeout=15)
-        r.raise_for_status()
-        j = r.json()
-        return (j.get("lat"), j.get("lon"))
+        params = {"apikey": OPENTRIPMAP_KEY, "radius": radius_m, "limit": limit, "offset":0, "lon":lon, "lat":lat}
+        j = yield _Call("opentripmap", "GET", "https://api.opentripmap.com/0.1/en/places/radius", params=params, timeout=15)
+        return [item.get("properties",{}) for item in j.get("features", [])]
     except Exception:
-        return None
+        return NegativeResult([])
 
 def get_pois(city: str, radius_m: int=10000, limit: int=30):
-    key = f"pois:{city}:{radius_m}:{limit}:{TOOL_MODE}"
-    def fetch():
-        if TOOL_MODE == "mock":
-            # read mock from data/mock_pois.json (same structure as used earlier)
-            try:
-                here = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "mock_pois.json")
-                with open(here,"r",encoding="utf-8") as f:
-                    data = json.load(f)
-                return data.get(city.title(), [])
-            except Exception:
-                return []
-        # Live: call OpenTripMap radius search (two-step: bbox -> places list -> details)
-        coords = get_city_geocode(city)
-        if not coords:
-            return []
-        lat, lon = coords
-        try:
-            params = {"apikey": OPENTRIPMAP_KEY, "radius": radius_m, "limit": limit, "offset":0, "lon":lon, "lat":lat}
-            r = requests.get("https://api.opentripmap.com/0.1/en/places/radius", params=params, timeout=15)
-            r.raise_for_status()
-            j = r.json()
-            features = []
-            for item in j.get("features", []):
-                props = item.get("properties",{})
-                xid = props.get("xid")
-                # get details
-                if xid:
-                    try:
-                        dr = requests.get(f"https://api.opentripmap.com/0.1/en/places/xid/{xid}", params={"apikey":OPENTRIPMAP_KEY}, timeout=10)
-                        dr.raise_for_status()
-                        d = dr.json()
-                    except Exception:
-                        d = props
-                else:
-                    d = props
-                features.append({
-                    "name": d.get("name") or props.get("name") or "unknown",
-                    "tags": list(d.get("kinds","").split(","))[:4],
-                    "popularity": int(d.get("rate", 50)),
-                    "notes": d.get("wikipedia_extracts", {}).get("text","")
-                })
-            return features
-        except Exception:
-            return []
-    # ttl: 24 hours
-    return cached_fetch(key, ttl=86400, fetch_fn=fetch)
+    if TOOL_MODE == "mock":
+        # the store is already in memory and reloads changed files, so no tool cache in front of it
+        return _pois_mock(city)
+    places = cached_fetch(f"pois_radius:{city}:{radius_m}:{limit}:{TOOL_MODE}", policy=CACHE_POLICIES["pois"],
+                          fetch_fn=lambda: _drive(_places_fetch(city, radius_m, limit)))
+    return _fetch_poi_details(places, POI_DETAIL_DEADLINE_S)
+
+async def aget_pois(city: str, radius_m: int=10000, limit: int=30):
+    if TOOL_MODE == "mock":
+        return get_pois(city, radius_m, limit)
+    places = await acached_fetch(f"pois_radius:{city}:{radius_m}:{limit}:{TOOL_MODE}", policy=CACHE_POLICIES["pois"],
+                                 fetch_fn=lambda: _adrive(_places_fetch(city, radius_m, limit)))
+    return await _afetch_poi_details(places, POI_DETAIL_DEADLINE_S)
 
 # ---------- Weather (Open-Meteo) ----------
+def _weather_fetch(lat: float, lon: float, start_date: str, end_date: str):
+    if TOOL_MODE == "mock":
+        # simple synthetic daily forecast
+        sd = datetime.fromisoformat(start_date)
+        ed = datetime.fromisoformat(end_date)
+        res = []
+        cur = sd
+        while cur <= ed:
+            res.append({"date": cur.date().isoformat(), "temp_max": 30, "temp_min": 24, "weathercode": 0})
+            cur += timedelta(days=1)
+        return {"daily": res}
+    # Live call
+    try:
+        params = {
+            "latitude": lat, "longitude": lon,
+            "daily": "temperature_2m_max,temperature_2m_min,weathercode",
+            "start_date": start_date, "end_date": end_date, "timezone":"UTC"
+        }
+        j = yield _Call("open_meteo", "GET", "https://api.open-meteo.com/v1/forecast", params=params, timeout=15)
+        # transform
+        days = []
+        dates = j.get("daily", {}).get("time", [])
+        tmax = j.get("daily", {}).get("temperature_2m_max", [])
+        tmin = j.get("daily", {}).get("temperature_2m_min", [])
+        wc = j.get("daily", {}).get("weathercode", [])
+        for i, d in enumerate(dates):
+            days.append({"date": d, "temp_max": tmax[i], "temp_min": tmin[i], "weathercode": wc[i]})
+        return {"daily": days}
+    except Exception:
+        return NegativeResult({"daily": []})
+
+# Forecasts are stored per grid cell as a per-day series ("weather_cell:<lat>:<lon>"),
+# so any date range is a slice and only days not yet held are fetched upstream.
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", "0.1"))
+_weather_merge_lock = threading.Lock()
+
+def _weather_cell(lat: float, lon: float) -> Tuple[float, float]:
+    g = WEATHER_GRID_DEG
+    return round(round(lat / g) * g, 4), round(round(lon / g) * g, 4)
+
+def _date_span(start_date: str, end_date: str):
+    sd = date.fromisoformat(start_date[:10])
+    ed = date.fromisoformat(end_date[:10])
+    return [(sd + timedelta(days=i)).isoformat() for i in range((ed - sd).days + 1)]
+
+def _weather_held(day: Optional[Dict[str,Any]], now: float) -> bool:
+    # a day upstream could not serve is held as a "_none" marker for the negative TTL
+    if day is None:
+        return False
+    return not day.get("_none") or day["_ts"] > now - CACHE_POLICIES["weather"].negative_ttl
+
+def _weather_plan(lat: float, lon: float, start_date: str, end_date: str):
+    '''Returns (cell, key, wanted days, held series, missing days, stale days).'''
+    cell = _weather_cell(lat, lon)
+    key = f"weather_cell:{cell[0]}:{cell[1]}:{TOOL_MODE}"
+    wanted = _date_span(start_date, end_date)
+    now = time.time()
+    entry = _cache_lookup(key, now)
+    series = entry[0] if entry else {}
+    soft_before = now - CACHE_POLICIES["weather"].soft_ttl
+    missing = [d for d in wanted if not _weather_held(series.get(d), now)]
+    stale = [d for d in wanted if d in series and not series[d].get("_none") and series[d]["_ts"] < soft_before]
+    return cell, key, wanted, series, missing, stale
+
+def _weather_merge(key: str, fetched, first: str, last: str) -> Dict[str,Any]:
+    '''
+    Merge the days fetched for first..last into the cell series. Days that did not
+    come back (past the forecast horizon, or the call failed) are stored as "_none"
+    markers for the negative TTL, so asking again does not reach the provider;
+    days already held keep their values.
+    '''
+    with _weather_merge_lock:
+        now = time.time()
+        entry = _cache_lookup(key, now)
+        series = dict(entry[0]) if entry else {}
+        if isinstance(fetched, NegativeResult):
+            CACHE_COUNTERS["negative_kept_stale" if series else "negative_stored"] += 1
+            fetched = {"daily": []}
+        for day in fetched.get("daily", []):
+            series[day["date"]] = dict(day, _ts=now)
+        for d in _date_span(first, last):
+            if d not in series or (series[d].get("_none") and not _weather_held(series[d], now)):
+                series[d] = {"_ts": now, "_none": True}
+        # past days are rarely asked for again: keep them only while they still
+        # stand in for a fetch (the negative TTL), so the stored series stays short
+        cutoff = (date.today() - timedelta(days=2)).isoformat()
+        recent = now - CACHE_POLICIES["weather"].negative_ttl
+        series = {d: v for d, v in series.items() if d >= cutoff or v["_ts"] > recent}
+        hard = CACHE_POLICIES["weather"].hard_ttl
+        _cache_put(key, series, now, now + hard, now + hard)
+        return series
+
+def _weather_slice(series: Dict[str,Any], wanted) -> Dict[str,Any]:
+    return {"daily": [{k: v for k, v in series[d].items() if k != "_ts"}
+                      for d in wanted if d in series and not series[d].get("_none")]}
+
 def get_weather(lat: float, lon: float, start_date: str, end_date: str) -> Dict[str,Any]:
-    key = f"weather:{lat}:{lon}:{start_date}:{end_date}:{TOOL_MODE}"
-    def fetch():
-        if TOOL_MODE == "mock":
-            # simple synthetic daily forecast
-            from datetime import datetime, timedelta
-            sd = datetime.fromisoformat(start_date)
-            ed = datetime.fromisoformat(end_date)
-            res = []
-            cur = sd
-            while cur <= ed:
-                res.append({"date": cur.date().isoformat(), "temp_max": 30, "temp_min": 24, "weathercode": 0})
-                cur += timedelta(days=1)
-            return {"daily": res}
-        # Live call
+    cell, key, wanted, series, missing, stale = _weather_plan(lat, lon, start_date, end_date)
+    if missing:
+        # one upstream call covering the missing span, shared by concurrent callers
+        sf_key = f"{key}:{missing[0]}:{missing[-1]}"
+        series = SINGLE_FLIGHT.do(sf_key, lambda: _weather_merge(key, _drive(_weather_fetch(cell[0], cell[1], missing[0], missing[-1])), missing[0], missing[-1]))
+    elif stale:
+        CACHE_COUNTERS["stale_served"] += 1
+        sf_key = f"{key}:{stale[0]}:{stale[-1]}"
+        if not SINGLE_FLIGHT.in_flight(sf_key):
+            _refresh_pool.submit(SINGLE_FLIGHT.do, sf_key, lambda: _weather_merge(key, _drive(_weather_fetch(cell[0], cell[1], stale[0], stale[-1])), stale[0], stale[-1]))
+    return _weather_slice(series, wanted)
+
+async def aget_weather(lat: float, lon: float, start_date: str, end_date: str) -> Dict[str,Any]:
+    cell, key, wanted, series, missing, stale = _weather_plan(lat, lon, start_date, end_date)
+    async def fill(first: str, last: str):
+        return _weather_merge(key, await _adrive(_weather_fetch(cell[0], cell[1], first, last)), first, last)
+    if missing:
+        series = await SINGLE_FLIGHT.ado(f"{key}:{missing[0]}:{missing[-1]}", lambda: fill(missing[0], missing[-1]))
+    elif stale:
+        CACHE_COUNTERS["stale_served"] += 1
+        sf_key = f"{key}:{stale[0]}:{stale[-1]}"
+        if not SINGLE_FLIGHT.in_flight(sf_key):
+            _track_task(asyncio.ensure_future(SINGLE_FLIGHT.ado(sf_key, lambda: fill(stale[0], stale[-1]))))
+    return _weather_slice(series, wanted)
+
+# ---------- Routing & Distance (OpenRouteService or OSRM) ----------
+def _route_fetch(lat1, lon1, lat2, lon2):
+    if TOOL_MODE == "mock":
+        # simple straight-line distance and 1h travel
+        from math import radians, sin, cos, sqrt, atan2
+        R = 6371.0
+        dlat = radians(lat2 - lat1)
+        dlon = radians(lon2 - lon1)
+        a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+        c = 2 * atan2(sqrt(a), sqrt(1-a))
+        km = R * c
+        return {"distance_km": round(km,1), "duration_min": int(km/40*60)+30}
+    # Live with OpenRouteService if key present
+    if OPENROUTESERVICE_KEY:
         try:
-            params = {
-                "latitude": lat, "longitude": lon,
-                "daily": "temperature_2m_max,temperature_2m_min,weathercode",
-                "start_date": start_date, "end_date": end_date, "timezone":"UTC"
-            }
-            r = requests.get("https://api.open-meteo.com/v1/forecast", params=params, timeout=15)
-            r.raise_for_status()
-            j = r.json()
-            # transform
-            days = []
-            dates = j.get("daily", {}).get("time", [])
-            tmax = j.get("daily", {}).get("temperature_2m_max", [])
-            tmin = j.get("daily", {}).get("temperature_2m_min", [])
-            wc = j.get("daily", {}).get("weathercode", [])
-            for i, d in enumerate(dates):
-                days.append({"date": d, "temp_max": tmax[i], "temp_min": tmin[i], "weathercode": wc[i]})
-            return {"daily": days}
+            headers = {"Authorization": OPENROUTESERVICE_KEY, "Accept":"application/json", "Content-Type":"application/json"}
+            body = {"coordinates":[[lon1,lat1],[lon2,lat2]]}
+            j = yield _Call("openrouteservice", "POST", "https://api.openrouteservice.org/v2/directions/driving-car/geojson", json=body, headers=headers, timeout=15)
+            props = j["features"][0]["properties"]["summary"]
+            return {"distance_km": round(props["distance"]/1000,1), "duration_min": int(props["duration"]/60)}
         except Exception:
-            return {"daily": []}
-    return cached_fetch(key, ttl=3600*6, fetch_fn=fetch)  # 6 hours
+            pass
+    # fallback to OSRM public
+    try:
+        j = yield _Call("osrm", "GET", f"http://router.project-osrm.org/route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=false", timeout=15)
+        route = j.get("routes",[{}])[0]
+        return {"distance_km": round(route.get("distance",0)/1000,1), "duration_min": int(route.get("duration",0)/60)}
+    except Exception:
+        return NegativeResult({"distance_km": 0, "duration_min": 0})
 
-# ---------- Routing & Distance (OpenRouteService or OSRM) ----------
 def get_route(lat1, lon1, lat2, lon2):
     key = f"route:{lat1}:{lon1}:{lat2}:{lon2}:{TOOL_MODE}"
-    def fetch():
-        if TOOL_MODE == "mock":
-            # simple straight-line distance and 1h travel
-            from math import radians, sin, cos, sqrt, atan2
-            R = 6371.0
-            dlat = radians(lat2 - lat1)
-            dlon = radians(lon2 - lon1)
-            a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            km = R * c
-            return {"distance_km": round(km,1), "duration_min": int(km/40*60)+30}
-        # Live with OpenRouteService if key present
-        if OPENROUTESERVICE_KEY:
-            try:
-                headers = {"Authorization": OPENROUTESERVICE_KEY, "Accept":"application/json", "Content-Type":"application/json"}
-                body = {"coordinates":[[lon1,lat1],[lon2,lat2]]}
-                r = requests.post("https://api.openrouteservice.org/v2/directions/driving-car/geojson", json=body, headers=headers, timeout=15)
-                r.raise_for_status()
-                j = r.json()
-                props = j["features"][0]["properties"]["summary"]
-                return {"distance_km": round(props["distance"]/1000,1), "duration_min": int(props["duration"]/60)}
-            except Exception:
-                pass
-        # fallback to OSRM public
+    return cached_fetch(key, policy=CACHE_POLICIES["route"], fetch_fn=lambda: _drive(_route_fetch(lat1, lon1, lat2, lon2)))
+
+async def aget_route(lat1, lon1, lat2, lon2):
+    key = f"route:{lat1}:{lon1}:{lat2}:{lon2}:{TOOL_MODE}"
+    return await acached_fetch(key, policy=CACHE_POLICIES["route"], fetch_fn=lambda: _adrive(_route_fetch(lat1, lon1, lat2, lon2)))
+
+# ---------- Distance matrix (OpenRouteService matrix / OSRM table) ----------
+def _estimate_matrix(points) -> Dict[str,Any]:
+    # same straight-line model as the mock get_route: 40 km/h plus 30 min overhead per leg
+    km = haversine_matrix_km([p[0] for p in points], [p[1] for p in points])
+    minutes = (km / 40 * 60).astype(int) + 30
+    np.fill_diagonal(minutes, 0)
+    return {"distance_km": np.round(km, 1).tolist(), "duration_min": minutes.tolist()}
+
+def _matrix_fetch(points):
+    if TOOL_MODE == "mock":
+        return _estimate_matrix(points)
+    if OPENROUTESERVICE_KEY:
         try:
-            r = requests.get(f"http://router.project-osrm.org/route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=false", timeout=15)
-            r.raise_for_status()
-            j = r.json()
-            route = j.get("routes",[{}])[0]
-            return {"distance_km": round(route.get("distance",0)/1000,1), "duration_min": int(route.get("duration",0)/60)}
+            headers = {"Authorization": OPENROUTESERVICE_KEY, "Accept":"application/json", "Content-Type":"application/json"}
+            body = {"locations": [[lon, lat] for lat, lon in points], "metrics": ["distance", "duration"]}
+            j = yield _Call("openrouteservice", "POST", "https://api.openrouteservice.org/v2/matrix/driving-car", json=body, headers=headers, timeout=15)
+            return {"distance_km": np.round(np.asarray(j["distances"], dtype=float) / 1000, 1).tolist(),
+                    "duration_min": (np.asarray(j["durations"], dtype=float) // 60).astype(int).tolist()}
         except Exception:
-            return {"distance_km": 0, "duration_min": 0}
-    return cached_fetch(key, ttl=86400, fetch_fn=fetch)
+            pass
+    try:
+        coords = ";".join(f"{lon},{lat}" for lat, lon in points)
+        j = yield _Call("osrm", "GET", f"http://router.project-osrm.org/table/v1/driving/{coords}", params={"annotations": "distance,duration"}, timeout=15)
+        return {"distance_km": np.round(np.asarray(j["distances"], dtype=float) / 1000, 1).tolist(),
+                "duration_min": (np.asarray(j["durations"], dtype=float) // 60).astype(int).tolist()}
+    except Exception:
+        return NegativeResult(_estimate_matrix(points))
+
+def _matrix_key(points):
+    '''
+    Canonical (sorted, de-duplicated, rounded) point set and the position of each
+    input point in it. The matrix is cached once per set, so any ordering or
+    repetition of the same POIs reuses it.
+    '''
+    rounded = [(round(float(lat), 5), round(float(lon), 5)) for lat, lon in points]
+    canon = sorted(set(rounded))
+    pos = {p: i for i, p in enumerate(canon)}
+    digest = hashlib.sha1(";".join(f"{a},{b}" for a, b in canon).encode("utf-8")).hexdigest()
+    return f"matrix:{digest}:{TOOL_MODE}", canon, [pos[p] for p in rounded]
+
+def _reorder_matrix(m: Dict[str,Any], idx) -> Dict[str,Any]:
+    ix = np.ix_(idx, idx)
+    return {"distance_km": np.asarray(m["distance_km"])[ix].tolist(),
+            "duration_min": np.asarray(m["duration_min"])[ix].tolist()}
+
+def get_distance_matrix(points) -> Dict[str,Any]:
+    '''
+    All-pairs travel for `points` [(lat, lon), ...] in one request:
+    {"distance_km": NxN, "duration_min": NxN}, rows/cols in input order.
+    Live: OpenRouteService matrix, else OSRM table; mock/fallback: vectorized haversine.
+    '''
+    if len(points) == 0:
+        return {"distance_km": [], "duration_min": []}
+    key, canon, idx = _matrix_key(points)
+    m = cached_fetch(key, policy=CACHE_POLICIES["route"], fetch_fn=lambda: _drive(_matrix_fetch(canon)))
+    return _reorder_matrix(m, idx)
+
+async def aget_distance_matrix(points) -> Dict[str,Any]:
+    if len(points) == 0:
+        return {"distance_km": [], "duration_min": []}
+    key, canon, idx = _matrix_key(points)
+    m = await acached_fetch(key, policy=CACHE_POLICIES["route"], fetch_fn=lambda: _adrive(_matrix_fetch(canon)))
+    return _reorder_matrix(m, idx)
 
 # ---------- Currency conversion (Frankfurter) ----------
+# Conversions go through fx.FX, which keeps one base-currency rate table in memory
+# and derives every cross rate from it; only the table itself is fetched and cached.
+def _fx_table_fetch(base: str):
+    try:
+        j = yield _Call("frankfurter", "GET", "https://api.frankfurter.app/latest", params={"from": base.upper()}, timeout=10)
+        return {"base": j.get("base", base.upper()), "date": j.get("date"), "rates": j.get("rates", {})}
+    except Exception:
+        return NegativeResult({})
+
+def get_fx_table(base: str = FX_BASE) -> Dict[str,Any]:
+    '''Latest rates as units of each currency per one `base`. Empty in mock mode (fx uses its static table).'''
+    if TOOL_MODE == "mock":
+        return {}
+    return cached_fetch(f"fx_table:{base.upper()}:{TOOL_MODE}", policy=CACHE_POLICIES["fx"], fetch_fn=lambda: _drive(_fx_table_fetch(base)))
+
 def convert_currency(amount: float, frm: str, to: str):
-    key = f"fx:{frm}:{to}:{TOOL_MODE}"
-    def fetch():
-        if TOOL_MODE == "mock":
-            # naive static rates
-            rates = {"USD_INR":83.0, "EUR_INR":90.0, "INR_USD":1/83.0}
-            k = f"{frm.upper()}_{to.upper()}"
-            r = rates.get(k, 1.0)
-            return {"rate": r, "converted": round(amount * r, 2)}
-        # Live: frankfurter
-        try:
-            r = requests.get(f"https://api.frankfurter.app/latest", params={"from":frm.upper(),"to":to.upper()}, timeout=10)
-            r.raise_for_status()
-            j = r.json()
-            rate = list(j.get("rates", {}).values())[0]
-            return {"rate": rate, "converted": round(amount * rate, 2)}
-        except Exception:
-            return {"rate":1.0, "converted": amount}
-    return cached_fetch(key, ttl=3600*12, fetch_fn=fetch)
+    rate = FX.rate(frm, to)
+    return {"rate": rate, "converted": round(amount * rate, 2)}
+
+async def aconvert_currency(amount: float, frm: str, to: str):
+    if not FX.loaded:
+        # first use may hit the cache file or upstream; keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, FX.table)
+    return convert_currency(amount, frm, to)
+
+def convert_currency_batch(amounts, currencies, to: str = "INR"):
+    '''Vectorized conversion of many amounts/currencies to one target currency (numpy array).'''
+    return FX.convert_many(amounts, currencies, to)
 
 # ---------- Country info (REST Countries) ----------
+def _country_fetch(name: str):
+    if TOOL_MODE == "mock":
+        mock = {"India":{"cca2":"IN","name":"India","region":"Asia"}, "Singapore":{"cca2":"SG","name":"Singapore","region":"Asia"}}
+        return mock.get(name.title(), {"name":name})
+    try:
+        j = yield _Call("restcountries", "GET", f"https://restcountries.com/v3.1/name/{name}", timeout=15)
+        return j[0]
+    except Exception:
+        return NegativeResult({"name": name})
+
 def get_country_info(name: str):
     key = f"country:{name}:{TOOL_MODE}"
-    def fetch():
-        if TOOL_MODE == "mock":
-            mock = {"India":{"cca2":"IN","name":"India","region":"Asia"}, "Singapore":{"cca2":"SG","name":"Singapore","region":"Asia"}}
-            return mock.get(name.title(), {"name":name})
-        try:
-            r = requests.get(f"https://restcountries.com/v3.1/name/{name}", timeout=15)
-            r.raise_for_status()
-            j = r.json()
-            return j[0]
-        except Exception:
-            return {"name": name}
-    return cached_fetch(key, ttl=86400*30, fetch_fn=fetch)
+    return cached_fetch(key, policy=CACHE_POLICIES["country"], fetch_fn=lambda: _drive(_country_fetch(name)))
+
+async def aget_country_info(name: str):
+    key = f"country:{name}:{TOOL_MODE}"
+    return await acached_fetch(key, policy=CACHE_POLICIES["country"], fetch_fn=lambda: _adrive(_country_fetch(name)))
 
 # ---------- Holidays (Nager.Date) ----------
+def _holidays_fetch(country_code: str, year: int):
+    if TOOL_MODE == "mock":
+        return []
+    try:
+        return (yield _Call("nager_date", "GET", f"https://date.nager.at/api/v3/PublicHolidays/{year}/{country_code}", timeout=15))
+    except Exception:
+        return NegativeResult([])
+
 def get_public_holidays(country_code: str, year: int):
     key = f"holidays:{country_code}:{year}:{TOOL_MODE}"
-    def fetch():
-        if TOOL_MODE == "mock":
-            return []
-        try:
-            r = requests.get(f"https://date.nager.at/api/v3/PublicHolidays/{year}/{country_code}", timeout=15)
-            r.raise_for_status()
-            return r.json()
-        except Exception:
-            return []
-    return cached_fetch(key, ttl=86400*30, fetch_fn=fetch)
+    return cached_fetch(key, policy=CACHE_POLICIES["holidays"], fetch_fn=lambda: _drive(_holidays_fetch(country_code, year)))
+
+async def aget_public_holidays(country_code: str, year: int):
+    key = f"holidays:{country_code}:{year}:{TOOL_MODE}"
+    return await acached_fetch(key, policy=CACHE_POLICIES["holidays"], fetch_fn=lambda: _adrive(_holidays_fetch(country_code, year)))
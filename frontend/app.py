@@ -1,4 +1,5 @@
 import os
+import json
 import requests
 import streamlit as st
 
@@ -29,23 +30,68 @@ def new_session():
         st.error(f"Error creating new session: {e}")
         st.session_state.session_id = None
 
+def sse_events(resp):
+    """Yields (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+def render_progress(summary, days, reply):
+    """Markdown for a reply still streaming in: the trip header, the days planned so far, then the summary text."""
+    parts = []
+    if summary:
+        parts.append(f"**{summary.get('destination')}** · {summary.get('n_days')} days · est. ₹{summary.get('est_cost_inr')}")
+    for day in days:
+        stops = ", ".join(i["name"] for i in day.get("items", []) if i.get("category") != "travel") or "free day"
+        where = f" ({day['city']})" if day.get("city") else ""
+        parts.append(f"- **Day {day['index'] + 1}** {day.get('date')}{where}: {stops}")
+    if reply:
+        parts.append(reply)
+    return "\n\n".join(parts)
+
 def send_message(text):
-    """Sends a message to the backend and appends the response to the chat history."""
+    """Streams the reply from the backend, showing each part as it arrives, then appends it to the chat history."""
     if st.session_state.session_id:
+        st.session_state.chat_history.append({"role": "user", "content": text})
+        with st.chat_message("user"):
+            st.write(text)
+        with st.chat_message("VoyagerAI"):
+            placeholder = st.empty()
+            placeholder.markdown("_Planning..._")
+        summary, days, reply = None, [], ""
         try:
-            r = requests.post(
-                f"{BACKEND_URL}/session/{st.session_state.session_id}",
-                json={"prompt": text}
-            )
-            r.raise_for_status()
-            response_data = r.json()
-            st.session_state.chat_history.append({"role": "user", "content": text})
-            st.session_state.chat_history.append({"role": "VoyagerAI", "content": response_data.get("message")})
+            with requests.post(
+                f"{BACKEND_URL}/session/{st.session_state.session_id}/message/stream",
+                json={"text": text}, stream=True, timeout=120
+            ) as r:
+                r.raise_for_status()
+                for event, data in sse_events(r):
+                    if event == "summary":
+                        summary = data
+                    elif event == "day":
+                        days.append(data)
+                    elif event == "token":
+                        # a fallback reply replaces whatever the LLM streamed before failing
+                        reply = data["text"] if data.get("replace") else reply + data["text"]
+                    elif event == "error" and data.get("stage") == "turn":
+                        reply = f"Error: {data.get('detail')}"
+                    elif event == "done":
+                        reply = data.get("assistant", reply)
+                    else:
+                        continue
+                    placeholder.markdown(render_progress(summary, days, reply))
+            st.session_state.chat_history.append({"role": "VoyagerAI", "content": render_progress(summary, days, reply)})
             # Use st.rerun() which is the modern replacement for st.experimental_rerun()
             st.rerun()
         except requests.exceptions.RequestException as e:
             st.error(f"Error sending message: {e}")
-            st.session_state.chat_history.append({"role": "user", "content": text})
             st.session_state.chat_history.append({"role": "VoyagerAI", "content": f"Error: {e}"})
 
 # Main app UI
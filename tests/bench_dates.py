@@ -0,0 +1,75 @@
+"""
+Run: python tests/bench_dates.py [repeats]
+Date/duration extraction on tests/date_corpus.jsonl (hand-labelled, relative to
+TODAY): accuracy and time per message for
+ - legacy: the regex + fuzzy dateutil extractor nlu used before dates.py
+   (kept here verbatim as the reference, with the year passed in instead of now())
+ - engine: dates.extract on the message's tokens (tokenizing included)
+A case counts as correct only when start_date, end_date and n_days all match.
+"""
+import os, sys, re, json, time
+from datetime import date
+import dateutil.parser as dateparser
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "backend"))
+import dates
+from lexicon import tokenize
+
+TODAY = date(2026, 10, 14)
+
+def legacy_extract_dates(text, cur_year=TODAY.year):
+    t = text
+    t = re.sub(r"(\d{1,2})\s*(to|-)\s*(\d{1,2})", r"\1-\3", t, flags=re.I)
+    start = end = None
+    try:
+        months = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june|july|august|september|october|november|december)"
+        rng = re.search(rf"(\d{{1,2}})[\s-]*(\d{{1,2}})?\s*({months})", t, flags=re.I)
+        if rng:
+            d1 = f"{rng.group(1)} {rng.group(3)} {cur_year}"
+            start = dateparser.parse(d1, fuzzy=True, dayfirst=True)
+            if rng.group(2):
+                d2 = f"{rng.group(2)} {rng.group(3)} {cur_year}"
+                end = dateparser.parse(d2, fuzzy=True, dayfirst=True)
+        else:
+            single = re.search(rf"(\d{{1,2}}\s*{months})", t, flags=re.I)
+            if single:
+                d1 = f"{single.group(0)} {cur_year}"
+                start = dateparser.parse(d1, fuzzy=True, dayfirst=True)
+    except Exception:
+        pass
+    dur = None
+    md = re.search(r"(\d+)\s*(day|days|night|nights)", t, flags=re.I)
+    if md:
+        dur = int(md.group(1))
+    else:
+        if re.search(r"week(end)?", t, flags=re.I):
+            dur = 2
+    out = {}
+    if start: out["start_date"] = start.date().isoformat()
+    if end: out["end_date"] = end.date().isoformat()
+    if dur: out["n_days"] = dur
+    return out if out else None
+
+def engine(text):
+    return dates.extract(tokenize(text), TODAY)
+
+with open(os.path.join(HERE, "date_corpus.jsonl"), encoding="utf-8") as f:
+    corpus = [json.loads(line) for line in f if line.strip()]
+repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+results = {"n_cases": len(corpus)}
+for name, fn in [("legacy", legacy_extract_dates), ("engine", engine)]:
+    wrong = [c["text"] for c in corpus if fn(c["text"]) != c["expect"]]
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for c in corpus:
+            fn(c["text"])
+    us = (time.perf_counter() - t0) / (repeats * len(corpus)) * 1e6
+    results[name] = {"correct": len(corpus) - len(wrong), "us_per_msg": round(us, 1), "wrong": wrong}
+    print(f"{name:7} {len(corpus) - len(wrong)}/{len(corpus)} correct  {us:7.1f} us/msg")
+
+# every case the legacy extractor got right must still be right
+regressed = [c["text"] for c in corpus
+             if legacy_extract_dates(c["text"]) == c["expect"] and engine(c["text"]) != c["expect"]]
+results["regressed"] = regressed
+print(json.dumps(results, indent=2, ensure_ascii=False))
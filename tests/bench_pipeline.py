@@ -0,0 +1,312 @@
+"""
+Run: python tests/bench_pipeline.py [--n 2000] [--corpus more.jsonl] [--out result.json]
+                                    [--baseline old.json [--tolerance 0.25]]
+In-process benchmark and accuracy run of nlu.parse and planner.plan_itinerary,
+no server or network (TOOL_MODE=mock, throwaway tool cache). Messages come from
+ - tests/nlu_corpus.jsonl: recorded messages with hand labels (plus any --corpus
+   files in the same format; a label that is left out is not checked)
+ - a seeded synthetic corpus from templates, labelled by construction
+and tests/date_corpus.jsonl scores the date engine against a fixed today.
+Reported per stage: time as p50/p95/p99 in microseconds, and the peak bytes
+allocated while it runs (tracemalloc, in a separate pass so it does not skew
+timings). NLU stages: tokenize, intent, places, budget, dates, interests;
+planner stages: cost, filter, pack, schedule, plus the whole plan with caches
+cleared. Accuracy: intent, per-field entity exact match, interest P/R/F1, dates,
+and how many plans came back ok / need_info with the requested number of days.
+With --baseline, p95 timings and accuracy are compared to an earlier run's JSON;
+the exit code is 1 if anything regressed.
+"""
+import os, sys, json, time, random, tempfile, argparse, tracemalloc
+from datetime import date
+os.environ["TOOL_MODE"] = "mock"
+os.environ["TOOL_CACHE_DB"] = os.path.join(tempfile.mkdtemp(), "bench_cache.db")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "backend"))
+import numpy as np
+import nlu, planner, dates
+from lexicon import tokenize
+
+NLU_STAGES = ["tokenize", "intent", "places", "budget", "dates", "interests"]
+PLAN_STAGES = ["cost", "filter", "pack", "schedule", "plan"]
+FIELDS = ["destination", "origin", "destinations", "n_days", "budget"]
+DATE_TODAY = date(2026, 10, 14)   # what tests/date_corpus.jsonl is labelled against
+
+# ---------- corpus ----------
+
+def load_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+CITIES = ["Goa", "Jaipur", "Manali", "Singapore", "Udaipur", "Kochi", "Shimla", "Varanasi",
+          "Rishikesh", "Bangkok", "Dubai", "Paris", "London", "Tokyo"]
+ORIGINS = ["Mumbai", "Delhi", "Chennai", "Pune", "Kolkata", "Hyderabad"]
+CURRENCIES = [("₹{}", "INR"), ("{} INR", "INR"), ("{} rupees", "INR"), ("${}", "USD"),
+              ("{} dollars", "USD"), ("{} euros", "EUR")]
+# interest as written -> the label nlu should produce
+INTEREST_WORDS = [(i, i) for i in nlu.INTERESTS] + [
+    ("beaches", "beach"), ("museum", "museums"), ("heritage", "history"), ("trekking", "hiking"),
+    ("clubbing", "nightlife"), ("seafood", "food")]
+
+def synthetic(n, seed):
+    '''Template messages with their labels; origins, budgets and interests are optional.'''
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        dest = rnd.choice(CITIES)
+        days = rnd.randint(1, 9)
+        origin = rnd.choice(ORIGINS) if rnd.random() < 0.5 else None
+        budget = None
+        if rnd.random() < 0.6:
+            fmt, cur = rnd.choice(CURRENCIES)
+            amount = rnd.choice([500, 800, 1200, 2000]) if cur != "INR" else rnd.choice([15000, 20000, 40000, 75000])
+            budget = {"amount": amount, "currency": cur}
+        picks = rnd.sample(INTEREST_WORDS, rnd.randint(0, 2))
+        words = " and ".join(w for w, _ in picks)
+        shape = rnd.randrange(4)
+        if shape == 0:
+            text = f"Plan a {days}-day trip to {dest}"
+        elif shape == 1:
+            text = f"{days} days in {dest}"
+        elif shape == 2:
+            text = f"Itinerary for {dest}, {days} nights"
+        else:
+            text = f"trip to {dest} for {days} days"
+        if origin:
+            text += f" from {origin}"
+        if words:
+            text += f" with {words}"
+        if budget:
+            text += ", budget " + fmt.format(budget["amount"])
+        out.append({"text": text, "intent": "plan_trip", "destination": dest, "origin": origin,
+                    "n_days": days, "budget": budget, "interests": sorted({l for _, l in picks})})
+    return out
+
+# ---------- measurement ----------
+
+def nlu_stages(text, t):
+    '''nlu.parse split into its stages; t(stage, fn) runs fn and records it.'''
+    m = t("tokenize", lambda: nlu._Tagged(text))
+    intent = t("intent", lambda: nlu._detect_intent(m))
+    places = t("places", lambda: nlu._extract_places(m))
+    budget = t("budget", lambda: nlu._extract_currency_amount(m))
+    found = t("dates", lambda: dates.extract(m.toks))
+    interests = t("interests", lambda: nlu._extract_interests(m))
+    # same assembly as nlu.parse
+    entities = dict(places or {})
+    if budget: entities["budget"] = budget
+    if found: entities.update(found)
+    if interests: entities["interests"] = interests
+    if m.values("visa_free"): entities["visa_free_hint"] = True
+    return {"intent": intent, "entities": entities}
+
+def clear_plan_caches():
+    planner.PLAN_CACHE.clear()
+    planner.STAGE_CACHE.clear()
+    planner.SESSION_STAGES.clear()
+
+def plan_stages(ents, t):
+    '''The single-city planner's stages, uncached, then plan_itinerary on cleared caches.'''
+    budget_inr = planner.inr_amount(ents.get("budget"))
+    n_days, start_date, _ = planner._resolve_dates(ents)
+    dest, interests = ents["destination"], ents.get("interests")
+    t("cost", lambda: planner._stage_cost(dest, ents.get("origin"), budget_inr, n_days))
+    pois = t("filter", lambda: planner._poi_filter(dest, interests, k=planner.POIS_PER_DAY * n_days))
+    packing = t("pack", lambda: planner._pack_days(pois, n_days, dest))
+    t("schedule", lambda: planner._stage_schedule(packing, dest, start_date))
+    clear_plan_caches()
+    return t("plan", lambda: planner.plan_itinerary({"entities": ents}))
+
+class Timer:
+    def __init__(self):
+        self.samples = {}
+    def __call__(self, stage, fn):
+        t0 = time.perf_counter_ns()
+        out = fn()
+        self.samples.setdefault(stage, []).append((time.perf_counter_ns() - t0) / 1000)
+        return out
+
+class Allocs:
+    '''Peak bytes allocated while each stage runs; needs tracemalloc started.'''
+    def __init__(self):
+        self.samples = {}
+    def __call__(self, stage, fn):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        out = fn()
+        self.samples.setdefault(stage, []).append(tracemalloc.get_traced_memory()[1] - before)
+        return out
+
+def percentiles(xs, digits=1):
+    if not xs:
+        return None
+    p50, p95, p99 = np.percentile(xs, [50, 95, 99])
+    return {"n": len(xs), "p50": round(float(p50), digits), "p95": round(float(p95), digits),
+            "p99": round(float(p99), digits), "mean": round(float(np.mean(xs)), digits)}
+
+def plannable(ents):
+    return ents.get("destination") and not ents.get("destinations") and (
+        ents.get("n_days") or (ents.get("start_date") and ents.get("end_date")))
+
+# ---------- accuracy ----------
+
+def score(corpus, parsed, plans):
+    n = len(corpus)
+    field_ok = {f: [0, 0] for f in FIELDS}
+    tp = fp = fn = 0
+    intent_ok = 0
+    wrong = []
+    for case, res in zip(corpus, parsed):
+        ents = res["entities"]
+        bad = []
+        if res["intent"] == case.get("intent", res["intent"]):
+            intent_ok += 1
+        else:
+            bad.append("intent")
+        for f in FIELDS:
+            if f not in case:
+                continue
+            got = ents.get(f)
+            if f == "budget" and got:
+                got = {"amount": round(got["amount"]), "currency": got["currency"]}
+            field_ok[f][1] += 1
+            if got == case[f]:
+                field_ok[f][0] += 1
+            else:
+                bad.append(f)
+        if "interests" in case:
+            got, want = set(ents.get("interests") or []), set(case["interests"])
+            tp, fp, fn = tp + len(got & want), fp + len(got - want), fn + len(want - got)
+            if got != want:
+                bad.append("interests")
+        if bad:
+            wrong.append({"text": case["text"], "fields": bad})
+    p = tp / (tp + fp) if tp + fp else 1.0
+    r = tp / (tp + fn) if tp + fn else 1.0
+    ok = [p for p in plans if p["status"] == "ok"]
+    return {
+        "n": n,
+        "intent": round(intent_ok / n, 4),
+        "fields": {f: round(c / t, 4) for f, (c, t) in field_ok.items() if t},
+        "interests": {"precision": round(p, 4), "recall": round(r, 4),
+                      "f1": round(2 * p * r / (p + r), 4) if p + r else 0.0},
+        "plans": {
+            "n": len(plans),
+            "ok": round(len(ok) / len(plans), 4) if plans else None,
+            "need_info": round(1 - len(ok) / len(plans), 4) if plans else None,
+            "days_match": round(sum(len(p["days"]) == p["summary"]["n_days"] for p in ok) / len(ok), 4) if ok else None,
+        },
+        "wrong": wrong,
+    }
+
+def score_dates(cases):
+    wrong = [c["text"] for c in cases if dates.extract(tokenize(c["text"]), DATE_TODAY) != c["expect"]]
+    return {"n": len(cases), "exact": round(1 - len(wrong) / len(cases), 4), "wrong": wrong}
+
+# ---------- gate ----------
+
+def compare(new, old, tolerance, floor_us=2.0):
+    '''Regressions of `new` against `old`: p95 slower by more than tolerance (and floor_us), or lower accuracy.'''
+    out = []
+    for stage, cur in new["timings_us"].items():
+        prev = (old.get("timings_us") or {}).get(stage)
+        if prev and cur and cur["p95"] > prev["p95"] * (1 + tolerance) and cur["p95"] - prev["p95"] > floor_us:
+            out.append(f"{stage}: p95 {prev['p95']} -> {cur['p95']} us")
+
+    def flat(d, prefix=""):
+        for k, v in d.items():
+            if isinstance(v, dict):
+                yield from flat(v, f"{prefix}{k}.")
+            elif isinstance(v, float) and k not in ("need_info",):
+                yield prefix + k, v
+    for name in ("recorded", "synthetic"):
+        prev = dict(flat((old.get("accuracy") or {}).get(name) or {}))
+        for k, v in flat(new["accuracy"][name]):
+            if k in prev and v < prev[k] - 1e-9:
+                out.append(f"{name}.{k}: {prev[k]} -> {v}")
+    prev = (old.get("accuracy") or {}).get("dates", {}).get("exact")
+    if prev is not None and new["accuracy"]["dates"]["exact"] < prev:
+        out.append(f"dates.exact: {prev} -> {new['accuracy']['dates']['exact']}")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000, help="synthetic messages")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--corpus", action="append", default=[], help="extra labelled jsonl (text + labels)")
+    ap.add_argument("--alloc-n", type=int, default=300, help="messages in the allocation pass")
+    ap.add_argument("--out", help="write the result JSON here")
+    ap.add_argument("--baseline", help="earlier result JSON to gate against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown (fraction)")
+    args = ap.parse_args()
+
+    recorded = load_jsonl(os.path.join(HERE, "nlu_corpus.jsonl"))
+    for path in args.corpus:
+        recorded += load_jsonl(path)
+    corpora = {"recorded": recorded, "synthetic": synthetic(args.n, args.seed)}
+    everything = recorded + corpora["synthetic"]
+
+    # warm up: gazetteer, POI files, lazily built indexes
+    for case in everything[:50]:
+        ents = nlu.parse(case["text"])["entities"]
+        if plannable(ents):
+            planner.plan_itinerary({"entities": ents})
+
+    timer = Timer()
+    parsed, plans = {}, {}
+    t0 = time.perf_counter()
+    for name, corpus in corpora.items():
+        parsed[name], plans[name] = [], []
+        for case in corpus:
+            res = nlu_stages(case["text"], timer)
+            assert res == nlu.parse(case["text"]), case["text"]   # the split must match nlu.parse
+            parsed[name].append(res)
+            if plannable(res["entities"]):
+                plans[name].append(plan_stages(res["entities"], timer))
+    elapsed = time.perf_counter() - t0
+
+    allocs = Allocs()
+    tracemalloc.start()
+    for case in everything[:args.alloc_n]:
+        res = nlu_stages(case["text"], allocs)
+        if plannable(res["entities"]):
+            plan_stages(res["entities"], allocs)
+    tracemalloc.stop()
+
+    result = {
+        "python": sys.version.split()[0],
+        "corpus": {"recorded": len(recorded), "synthetic": args.n, "seed": args.seed},
+        "elapsed_s": round(elapsed, 3),
+        "timings_us": {s: percentiles(timer.samples.get(s, [])) for s in NLU_STAGES + PLAN_STAGES},
+        "alloc_peak_bytes": {s: percentiles(allocs.samples.get(s, []), 0) for s in NLU_STAGES + PLAN_STAGES},
+        "accuracy": {name: score(corpora[name], parsed[name], plans[name]) for name in corpora},
+    }
+    result["accuracy"]["dates"] = score_dates(load_jsonl(os.path.join(HERE, "date_corpus.jsonl")))
+
+    for s in NLU_STAGES + PLAN_STAGES:
+        t, a = result["timings_us"][s], result["alloc_peak_bytes"][s]
+        if t:
+            print(f"{s:10} p50 {t['p50']:8.1f}  p95 {t['p95']:8.1f}  p99 {t['p99']:8.1f} us"
+                  f"   peak alloc p50 {a['p50'] if a else '-':>8} B")
+    for name in corpora:
+        acc = result["accuracy"][name]
+        print(f"{name:10} intent {acc['intent']}  fields {acc['fields']}  interests f1 {acc['interests']['f1']}"
+              f"  plans ok {acc['plans']['ok']}")
+    print(f"dates      exact {result['accuracy']['dates']['exact']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for r in regressions:
+            print("REGRESSION", r)
+        if regressions:
+            sys.exit(1)
+        print("no regressions against", args.baseline)
+
+if __name__ == "__main__":
+    main()
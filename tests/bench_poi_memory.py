@@ -0,0 +1,55 @@
+"""
+Run: python tests/bench_poi_memory.py [n_pois ...]
+Retained memory of a synthetic country-scale POI catalogue (spread over 200 cities)
+held as parsed JSON (list of dicts per city, as the planner used to keep it)
+vs. POITable columns. Measured with tracemalloc after parsing the same JSON text,
+so only what stays resident is compared. Also times turning 12 rows back into dicts.
+"""
+import os, sys, gc, json, time, random, tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from poi_table import POITable
+
+TAG_POOL = ["beach", "history", "architecture", "nightlife", "shopping", "food", "museum", "nature",
+            "temple", "fort", "market", "viewpoint", "water sports", "trekking", "culture", "art"]
+
+def catalogue(n, cities, seed=7):
+    rnd = random.Random(seed)
+    out = {}
+    for i in range(n):
+        c = f"city_{i % cities}"
+        out.setdefault(c, []).append({
+            "name": f"Place {i} {rnd.choice(['Fort', 'Beach', 'Market', 'Temple', 'Museum'])}",
+            "tags": rnd.sample(TAG_POOL, rnd.randint(1, 4)),
+            "popularity": rnd.randint(10, 99),
+            "notes": "Local favourite; " + rnd.choice(["busy on weekends", "best at sunset", "closed Mondays"]),
+            "lat": 8 + rnd.random() * 25,
+            "lon": 68 + rnd.random() * 28,
+        })
+    return {c: json.dumps(pois) for c, pois in out.items()}
+
+def retained(build, texts):
+    gc.collect()
+    tracemalloc.start()
+    held = {c: build(json.loads(t)) for c, t in texts.items()}
+    gc.collect()
+    cur, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, cur
+
+results = []
+for n in [int(x) for x in sys.argv[1:]] or [10000, 50000]:
+    texts = catalogue(n, 200)
+    dicts, dict_bytes = retained(lambda pois: pois, texts)
+    del dicts
+    tables, table_bytes = retained(POITable, texts)
+    t = next(iter(tables.values()))
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        t.rows(range(min(12, len(t))))
+    row = {"n": n, "dicts_mb": round(dict_bytes / 2**20, 2), "columnar_mb": round(table_bytes / 2**20, 2),
+           "ratio": round(dict_bytes / max(table_bytes, 1), 1),
+           "rows12_us": round((time.perf_counter() - t0) * 1000, 1)}
+    results.append(row)
+    print(row)
+
+print(json.dumps(results, indent=2))
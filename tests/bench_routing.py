@@ -0,0 +1,42 @@
+"""
+Run: python tests/bench_routing.py [n_points ...]
+Compares ordering-style routing lookups for N POIs:
+ - per-pair loop: N*(N-1) get_route calls (one cache entry each)
+ - get_distance_matrix: one call for the whole set (one cache entry)
+Cold = empty cache, warm = second pass. Uses a throwaway cache DB and TOOL_MODE=mock,
+so it measures the cache + vectorized haversine path, not network latency.
+"""
+import os, sys, time, random, tempfile, json
+os.environ["TOOL_MODE"] = "mock"
+os.environ["TOOL_CACHE_DB"] = os.path.join(tempfile.mkdtemp(), "bench_cache.db")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+import tools
+
+def points(n, seed):
+    rnd = random.Random(seed)
+    return [(15.4 + rnd.random() * 0.3, 73.7 + rnd.random() * 0.2) for _ in range(n)]
+
+def per_pair(pts):
+    return [[tools.get_route(a[0], a[1], b[0], b[1])["duration_min"] if i != j else 0
+             for j, b in enumerate(pts)] for i, a in enumerate(pts)]
+
+def timed(fn, *a):
+    t0 = time.perf_counter()
+    fn(*a)
+    return (time.perf_counter() - t0) * 1000
+
+results = []
+for n in [int(x) for x in sys.argv[1:]] or [10, 30, 100]:
+    pts = points(n, n)
+    row = {"n": n,
+           "pairwise_cold_ms": timed(per_pair, pts), "pairwise_warm_ms": timed(per_pair, pts),
+           "matrix_cold_ms": None, "matrix_warm_ms": None}
+    tools.MEMORY_CACHE.clear()
+    pts2 = points(n, n + 1000)  # fresh set so the matrix is cold too
+    row["matrix_cold_ms"] = timed(tools.get_distance_matrix, pts2)
+    row["matrix_warm_ms"] = timed(tools.get_distance_matrix, pts2)
+    row = {k: (round(v, 2) if isinstance(v, float) else v) for k, v in row.items()}
+    results.append(row)
+    print(row)
+
+print(json.dumps(results, indent=2))
@@ -0,0 +1,17 @@
+import os, sys, atexit, shutil, tempfile
+import pytest
+
+# the tool cache goes to a throwaway file, not data/cache; set before tools is imported
+_cache_dir = tempfile.mkdtemp(prefix="voyagerai-tools-cache-")
+os.environ["TOOL_CACHE_DB"] = os.path.join(_cache_dir, "tools_cache.db")
+atexit.register(shutil.rmtree, _cache_dir, True)
+
+@pytest.fixture(autouse=True)
+def empty_tool_cache():
+    '''Each test starts with empty memory and disk tiers (tools may be loaded flat and as a package).'''
+    for name in ("tools", "voyagerai.backend.tools"):
+        mod = sys.modules.get(name)
+        if mod is not None:
+            mod.MEMORY_CACHE.clear()
+            mod.DISK_CACHE.clear()
+    yield
@@ -0,0 +1,74 @@
+from voyagerai.backend.cache import LRUCache
+
+def test_lru_ttl_and_eviction():
+    c = LRUCache(max_entries=2)
+    c.set("a", 1, ttl=60, now=0)
+    c.set("b", 2, ttl=5, now=0)
+    assert c.get("a", now=1) == (True, 1)
+    c.set("c", 3, ttl=60, now=1)  # evicts "b" (least recently used)
+    assert c.get("b", now=1) == (False, None)
+    assert c.get("c", now=100) == (False, None)  # expired
+    st = c.stats()
+    assert st["evictions"] == 1 and st["expirations"] == 1
+    assert st["hits"] == 1 and st["misses"] == 2
+
+def test_sqlite_store_ttl_and_byte_budget():
+    from voyagerai.backend.cache import SQLiteCacheStore
+    s = SQLiteCacheStore(":memory:", max_bytes=2000, compact_interval=0)
+    s.set("k", {"v": [1, 2, 3]}, ttl=10, now=0)
+    s.set("soft", 1, ttl=10, now=0, stale_after=2)
+    assert s.get("k", now=5) == ({"v": [1, 2, 3]}, 10, 10)
+    assert s.get("soft", now=5) == (1, 10, 2)
+    assert s.get("k", now=11) is None
+    for i in range(50):
+        s.set(f"x{i}", "y" * 100, ttl=100, now=20 + i)
+    st = s.stats()
+    assert st["bytes"] <= 2000 and st["evictions"] > 0
+    assert s.get("x49", now=80) is not None  # most recent survives
+    s.compact(now=200)
+    assert s.stats()["entries"] == 0
+
+def test_singleflight_coalesces_threads_and_propagates_errors():
+    import threading, time
+    from voyagerai.backend.cache import SingleFlight
+    sf = SingleFlight(timeout=5)
+    calls = []
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"ok": True}
+    out = []
+    ths = [threading.Thread(target=lambda: out.append(sf.do("goa", fetch))) for _ in range(8)]
+    for t in ths: t.start()
+    for t in ths: t.join()
+    assert len(calls) == 1 and out == [{"ok": True}] * 8
+    assert sf.stats()["coalesced"] == 7
+
+    def boom():
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+    errs = []
+    def call():
+        try:
+            sf.do("jaipur", boom)
+        except ValueError as e:
+            errs.append(str(e))
+    ths = [threading.Thread(target=call) for _ in range(4)]
+    for t in ths: t.start()
+    for t in ths: t.join()
+    assert errs == ["upstream down"] * 4
+    assert sf.stats()["in_flight"] == 0
+
+def test_singleflight_coalesces_async_tasks():
+    import asyncio
+    from voyagerai.backend.cache import SingleFlight
+    sf = SingleFlight(timeout=5)
+    calls = []
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+    async def run():
+        return await asyncio.gather(*[sf.ado("fx", fetch) for _ in range(10)])
+    assert asyncio.run(run()) == [42] * 10
+    assert len(calls) == 1
@@ -0,0 +1,29 @@
+def test_follow_up_turns_merge_into_session_state():
+    from voyagerai.backend.dialogue_state import DialogueStore
+    from voyagerai.backend.nlu import parse
+    from voyagerai.backend.planner import plan_itinerary
+    db, saves = {}, []
+    store = DialogueStore(db.get, lambda sid, st: (saves.append(sid), db.__setitem__(sid, st)))
+
+    turns = ["Plan a trip to Goa with beaches", "from Mumbai, 3 days", "under 20000 rupees", "add nightlife"]
+    for text in turns:
+        state = store.update("s1", parse(text), text)
+    ents = state["entities"]
+    assert ents["destination"] == "Goa" and ents["origin"] == "Mumbai" and ents["n_days"] == 3
+    assert ents["budget"] == {"amount": 20000.0, "currency": "INR"}
+    assert ents["interests"] == ["beach", "nightlife"]
+    assert state["provenance"]["origin"]["text"] == "from Mumbai, 3 days"
+    assert state["provenance"]["destination"]["turn"] == 1 and state["provenance"]["interests"]["turn"] == 4
+    assert plan_itinerary({"entities": ents})["status"] == "ok"
+
+    # nothing new: no write; a fresh store reads the written-through state back
+    assert store.update("s1", parse("thanks!"), "thanks!")["changed"] == [] and len(saves) == 4
+    assert DialogueStore(db.get, db.__setitem__).get("s1")["entities"] == ents
+
+def test_session_without_state_is_seeded_from_its_latest_plan():
+    from voyagerai.backend.dialogue_state import DialogueStore
+    store = DialogueStore(lambda sid: None, lambda sid, st: None,
+                          seed=lambda sid: {"destination": "Jaipur", "n_days": 2, "origin": None})
+    state = store.update("old", {"intent": "plan_trip", "entities": {"n_days": 4}}, "make it 4 days")
+    assert state["entities"] == {"destination": "Jaipur", "n_days": 4}
+    assert state["provenance"]["destination"]["source"] == "plan" and state["changed"] == ["n_days"]
@@ -0,0 +1,59 @@
+from voyagerai.backend.fx import FXEngine, RateTable
+
+def test_cross_rates_from_one_base_table():
+    calls = []
+    def loader():
+        calls.append(1)
+        return {"base": "EUR", "date": "2025-10-01", "rates": {"INR": 90.0, "USD": 1.08}}
+    fx = FXEngine(loader=loader)
+    assert round(fx.rate("EUR", "INR"), 6) == 90.0
+    assert round(fx.rate("USD", "INR"), 4) == round(90.0 / 1.08, 4)
+    assert round(fx.convert(100, "USD", "INR"), 2) == round(100 * 90.0 / 1.08, 2)
+    assert fx.convert(50, "INR", "INR") == 50
+    assert len(calls) == 1  # every pair derived from the same table
+
+def test_convert_many_matches_scalar():
+    t = RateTable("INR", {"USD": 83.0, "EUR": 90.0})
+    out = t.convert_many([10, 20, 30, 40], ["usd", "EUR", "INR", "XYZ"], "INR")
+    assert out.tolist() == [830.0, 1800.0, 30.0, 40.0]
+
+def test_falls_back_to_static_table_when_loader_fails():
+    def loader():
+        raise RuntimeError("offline")
+    fx = FXEngine(loader=loader)
+    assert fx.rate("USD", "INR") == 83.0
+
+def test_failed_refresh_backs_off_instead_of_retrying_every_call():
+    import threading
+    calls = []
+    def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            return {"base": "EUR", "rates": {"INR": 90.0}}
+        raise RuntimeError("offline")
+    fx = FXEngine(loader=loader, refresh_s=0, retry_s=60)
+    first = fx.table()
+    for _ in range(50):
+        assert fx.table() is first
+        for t in threading.enumerate():
+            if t.name == "fx-refresh":
+                t.join()
+    assert len(calls) == 2   # one failed refresh, then quiet until retry_s passes
+
+def test_cold_start_failure_retries_after_the_backoff():
+    import time, threading
+    calls = []
+    def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("offline")
+        return {"base": "EUR", "rates": {"INR": 90.0, "USD": 1.0}}
+    fx = FXEngine(loader=loader, refresh_s=3600, retry_s=0.05)
+    assert fx.rate("USD", "INR") == 83.0   # static fallback
+    assert fx.rate("USD", "INR") == 83.0 and len(calls) == 1   # still backing off
+    time.sleep(0.1)
+    fx.table()
+    for t in threading.enumerate():
+        if t.name == "fx-refresh":
+            t.join()
+    assert len(calls) == 2 and fx.rate("USD", "INR") == 90.0
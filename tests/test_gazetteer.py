@@ -0,0 +1,15 @@
+from voyagerai.backend.gazetteer import get_gazetteer
+
+def test_lookup_exact_prefix_and_fuzzy():
+    g = get_gazetteer()
+    assert g.exact("Goa").cc == "IN" and g.exact("goa") is None
+    assert g.lookup("BANGALORE").name == "Bengaluru"
+    assert "Manali" in [p.name for p in g.prefix("man")]
+    assert g.fuzzy("jaipr").name == "Jaipur"
+    assert g.fuzzy("qwertyuiop") is None
+
+def test_find_all_prefers_longest_and_respects_ambiguous_words():
+    g = get_gazetteer()
+    found = [(p.name, text) for s, e, p in g.find_all("a nice trip to New York City and then Nice")
+             for text in [("a nice trip to New York City and then Nice")[s:e]]]
+    assert found == [("New York", "New York City"), ("Nice", "Nice")]
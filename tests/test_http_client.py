@@ -0,0 +1,74 @@
+import threading, json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from voyagerai.backend.http_client import ProviderClient, CircuitBreaker, CircuitOpenError
+
+class _Stub(BaseHTTPRequestHandler):
+    hits = 0
+    plan = []  # status codes to return, in order; 200 once exhausted
+
+    def do_GET(self):
+        cls = type(self)
+        cls.hits += 1
+        code = cls.plan.pop(0) if cls.plan else 200
+        body = json.dumps({"ok": code == 200}).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *a):
+        pass
+
+@pytest.fixture
+def stub():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    th = threading.Thread(target=srv.serve_forever, daemon=True)
+    th.start()
+    _Stub.hits, _Stub.plan = 0, []
+    yield f"http://127.0.0.1:{srv.server_address[1]}/"
+    srv.shutdown()
+
+def test_retries_then_succeeds(stub):
+    _Stub.plan = [503, 500]
+    c = ProviderClient("stub", retries=2, backoff=0)
+    assert c.get(stub, timeout=5).json() == {"ok": True}
+    st = c.stats.snapshot()
+    assert _Stub.hits == 3 and st["retries"] == 2 and st["errors"] == 2
+
+def test_breaker_opens_and_fails_fast(stub):
+    _Stub.plan = [500] * 10
+    c = ProviderClient("stub", retries=0, backoff=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            c.get(stub, timeout=5)
+    with pytest.raises(CircuitOpenError):
+        c.get(stub, timeout=5)
+    assert _Stub.hits == 2 and c.stats.snapshot()["short_circuits"] == 1
+
+def test_breaker_half_open_recovers(stub):
+    _Stub.plan = [500]
+    c = ProviderClient("stub", retries=0, backoff=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    with pytest.raises(requests.HTTPError):
+        c.get(stub, timeout=5)
+    assert c.get(stub, timeout=5).status_code == 200
+    assert c.breaker.state == "closed"
+
+def test_any_5xx_and_unexpected_errors_count_as_failures(stub):
+    _Stub.plan = [501]
+    c = ProviderClient("stub", retries=2, backoff=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    with pytest.raises(requests.HTTPError):
+        c.get(stub, timeout=5)
+    assert _Stub.hits == 1 and c.breaker.state == "open"   # not retried, but a failure
+    # the half-open trial dies with an error outside the retry list: it still gets a verdict
+    real = c.session.request
+    def broken(*a, **kw):
+        raise requests.exceptions.ChunkedEncodingError("truncated body")
+    c.session.request = broken
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        c.get(stub, timeout=5)
+    assert c.breaker.state == "open"
+    c.session.request = real
+    assert c.get(stub, timeout=5).status_code == 200 and c.breaker.state == "closed"
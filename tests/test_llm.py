@@ -7,3 +7,10 @@ def test_stub_llm():
     llm = LLMWrapper()
     out = llm.chat("hello")
     assert "[STUB]" in out
+
+def test_stub_llm_stream_matches_chat():
+    os.environ["LLM_BACKEND"] = "stub"
+    llm = LLMWrapper()
+    pieces = list(llm.chat_stream("hello there"))
+    assert len(pieces) > 1
+    assert "".join(pieces) == llm.chat("hello there")
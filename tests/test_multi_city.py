@@ -0,0 +1,34 @@
+import itertools
+import numpy as np
+from voyagerai.backend import multi_city
+from voyagerai.backend.planner import plan_itinerary
+
+def test_held_karp_matches_brute_force():
+    rng = np.random.default_rng(3)
+    for n in (2, 4, 7):
+        w = rng.random((n, n)) * 100
+        np.fill_diagonal(w, 0)
+        for start in (None, 0):
+            cost, order = multi_city.held_karp(w, start)
+            perms = [p for p in itertools.permutations(range(n)) if start is None or p[0] == start]
+            assert abs(cost - min(multi_city.path_cost(p, w) for p in perms)) < 1e-9
+            assert sorted(order) == list(range(n)) and abs(multi_city.path_cost(order, w) - cost) < 1e-9
+            if start is not None:
+                assert order[0] == start
+
+def test_allocate_days():
+    assert multi_city.allocate_days(10, [8, 6, 5]) == [4, 3, 3]
+    assert multi_city.allocate_days(3, [8, 6, 5]) == [1, 1, 1]
+    assert sum(multi_city.allocate_days(17, [3, 1, 9, 2])) == 17
+
+def test_multi_city_plan():
+    ents = {"origin": "Mumbai", "destinations": ["Manali", "Goa", "Jaipur"], "n_days": 9, "start_date": "2030-03-01"}
+    plan = plan_itinerary({"entities": ents})
+    s = plan["summary"]
+    assert plan["status"] == "ok" and sorted(s["destinations"]) == ["Goa", "Jaipur", "Manali"]
+    assert sum(s["days_per_city"].values()) == 9 and len(plan["days"]) == 9
+    assert plan["days"][-1]["date"] == s["end_date"] == "2030-03-09"
+    assert plan["legs"][0]["frm"] == "Mumbai" and len(plan["legs"]) == 3
+    assert s["est_cost_inr"] == s["travel_cost_inr"] + s["stay_cost_inr"] + s["misc_cost_inr"]
+    short = plan_itinerary({"entities": dict(ents, n_days=2, start_date=None)})
+    assert short["status"] == "need_info"
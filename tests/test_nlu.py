@@ -16,3 +16,80 @@ def test_visa_free_intent():
     out = parse(q)
     assert out["entities"].get("visa_free_hint") == True
     assert out["entities"]["budget"]["currency"] in ["USD"]
+
+def test_multiple_destinations():
+    ents = parse("Plan a trip from Mumbai to Goa, Jaipur and Manali")["entities"]
+    assert ents["origin"] == "Mumbai"
+    assert ents["destinations"] == ["Goa", "Jaipur", "Manali"]
+    ents = parse("Mumbai → Goa → Jaipur → Manali")["entities"]
+    assert ents["origin"] == "Mumbai" and ents["destination"] == "Goa"
+    assert "destinations" not in parse("Mumbai to Goa")["entities"]
+
+def test_budget_amount_not_confused_with_duration():
+    ents = parse("Cheap 5 day manali trip from Mumbai in Jan under 30000")["entities"]
+    assert ents["budget"] == {"amount": 30000.0, "currency": "INR"}
+    assert parse("4 nights in Goa for rs. 1.2 lakh")["entities"]["budget"] == {"amount": 120000.0, "currency": "INR"}
+    assert parse("12 to 15 Oct in Paris, $500")["entities"]["budget"] == {"amount": 500.0, "currency": "USD"}
+    assert "budget" not in parse("Plan a 3-day trip to Goa")["entities"]
+
+def test_keyword_tables_match_words_plurals_and_synonyms():
+    out = parse("Jaipur forts, museum hopping and street food, no visa needed")
+    assert out["entities"]["interests"] == ["food", "history", "museums"]
+    assert out["entities"]["visa_free_hint"] is True
+    assert parse("somewhere comfortable in Goa")["entities"].get("interests") is None   # 'fort' inside a word
+    assert parse("Suggest visa-free places")["intent"] == "ask_visa_free"
+    assert parse("cheapest flights to Goa")["intent"] == "budget_focus"
+    assert parse("a 5-day itinerary, lowest cost")["intent"] == "plan_trip"
+    # month names are not taken for an unknown destination
+    assert parse("a trip in October to Atlantis")["entities"]["destination"] == "Atlantis"
+
+def test_date_corpus():
+    import os, json
+    from datetime import date
+    from voyagerai.backend.dates import extract
+    from voyagerai.backend.lexicon import tokenize
+    with open(os.path.join(os.path.dirname(__file__), "date_corpus.jsonl"), encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    # labelled relative to Wednesday 2026-10-14
+    wrong = [c["text"] for c in corpus if extract(tokenize(c["text"]), date(2026, 10, 14)) != c["expect"]]
+    assert wrong == []
+
+def test_ranges_across_new_year_end_in_the_next_year():
+    from datetime import date
+    for text in ["Goa 28 Dec to 2 Jan", "Dec 28 - Jan 2"]:
+        ents = parse(text)["entities"]
+        sd, ed = date.fromisoformat(ents["start_date"]), date.fromisoformat(ents["end_date"])
+        assert (sd.month, sd.day, ed.month, ed.day) == (12, 28, 1, 2)
+        assert ed.year == sd.year + 1 and (ed - sd).days == 5
+
+def test_parse_many_dedupes_and_keeps_order():
+    from voyagerai.backend import nlu
+    nlu.PARSE_CACHE.clear()
+    texts = ["Plan a 3-day trip to Goa under 20000 INR", "weekend in Jaipur for heritage",
+             "Plan a  3-day trip to Goa under 20000 INR ", "Cheap 5 day manali trip from Mumbai in Jan"]
+    out = nlu.parse_many(texts)
+    assert [it["nlu"] for it in out["items"]] == [nlu.parse(t) for t in texts]
+    assert [it["cached"] for it in out["items"]] == [False, False, True, False]
+    assert out["stats"]["parsed"] == 3 and out["stats"]["cache_hits"] == 1
+    again = nlu.parse_many(texts[:2], processes=2)
+    assert all(it["cached"] and it["ms"] == 0 for it in again["items"])
+    small = nlu.parse_many(["trip to Udaipur", "trip to Kochi"], processes=2)
+    assert small["stats"]["processes"] == 0   # under NLU_POOL_MIN_TEXTS: parsed in-process
+    old, nlu.NLU_POOL_MIN_TEXTS = nlu.NLU_POOL_MIN_TEXTS, 2
+    try:
+        pooled = nlu.parse_many(["trip to Goa", "trip to Jaipur", "trip to Goa"], processes=2)
+    finally:
+        nlu.NLU_POOL_MIN_TEXTS = old
+    assert pooled["stats"]["processes"] == 2
+    assert [it["nlu"]["entities"]["destination"] for it in pooled["items"]] == ["Goa", "Jaipur", "Goa"]
+
+def test_dates_reject_what_they_cannot_read():
+    from voyagerai.backend.nlu import parse
+    # decimal day counts round up instead of raising
+    assert parse("Goa trip for 3 to 4.5 days")["entities"]["n_days"] == 5
+    assert parse("Plan 2-3.5 days in Goa")["entities"]["n_days"] == 4
+    # impossible days are no date at all, and an ISO date's year is not a budget
+    ents = parse("Goa 12th to 40th Oct")["entities"]
+    assert "start_date" not in ents and "end_date" not in ents
+    ents = parse("Goa on 2026-02-30")["entities"]
+    assert "start_date" not in ents and "budget" not in ents
@@ -9,3 +9,141 @@ def test_plan_goa():
     assert plan["summary"]["destination"] in ["Goa","goa"]
     assert plan["summary"]["n_days"] == 3
     assert len(plan["days"]) == 3
+
+def test_poi_filter_top_k():
+    from voyagerai.backend.planner import _poi_filter
+    from voyagerai.backend.poi_store import get_poi_store
+    top = _poi_filter("goa", ["Beach", "nightlife"], k=3)
+    assert len(top) == 3
+    lowered = {"beach", "nightlife"}
+    overlap = [len({t.lower() for t in p["tags"]} & lowered) for p in top]
+    assert overlap == sorted(overlap, reverse=True) and overlap[0] > 0
+    # no interests -> by popularity; k larger than the city -> everything
+    allp = _poi_filter("Goa", None, k=100)
+    assert len(allp) == len(get_poi_store().pois("Goa"))
+    assert [p["popularity"] for p in allp] == sorted((p["popularity"] for p in allp), reverse=True)
+    assert _poi_filter("Atlantis", ["beach"], k=4) == []
+
+def test_pack_days_groups_by_area():
+    from voyagerai.backend.routing import pack_days, travel_minutes
+    # two neighbourhoods ~30 km apart, interleaved in priority order so round-robin mixes them
+    a = [(15.50 + i * 0.002, 73.76) for i in range(4)]
+    b = [(15.30 + i * 0.002, 73.95) for i in range(4)]
+    pts = a[:2] + b[:2] + a[2:] + b[2:]
+    m = travel_minutes([p[0] for p in pts], [p[1] for p in pts])
+    pk = pack_days(m, 2, 4)
+    assert sorted(i for d in pk.days for i in d) == list(range(8))
+    assert {frozenset(d) for d in pk.days} == {frozenset([0, 1, 4, 5]), frozenset([2, 3, 6, 7])}
+    assert 0 in pk.days[0]
+    assert pk.saved_min > 0 and pk.transit_min == sum(sum(l) for l in pk.legs_min)
+
+def test_plan_cache_hits_and_invalidates():
+    from voyagerai.backend import planner
+    planner.PLAN_CACHE.clear()
+    a = {"entities": {"destination": "Jaipur", "n_days": 2, "interests": ["History", "forts"]}}
+    b = {"entities": {"destination": "Jaipur", "n_days": 2, "interests": ["forts", "history"]}}
+    p1 = planner.plan_itinerary(a)
+    before = planner.plan_cache_stats()["hits"]
+    p2 = planner.plan_itinerary(b)
+    assert p1["meta"].pop("entities") == a["entities"] and p2["meta"].pop("entities") == b["entities"]
+    assert p1 == p2 and p1 is not p2
+    assert planner.plan_cache_stats()["hits"] == before + 1
+    # a cost table change gives a new dataset version, so the next call misses
+    old = planner.CITY_BASE_COST["Jaipur"]
+    planner.CITY_BASE_COST["Jaipur"] = old + 100
+    try:
+        p3 = planner.plan_itinerary(a)
+        assert p3["summary"]["misc_cost_inr"] == p1["summary"]["misc_cost_inr"] + 200
+    finally:
+        planner.CITY_BASE_COST["Jaipur"] = old
+
+def test_follow_up_recomputes_only_affected_stages():
+    from voyagerai.backend import planner
+    planner.PLAN_CACHE.clear()
+    planner.STAGE_CACHE.clear()
+    first = {"destination": "Goa", "n_days": 1, "start_date": "2030-01-10", "interests": ["beach"]}
+    p1 = planner.plan_itinerary({"entities": first}, session_id="s-015")
+    computed = {s: c["computed"] for s, c in planner.STAGE_COUNTERS.items()}
+
+    ents = planner.merge_entities(first, {"destination": None, "interests": ["history"]})
+    assert ents["interests"] == ["beach", "history"] and ents["n_days"] == 1
+    p2 = planner.plan_itinerary({"entities": ents}, session_id="s-015")
+    after = {s: c["computed"] for s, c in planner.STAGE_COUNTERS.items()}
+    assert after["cost"] == computed["cost"]
+    assert after["selection"] == computed["selection"] + 1
+
+    diff = planner.plan_diff(p1, p2)
+    assert diff["stages_changed"] == ["selection", "packing", "schedule"]
+    assert diff["days"] and "summary" in diff
+
+    # a new duration re-derives the end date
+    ents = planner.merge_entities(dict(ents, end_date="2030-01-10"), {"n_days": 3})
+    p3 = planner.plan_itinerary({"entities": ents}, session_id="s-015")
+    assert p3["summary"]["end_date"] == "2030-01-12"
+    assert planner.plan_diff(p2, p3)["summary"]["n_days"] == {"old": 1, "new": 3}
+
+def test_plan_itineraries_matches_single_plans_in_order():
+    from voyagerai.backend import planner
+    batch = [
+        {"entities": {"destination": "Goa", "origin": "Mumbai", "n_days": 3, "interests": ["beach"],
+                      "budget": {"amount": 20000, "currency": "INR"}}},
+        {"destination": "Jaipur", "n_days": 2, "budget": {"amount": 500, "currency": "USD"}},
+        {"entities": {"origin": "Delhi"}},
+        {"entities": {"destination": "Goa", "n_days": 3, "interests": ["beach"], "start_date": "2030-02-01"}},
+    ]
+    out = planner.plan_itineraries(batch)
+    assert [p["status"] for p in out["plans"]] == ["ok", "ok", "need_info", "ok"]
+    for item, plan in zip(batch, out["plans"]):
+        assert plan == planner.plan_itinerary(item if "entities" in item else {"entities": item})
+    assert out["stats"]["n"] == 4 and out["stats"]["plans_per_s"] > 0
+    assert out["stats"]["distinct_rankings"] == 2
+
+def test_iter_plan_streams_days_before_the_plan():
+    from voyagerai.backend.planner import iter_plan, plan_itinerary, PLAN_CACHE
+    nlu = {"entities": {"destination": "Jaipur", "n_days": 2, "start_date": "2026-03-02", "interests": ["fort"]}}
+    PLAN_CACHE.clear()
+    for _ in range(2):   # built, then served from the plan cache
+        events = list(iter_plan(nlu))
+        names = [e["event"] for e in events]
+        assert names == ["summary", "day", "day", "plan"]
+        plan = events[-1]["data"]
+        assert events[0]["data"] == plan["summary"]
+        assert [dict(e["data"], index=None) for e in events[1:3]] == [dict(d, index=None) for d in plan["days"]]
+        assert plan == plan_itinerary(nlu)
+    assert [e["event"] for e in iter_plan({"entities": {"destination": "Goa"}})] == ["plan"]
+
+def test_plan_cache_hit_keeps_the_requesters_own_entities():
+    from voyagerai.backend.planner import plan_itinerary, PLAN_CACHE
+    PLAN_CACHE.clear()
+    a = {"destination": "Goa", "n_days": 2, "start_date": "2030-03-01", "interests": ["Beach", "food"],
+         "origin": "Mumbai", "visa_free_hint": True}
+    b = {"destination": "Goa", "n_days": 2, "start_date": "2030-03-01", "interests": ["food", "beach"],
+         "origin": "Mumbai "}
+    pa = plan_itinerary({"entities": a}, session_id="s-a")
+    before = PLAN_CACHE.stats()["hits"]
+    pb = plan_itinerary({"entities": b}, session_id="s-b")
+    assert PLAN_CACHE.stats()["hits"] == before + 1   # same key, served from the cache
+    assert pa["meta"]["entities"] == a and pb["meta"]["entities"] == b
+    assert pa["days"] == pb["days"]
+
+def test_plan_itineraries_live_mode_workers_get_precomputed_matrices(monkeypatch):
+    from voyagerai.backend import planner, tools
+    calls = []
+    def matrix(points):
+        calls.append(len(points))
+        return tools._estimate_matrix(points)
+    monkeypatch.setattr(planner, "TOOL_MODE", "live")
+    monkeypatch.setattr(planner, "get_distance_matrix", matrix)
+    batch = [{"destination": "Goa", "n_days": n, "interests": ["beach"], "start_date": "2030-02-01"} for n in (1, 2, 3)]
+    inline = planner.plan_itineraries(batch)["plans"]
+    n_inline = len(calls)
+    assert planner.plan_itineraries(batch, processes=2)["stats"]["processes"] == 0   # too few: in-process
+    monkeypatch.setattr(planner, "PLAN_POOL_MIN_PACKINGS", 2)
+    pooled = planner.plan_itineraries(batch, processes=2)
+    # the stub only exists in this process, so every matrix was fetched here
+    assert pooled["stats"]["processes"] == 2 and len(calls) == 3 * n_inline > 0
+    assert pooled["plans"] == inline
+
+def test_dates_given_back_to_front_keep_their_span():
+    from voyagerai.backend.planner import _resolve_dates
+    assert _resolve_dates({"start_date": "2027-01-02", "end_date": "2026-12-28"}) == (6, "2026-12-28", "2027-01-02")
@@ -0,0 +1,68 @@
+import json, os
+from voyagerai.backend.poi_store import POIStore
+
+def _write(root, key, pois):
+    path = os.path.join(root, key + ".json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(pois, f)
+    os.replace(tmp, path)
+
+def test_lazy_load_and_lru(tmp_path):
+    for c in ["goa", "jaipur", "new_york"]:
+        _write(tmp_path, c, [{"name": c.upper(), "tags": []}])
+    store = POIStore(str(tmp_path), max_cities=2, check_s=60)
+    assert store.stats()["resident"] == 0
+    assert store.pois("New York")[0]["name"] == "NEW_YORK"
+    store.pois("Goa")
+    store.pois("goa")
+    store.pois("Jaipur")
+    st = store.stats()
+    assert st["loads"] == 3 and st["hits"] == 1 and st["evictions"] == 1
+    assert st["cities"] == ["goa", "jaipur"]
+    assert store.city("Atlantis") is None and store.pois("Atlantis") == []
+    assert store.cities() == ["goa", "jaipur", "new_york"]
+
+def test_hot_reload_swaps_snapshot(tmp_path):
+    _write(tmp_path, "goa", [{"name": "A", "tags": []}])
+    store = POIStore(str(tmp_path), check_s=0)
+    old = store.city("Goa")
+    built = old.derive("n", len)
+    _write(tmp_path, "goa", [{"name": "A", "tags": []}, {"name": "B", "tags": []}])
+    os.utime(tmp_path / "goa.json", ns=(old.mtime_ns + 10**9, old.mtime_ns + 10**9))
+    new = store.city("Goa")
+    assert new is not old and new.version != old.version
+    assert len(old.table) == built == 1 and new.derive("n", len) == 2
+    assert store.stats()["reloads"] == 1
+    # a broken write keeps serving the last good snapshot
+    (tmp_path / "goa.json").write_text("[{", encoding="utf-8")
+    assert store.city("Goa") is new
+
+def test_keys_stay_inside_root_and_misses_do_not_evict(tmp_path):
+    root = tmp_path / "pois"
+    root.mkdir()
+    _write(tmp_path, "x", [{"name": "OUTSIDE", "tags": []}])
+    _write(root, "goa", [{"name": "A", "tags": []}])
+    (root / "odd.json").write_text('{"name": "not a list"}', encoding="utf-8")
+    _write(root, "bad_pop", [{"name": "A", "tags": [], "popularity": "lots"}])
+    store = POIStore(str(root), max_cities=1, check_s=60)
+    assert store.city("../x") is None and store.city("..") is None
+    assert store.city("Odd") is None and store.city("Bad Pop") is None
+    assert store.city("Goa") is not None
+    for name in ["Atlantis", "El Dorado", "Shangri-La"]:
+        assert store.city(name) is None
+    st = store.stats()
+    assert st["cities"] == ["goa"] and st["evictions"] == 0 and st["loads"] == 1
+
+def test_poi_table_round_trips_rows():
+    from voyagerai.backend.poi_table import POITable
+    pois = [
+        {"name": "Baga Beach", "tags": ["beach", "water sports"], "popularity": 95, "notes": "Shacks", "lat": 15.55, "lon": 73.75},
+        {"name": "Café ☕", "tags": [], "popularity": 50},
+        {"name": "X", "tags": ["Beach"], "popularity": 7, "notes": "", "xid": "N123"},
+    ]
+    t = POITable(pois)
+    assert len(t) == 3
+    assert t.rows() == pois
+    assert json.dumps(t.row(0)) == json.dumps(pois[0])
+    assert t.rows([2]) == [pois[2]]
@@ -0,0 +1,185 @@
+import asyncio
+from voyagerai.backend import tools
+
+def test_async_tools_match_sync_in_mock_mode():
+    assert tools.TOOL_MODE == "mock"
+    async def run():
+        return (await tools.aget_city_geocode("goa"),
+                await tools.aget_route(15.49, 73.83, 26.91, 75.79),
+                await tools.aget_weather(15.49, 73.83, "2025-10-12", "2025-10-14"))
+    geo, route, weather = asyncio.run(run())
+    assert geo == tools.get_city_geocode("goa")
+    assert route == tools.get_route(15.49, 73.83, 26.91, 75.79)
+    assert [d["date"] for d in weather["daily"]] == ["2025-10-12", "2025-10-13", "2025-10-14"]
+
+def test_drive_throws_errors_into_generator():
+    def gen():
+        try:
+            yield tools._Call("nowhere", "GET", "http://127.0.0.1:9/", timeout=0.2)
+        except Exception:
+            return "fallback"
+    tools.get_client("nowhere").retries = 0
+    assert tools._drive(gen()) == "fallback"
+
+def test_stale_while_revalidate_keeps_good_value_on_failure():
+    import time
+    CachePolicy, NegativeResult = tools.CachePolicy, tools.NegativeResult
+    pol = CachePolicy(soft_ttl=0.05, hard_ttl=30, negative_ttl=0.3)
+    results = ["v1", NegativeResult("fallback"), "v2"]
+    calls = []
+    def fetch():
+        calls.append(1)
+        return results[len(calls) - 1]
+    def drain():
+        tools._refresh_pool.submit(lambda: None).result()
+        time.sleep(0.02)
+    key = "test:swr"
+    assert tools.cached_fetch(key, fetch_fn=fetch, policy=pol) == "v1"
+    time.sleep(0.1)
+    assert tools.cached_fetch(key, fetch_fn=fetch, policy=pol) == "v1"  # stale, refresh fails
+    drain()
+    assert tools.cached_fetch(key, fetch_fn=fetch, policy=pol) == "v1"  # failure did not overwrite
+    assert len(calls) == 2
+    time.sleep(0.35)
+    assert tools.cached_fetch(key, fetch_fn=fetch, policy=pol) == "v1"  # stale again, refresh succeeds
+    drain()
+    assert tools.cached_fetch(key, fetch_fn=fetch, policy=pol) == "v2"
+    assert len(calls) == 3
+
+def test_negative_result_uses_short_ttl():
+    import time
+    CachePolicy, NegativeResult = tools.CachePolicy, tools.NegativeResult
+    pol = CachePolicy(soft_ttl=3600, negative_ttl=0.05)
+    key = "test:neg"
+    assert tools.cached_fetch(key, fetch_fn=lambda: NegativeResult({"daily": []}), policy=pol) == {"daily": []}
+    time.sleep(0.1)
+    assert tools.cached_fetch(key, fetch_fn=lambda: {"daily": [1]}, policy=pol) == {"daily": [1]}
+
+def test_cached_fetch_without_ttl_or_policy_is_rejected():
+    import pytest
+    with pytest.raises(ValueError):
+        tools.cached_fetch("test:nottl", fetch_fn=lambda: 1)
+    with pytest.raises(ValueError):
+        asyncio.run(tools.acached_fetch("test:nottl", fetch_fn=lambda: 1))
+
+def test_weather_cell_serves_subranges_and_fetches_only_missing_days(monkeypatch):
+    calls = []
+    real = tools._weather_fetch
+    def spy(lat, lon, sd, ed):
+        calls.append((sd, ed))
+        return real(lat, lon, sd, ed)
+    monkeypatch.setattr(tools, "_weather_fetch", spy)
+    # start at a cell centre so the +-0.01 probe stays inside it
+    lat, lon = 15.5, 73.8
+    assert len(tools.get_weather(lat, lon, "2030-10-12", "2030-10-15")["daily"]) == 4
+    out = tools.get_weather(lat + 0.01, lon - 0.01, "2030-10-13", "2030-10-14")
+    assert [d["date"] for d in out["daily"]] == ["2030-10-13", "2030-10-14"]
+    tools.get_weather(lat, lon, "2030-10-14", "2030-10-17")
+    assert calls == [("2030-10-12", "2030-10-15"), ("2030-10-16", "2030-10-17")]
+
+def test_distance_matrix_matches_pairwise_routes_in_any_order():
+    pts = [(15.5565, 73.7517), (15.5494, 73.7535), (15.4920, 73.7738), (15.6010, 73.7400)]
+    m = tools.get_distance_matrix(pts)
+    for i, a in enumerate(pts):
+        for j, b in enumerate(pts):
+            if i != j:
+                r = tools.get_route(a[0], a[1], b[0], b[1])
+                assert abs(m["distance_km"][i][j] - r["distance_km"]) <= 0.1
+                assert m["duration_min"][i][j] == r["duration_min"]
+    rev = tools.get_distance_matrix(pts[::-1])
+    assert rev["distance_km"][0][3] == m["distance_km"][3][0]
+
+def _fake_opentripmap(places, details, detail_calls):
+    # stands in for _drive: answers the radius search and per-xid detail calls
+    def drive(gen):
+        try:
+            call = next(gen)
+            while True:
+                if call.url.endswith("/places/radius"):
+                    call = gen.send({"features": [{"properties": p} for p in places]})
+                else:
+                    xid = call.url.rsplit("/", 1)[1]
+                    detail_calls.append(xid)
+                    call = gen.send(details[xid])
+        except StopIteration as stop:
+            return stop.value
+    return drive
+
+def test_live_pois_share_detail_cache_and_tolerate_odd_rates(monkeypatch):
+    places = [{"xid": "a", "name": "A"}, {"xid": "b", "name": "B"}]
+    details = {"a": {"name": "Fort A", "kinds": "forts,history", "rate": "3h"},
+               "b": {"name": "Beach B", "kinds": "beaches", "rate": 7}}
+    calls = []
+    monkeypatch.setattr(tools, "TOOL_MODE", "live")
+    monkeypatch.setattr(tools, "_drive", _fake_opentripmap(places, details, calls))
+    radius = 5000
+    first = tools.get_pois("goa", radius_m=radius, limit=5)
+    assert [(p["name"], p["popularity"]) for p in first] == [("Fort A", 3), ("Beach B", 7)]
+    # an overlapping radius query is a different search, but the details come from the per-xid cache
+    second = tools.get_pois("goa", radius_m=radius + 1, limit=5)
+    assert second == first
+    assert sorted(calls) == sorted(details)
+
+def test_live_pois_return_partial_results_at_the_deadline(monkeypatch):
+    import time
+    places = [{"xid": "fast", "name": "Fast"}, {"xid": "slow", "name": "Slow (search)"}, {"name": "No xid"}]
+    def detail(xid):
+        if xid == "slow":
+            time.sleep(0.5)
+        return {"name": xid.title() + " detail", "rate": 5}
+    monkeypatch.setattr(tools, "TOOL_MODE", "live")
+    monkeypatch.setattr(tools, "POI_DETAIL_DEADLINE_S", 0.1)
+    monkeypatch.setattr(tools, "get_poi_detail", detail)
+    monkeypatch.setattr(tools, "cached_fetch", lambda key, fetch_fn=None, **kw: places)
+    t0 = time.perf_counter()
+    out = tools.get_pois("goa")
+    assert time.perf_counter() - t0 < 0.4
+    assert [p["name"] for p in out] == ["Fast detail", "Slow (search)", "No xid"]
+
+def test_weather_days_upstream_cannot_serve_are_negative_cached(monkeypatch):
+    calls = []
+    def upstream(lat, lon, sd, ed):
+        calls.append((sd, ed))
+        if sd >= "2031-01-01":
+            return tools.NegativeResult({"daily": []})   # provider down
+        # a forecast horizon: nothing after 2030-10-13
+        return {"daily": [{"date": d, "temp_max": 30, "temp_min": 24, "weathercode": 0}
+                          for d in tools._date_span(sd, ed) if d <= "2030-10-13"]}
+        yield
+    monkeypatch.setattr(tools, "_weather_fetch", upstream)
+    lat, lon = 15.5, 73.8
+    for _ in range(2):
+        out = tools.get_weather(lat, lon, "2030-10-12", "2030-10-16")
+        assert [d["date"] for d in out["daily"]] == ["2030-10-12", "2030-10-13"]
+        assert tools.get_weather(lat, lon, "2031-02-01", "2031-02-02") == {"daily": []}
+        # days before the stored series' cutoff are still held for the negative TTL
+        assert len(tools.get_weather(lat, lon, "2020-01-01", "2020-01-02")["daily"]) == 2
+    assert calls == [("2030-10-12", "2030-10-16"), ("2031-02-01", "2031-02-02"), ("2020-01-01", "2020-01-02")]
+
+def test_async_tools_share_one_event_loop_against_a_stubbed_provider(monkeypatch):
+    import time
+    class Resp:
+        def __init__(self, payload):
+            self.payload = payload
+        def json(self):
+            return self.payload
+    class SlowProvider:
+        async def request(self, method, url, **kw):
+            calls.append(url)
+            await asyncio.sleep(0.2)
+            return Resp([{"name": url.rsplit("/", 1)[1]}] if "restcountries" in url else [{"date": "2031-01-26"}])
+    def no_sync(name):
+        raise AssertionError("async path used the blocking client")
+    calls = []
+    monkeypatch.setattr(tools, "TOOL_MODE", "live")
+    monkeypatch.setattr(tools, "get_async_client", lambda name: SlowProvider())
+    monkeypatch.setattr(tools, "get_client", no_sync)
+    names = [f"land{i}" for i in range(5)]
+    async def go():
+        return await asyncio.gather(*[tools.aget_country_info(n) for n in names],
+                                    tools.aget_public_holidays("IN", 2031))
+    t0 = time.perf_counter()
+    *countries, holidays = asyncio.run(go())
+    # six 0.2 s provider calls overlap on one loop instead of queueing
+    assert time.perf_counter() - t0 < 0.6 and len(calls) == 6
+    assert [c["name"] for c in countries] == names and holidays == [{"date": "2031-01-26"}]